@@ -21,6 +21,16 @@ namespace
         const char* Filename = "obsdatain";
         const char* TablePath = "tablepath";
         const char* Exports = "exports";
+        const char* Messages = "messages";
+
+        namespace MessageKeys
+        {
+            const char* Subsets = "subsets";
+            const char* StartMessage = "startMessage";
+            const char* EndMessage = "endMessage";
+            const char* StartDate = "startDate";
+            const char* EndDate = "endDate";
+        }  // namespace MessageKeys
     }  // namespace ConfKeys
 }  // namespace
 
@@ -39,5 +49,16 @@ namespace Ingester
         {
             setTablepath("");
         }
+
+        if (conf.has(ConfKeys::Messages))
+        {
+            const auto msgConf = conf.getSubConfiguration(ConfKeys::Messages);
+            setMessageFilter(bufr::MessageFilter(
+                msgConf.getStringVector(ConfKeys::MessageKeys::Subsets, {}),
+                static_cast<size_t>(msgConf.getInt(ConfKeys::MessageKeys::StartMessage, 0)),
+                static_cast<size_t>(msgConf.getInt(ConfKeys::MessageKeys::EndMessage, 0)),
+                static_cast<int64_t>(msgConf.getLong(ConfKeys::MessageKeys::StartDate, 0)),
+                static_cast<int64_t>(msgConf.getLong(ConfKeys::MessageKeys::EndDate, 0))));
+        }
     }
 }  // namespace Ingester
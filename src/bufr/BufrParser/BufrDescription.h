@@ -13,6 +13,7 @@
 #include "eckit/config/LocalConfiguration.h"
 
 #include "Exports/Export.h"
+#include "Query/MessageFilter.h"
 
 
 namespace Ingester
@@ -35,11 +36,13 @@ namespace Ingester
         inline void setFilepath(const std::string& filepath) { filepath_ = filepath; }
         inline void setTablepath(const std::string& tablepath) { tablepath_ = tablepath; }
         inline void setExport(const Export& newExport) { export_ = newExport; }
+        inline void setMessageFilter(const bufr::MessageFilter& filter) { messageFilter_ = filter; }
 
         // Getters
         inline std::string filepath() const { return filepath_; }
         inline std::string tablepath() const { return tablepath_; }
         inline Export getExport() const { return export_; }
+        inline bufr::MessageFilter messageFilter() const { return messageFilter_; }
 
      private:
         /// \brief Specifies the relative path to the BUFR file to read.
@@ -50,5 +53,8 @@ namespace Ingester
 
         /// \brief Map of export strings to Variable classes.
         Export export_;
+
+        /// \brief Selects the BUFR messages to read (all of them by default).
+        bufr::MessageFilter messageFilter_;
     };
 }  // namespace Ingester
@@ -50,6 +50,57 @@ namespace Ingester {
     {
         auto startTime = std::chrono::steady_clock::now();
 
+        oops::Log::info() << "Executing Queries" << std::endl;
+        const auto resultSet = file_.execute(makeQuerySet(),
+                                             maxMsgsToParse,
+                                             1,
+                                             description_.messageFilter());
+
+        auto exportedData = exportResults(resultSet);
+
+        auto timeElapsed = std::chrono::steady_clock::now() - startTime;
+        auto timeElapsedDuration = std::chrono::duration_cast<std::chrono::milliseconds>
+                (timeElapsed);
+        oops::Log::info()  << "Finished "
+                           << "[" << timeElapsedDuration.count() / 1000.0 << "s]"
+                           << std::endl;
+
+        return exportedData;
+    }
+
+    void BufrParser::parseChunks(
+        const size_t msgsPerChunk,
+        const std::function<void(const std::shared_ptr<DataContainer>&)>& processChunk)
+    {
+        auto startTime = std::chrono::steady_clock::now();
+
+        const auto querySet = makeQuerySet();
+
+        size_t chunkIdx = 0;
+        while (!file_.isAtEnd())
+        {
+            oops::Log::info() << "Executing Queries (chunk " << chunkIdx << ")" << std::endl;
+            const auto resultSet = file_.execute(querySet,
+                                                 msgsPerChunk,
+                                                 1,
+                                                 description_.messageFilter());
+            chunkIdx++;
+
+            if (resultSet.empty()) continue;
+
+            processChunk(exportResults(resultSet));
+        }
+
+        auto timeElapsed = std::chrono::steady_clock::now() - startTime;
+        auto timeElapsedDuration = std::chrono::duration_cast<std::chrono::milliseconds>
+                (timeElapsed);
+        oops::Log::info()  << "Finished " << chunkIdx << " chunks "
+                           << "[" << timeElapsedDuration.count() / 1000.0 << "s]"
+                           << std::endl;
+    }
+
+    bufr::QuerySet BufrParser::makeQuerySet() const
+    {
         auto querySet = bufr::QuerySet(description_.getExport().getSubsets());
 
         for (const auto &var : description_.getExport().getVariables())
@@ -60,9 +111,11 @@ namespace Ingester {
             }
         }
 
-        oops::Log::info() << "Executing Queries" << std::endl;
-        const auto resultSet = file_.execute(querySet, maxMsgsToParse);
+        return querySet;
+    }
 
+    std::shared_ptr<DataContainer> BufrParser::exportResults(const bufr::ResultSet& resultSet)
+    {
         oops::Log::info() << "Building Bufr Data" << std::endl;
         auto srcData = BufrDataMap();
         for (const auto& var : description_.getExport().getVariables())
@@ -75,16 +128,7 @@ namespace Ingester {
         }
 
         oops::Log::info()  << "Exporting Data" << std::endl;
-        auto exportedData = exportData(srcData);
-
-        auto timeElapsed = std::chrono::steady_clock::now() - startTime;
-        auto timeElapsedDuration = std::chrono::duration_cast<std::chrono::milliseconds>
-                (timeElapsed);
-        oops::Log::info()  << "Finished "
-                           << "[" << timeElapsedDuration.count() / 1000.0 << "s]"
-                           << std::endl;
-
-        return exportedData;
+        return exportData(srcData);
     }
 
     std::shared_ptr<DataContainer> BufrParser::exportData(const BufrDataMap &srcData) {
@@ -7,6 +7,7 @@
 
 #pragma once
 
+#include <functional>
 #include <map>
 #include <memory>
 #include <string>
@@ -37,6 +38,14 @@ namespace Ingester {
         /// \param maxMsgsToParse Messages to parse (0 for everything)
         std::shared_ptr<DataContainer> parse(const size_t maxMsgsToParse = 0) final;
 
+        /// \brief Parse the BUFR file msgsPerChunk messages at a time, exporting each chunk as
+        /// its own DataContainer (chunks without any matching subsets are skipped).
+        /// \param msgsPerChunk Messages per chunk (0 for everything in one chunk)
+        /// \param processChunk Called with the data of each chunk, in file order
+        void parseChunks(
+            const size_t msgsPerChunk,
+            const std::function<void(const std::shared_ptr<DataContainer>&)>& processChunk) final;
+
         /// \brief Start over from beginning of the BUFR file
         void reset() final;
 
@@ -49,6 +58,13 @@ namespace Ingester {
         /// \brief The Bufr file object we are working with
         bufr::File file_;
 
+        /// \brief Make the QuerySet for all the queries in the description.
+        bufr::QuerySet makeQuerySet() const;
+
+        /// \brief Get the query results and export them into a DataContainer
+        /// \param resultSet The results of executing the queries
+        std::shared_ptr<DataContainer> exportResults(const bufr::ResultSet& resultSet);
+
         /// \brief Exports collected data into a DataContainer
         /// \param srcData Data to export
         std::shared_ptr<DataContainer> exportData(const BufrDataMap& srcData);
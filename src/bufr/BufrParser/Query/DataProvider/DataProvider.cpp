@@ -18,9 +18,11 @@
 namespace Ingester {
 namespace bufr {
     void DataProvider::run(const QuerySet& querySet,
+                           const MessageFilter& filter,
                            const std::function<void()> processSubset,
                            const std::function<void()> processMsg,
-                           const std::function<bool()> continueProcessing)
+                           const std::function<bool()> continueProcessing,
+                           bool chunked)
     {
         if (!isOpen_)
         {
@@ -39,13 +41,25 @@ namespace bufr {
         bool foundBufrMsg = false;
         bool foundBufrSubset = false;
 
-        while (ireadmg_f(FileUnit, subsetChars, &iddate, SubsetLen) == 0)
+        bool msgsLeft = false;
+        while ((msgsLeft = (ireadmg_f(FileUnit, subsetChars, &iddate, SubsetLen) == 0)))
         {
             foundBufrMsg = true;
+            if (filter.isPastEnd(msgIdx_))
+            {
+                msgsLeft = false;
+                break;
+            }
+
             subset_ = std::string(subsetChars);
             subset_.erase(std::remove_if(subset_.begin(), subset_.end(), isspace), subset_.end());
 
-            if (querySet.includesSubset(subset_))
+            // Only the message header has been read so far, so skipping here avoids unpacking
+            // any of the subsets.
+            const bool includeMsg = filter.includesMessage(msgIdx_, subset_, iddate);
+            msgIdx_++;
+
+            if (includeMsg && querySet.includesSubset(subset_))
             {
                 while (ireadsb_f(FileUnit) == 0)
                 {
@@ -62,8 +76,22 @@ namespace bufr {
             }
         }
 
+        isAtEnd_ = !msgsLeft;
+        foundBufrMsg_ = foundBufrMsg_ || foundBufrMsg;
+        foundBufrSubset_ = foundBufrSubset_ || foundBufrSubset;
         deleteData();
 
+        // A chunked read is only checked once the whole file has been read, since its first
+        // chunks may not contain any of the queried subsets and its last call may not find any
+        // messages.
+        if (chunked)
+        {
+            if (!isAtEnd_) return;
+
+            foundBufrMsg = foundBufrMsg_;
+            foundBufrSubset = foundBufrSubset_;
+        }
+
         if (!foundBufrMsg)
         {
             std::ostringstream errStr;
@@ -17,6 +17,7 @@
 #include <unordered_map>
 
 #include "bufr_interface.h"
+#include "../MessageFilter.h"
 #include "../QuerySet.h"
 #include "SubsetVariant.h"
 
@@ -112,6 +113,28 @@ namespace bufr {
         int varientNumber;
     };
 
+    /// \brief Copy of the data for one BUFR message subset, with the same accessors as the
+    ///        DataProvider. Unlike the DataProvider it stays valid once the next subset has been
+    ///        read, so it can be processed on another thread.
+    struct SubsetData
+    {
+        SubsetVariant variant;
+        FortranIdx inode;
+        FortranIdx nval;
+        std::vector<double> val;
+        std::vector<int> inv;
+        std::shared_ptr<TableData> tableData;
+
+        inline FortranIdx getInode() const { return inode; }
+        inline FortranIdx getNVal() const { return nval; }
+        inline FortranIdx getInv(FortranIdx idx) const { return inv[idx - 1]; }
+        inline double getVal(FortranIdx idx) const { return val[idx - 1]; }
+        inline FortranIdx getIsc(FortranIdx idx) const { return tableData->isc[idx - 1]; }
+        inline FortranIdx getLink(FortranIdx idx) const { return tableData->link[idx - 1]; }
+        inline FortranIdx getJmpb(FortranIdx idx) const { return tableData->jmpb[idx - 1]; }
+        inline Typ getTyp(FortranIdx idx) const { return tableData->typ[idx - 1]; }
+    };
+
     class DataProvider;
     typedef std::shared_ptr<DataProvider> DataProviderType;
 
@@ -130,14 +153,21 @@ namespace bufr {
 
         /// \brief Runs through the contents of the BUFR file. Calls the functions given as its
         ///        its running.
+        /// \param querySet The queries (messages for subsets they don't apply to are skipped).
+        /// \param filter Selects the messages to process. Messages it excludes are skipped
+        ///               before their subsets are read.
         /// \param processSubset The function to call to process a subset.
         /// \param processMsg (Optional) Function to call when finish processing a message.
         /// \param continueProcessing (Optional) Function to call to figure out if we should keep
         ///                           running or not.
+        /// \param chunked (Optional) The file is read a few messages per call, so only report
+        ///                missing messages or subsets once the end of the file is reached.
         void run(const QuerySet& querySet,
+                 const MessageFilter& filter,
                  const std::function<void()> processSubset,
                  const std::function<void()> processMsg = [](){},
-                 const std::function<bool()> continueProcessing = [](){ return true; });
+                 const std::function<bool()> continueProcessing = [](){ return true; },
+                 bool chunked = false);
 
         /// \brief Open the BUFR file with NCEPLIB-bufr
         virtual void open() = 0;
@@ -148,6 +178,7 @@ namespace bufr {
             closbf_f(FileUnit);
             close_f(FileUnit);
             isOpen_ = false;
+            resetReadState();
         }
 
         /// \brief Rewind the current BUFR file (start over from the beginning).
@@ -160,6 +191,9 @@ namespace bufr {
         /// \brief Is the BUFR file open
         bool isFileOpen() { return isOpen_; }
 
+        /// \brief Has run reached the end of the file (or of the messages the filter selects)?
+        bool isAtEnd() const { return isAtEnd_; }
+
         /// \brief Tells the Fortran BUFR interface to delete its temporary data structures that are
         /// are needed to support this class instanc.
         inline void deleteData() { delete_table_data_f(); }
@@ -170,6 +204,20 @@ namespace bufr {
             return SubsetVariant(subset_, variantId(), hasVariants());
         }
 
+        /// \brief Copy the data of the current subset so that it can be used after the next
+        ///        subset is read. Valid while executing "run".
+        SubsetData getSubsetData() const
+        {
+            SubsetData data;
+            data.variant = getSubsetVariant();
+            data.inode = inode_;
+            data.nval = nval_;
+            data.val.assign(val_.begin(), val_.end());
+            data.inv.assign(inv_.begin(), inv_.end());
+            data.tableData = getTableData();
+            return data;
+        }
+
         /// \brief Get the filepath for the currently open BUFR file.
         std::string getFilepath() const { return filePath_; }
 
@@ -242,6 +290,22 @@ namespace bufr {
         std::string subset_;
         bool isOpen_ = false;
 
+        // State kept between calls to run, so the file can be read in several passes. Reset when
+        // the file is closed (or rewound).
+        bool isAtEnd_ = false;
+        size_t msgIdx_ = 0;
+        bool foundBufrMsg_ = false;
+        bool foundBufrSubset_ = false;
+
+        /// \brief Reset the state kept between calls to run.
+        void resetReadState()
+        {
+            isAtEnd_ = false;
+            msgIdx_ = 0;
+            foundBufrMsg_ = false;
+            foundBufrSubset_ = false;
+        }
+
         // BUFR table meta data elements
         int inode_;
         int nval_;
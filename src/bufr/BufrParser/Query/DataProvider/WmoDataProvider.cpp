@@ -126,7 +126,7 @@ namespace bufr {
         if (tableCache_.empty())
         {
             open();
-            run(QuerySet(), []() {});
+            run(QuerySet(), MessageFilter(), []() {});
             close();
         }
     }
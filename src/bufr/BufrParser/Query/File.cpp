@@ -45,11 +45,19 @@ namespace bufr {
         dataProvider_->rewind();
     }
 
-    ResultSet File::execute(const QuerySet &querySet, size_t next)
+    bool File::isAtEnd() const
+    {
+        return dataProvider_->isAtEnd();
+    }
+
+    ResultSet File::execute(const QuerySet &querySet,
+                            size_t next,
+                            size_t numThreads,
+                            const MessageFilter& filter)
     {
         size_t msgCnt = 0;
         auto resultSet = ResultSet(querySet.names());
-        auto queryRunner = QueryRunner(querySet, resultSet, dataProvider_);
+        auto queryRunner = QueryRunner(querySet, resultSet, dataProvider_, numThreads);
 
         auto processMsg = [&msgCnt] () mutable
         {
@@ -72,9 +80,13 @@ namespace bufr {
         };
 
         dataProvider_->run(querySet,
+                           filter,
                            processSubset,
                            processMsg,
-                           continueProcessing);
+                           continueProcessing,
+                           next > 0);
+
+        queryRunner.flush();
 
         return resultSet;
     }
@@ -9,6 +9,7 @@
 
 #include <string>
 
+#include "MessageFilter.h"
 #include "QuerySet.h"
 #include "ResultSet.h"
 
@@ -29,7 +30,20 @@ namespace bufr {
         /// \param query_set The queryset object that contains the collection of desired queries
         /// \param next The number of messages worth of data to run. 0 reads all messages in the
         /// file.
-        ResultSet execute(const QuerySet& query_set, size_t next = 0);
+        /// \param numThreads The number of threads used to collect the data for the queries. The
+        /// messages are still read on the calling thread, and the results are in file order
+        /// whatever the number of threads.
+        /// \param filter Selects the messages to process by position, subset and section 1 date.
+        /// Message positions count from the start of the file.
+        /// \note Successive calls carry on from where the previous one stopped, so a file can be
+        /// read in chunks of next messages (until isAtEnd). A call that reads the rest of the file
+        /// (next = 0) throws if it finds no messages or no subsets. A chunked call may return an
+        /// empty ResultSet, and only throws once the end of the file is reached without any
+        /// messages or subsets found since the start of the file.
+        ResultSet execute(const QuerySet& query_set,
+                          size_t next = 0,
+                          size_t numThreads = 1,
+                          const MessageFilter& filter = MessageFilter());
 
         /// \brief Close the currently opened BUFR file.
         void close();
@@ -37,6 +51,10 @@ namespace bufr {
         /// \brief Rewind the currently opened BUFR file to the beginning.
         void rewind();
 
+        /// \brief Has every message of the file (or every message the filter can select) been
+        /// read?
+        bool isAtEnd() const;
+
      private:
         std::shared_ptr<DataProvider> dataProvider_;
     };
@@ -0,0 +1,84 @@
+/*
+ * (C) Copyright 2023 NOAA/NWS/NCEP/EMC
+ *
+ * This software is licensed under the terms of the Apache Licence Version 2.0
+ * which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+ */
+
+#include "MessageFilter.h"
+
+#include <sstream>
+
+#include "eckit/exception/Exceptions.h"
+
+
+namespace Ingester {
+namespace bufr {
+    namespace
+    {
+        /// \brief ireadmg gives YYMMDDHH dates unless the library was told to use 10 digit
+        /// dates. Expand 8 digit dates the way NCEPLIB-bufr does (years after 40 are 19xx).
+        int64_t fullDate(int64_t date)
+        {
+            if (date < 100000000)
+            {
+                const int64_t year = date / 1000000;
+                date = (year > 40 ? 1900 + year : 2000 + year) * 1000000 + date % 1000000;
+            }
+
+            return date;
+        }
+    }  // namespace
+
+    MessageFilter::MessageFilter(const std::vector<std::string>& subsets,
+                                 size_t startMessage,
+                                 size_t endMessage,
+                                 int64_t startDate,
+                                 int64_t endDate) :
+        subsets_(subsets.begin(), subsets.end()),
+        startMessage_(startMessage),
+        endMessage_(endMessage),
+        startDate_(startDate),
+        endDate_(endDate)
+    {
+        if (endMessage_ > 0 && endMessage_ <= startMessage_)
+        {
+            std::ostringstream errStr;
+            errStr << "MessageFilter: the end message (" << endMessage_ << ") must come after ";
+            errStr << "the start message (" << startMessage_ << ").";
+            throw eckit::BadParameter(errStr.str());
+        }
+
+        if (startDate_ > 0 && endDate_ > 0 && fullDate(endDate_) < fullDate(startDate_))
+        {
+            std::ostringstream errStr;
+            errStr << "MessageFilter: the end date (" << endDate_ << ") is before the start ";
+            errStr << "date (" << startDate_ << ").";
+            throw eckit::BadParameter(errStr.str());
+        }
+    }
+
+    bool MessageFilter::includesMessage(size_t msgIdx,
+                                        const std::string& subset,
+                                        int64_t msgDate) const
+    {
+        if (msgIdx < startMessage_ || isPastEnd(msgIdx)) return false;
+
+        if (!subsets_.empty() && subsets_.find(subset) == subsets_.end()) return false;
+
+        if (startDate_ > 0 || endDate_ > 0)
+        {
+            const auto date = fullDate(msgDate);
+            if (startDate_ > 0 && date < fullDate(startDate_)) return false;
+            if (endDate_ > 0 && date > fullDate(endDate_)) return false;
+        }
+
+        return true;
+    }
+
+    std::vector<std::string> MessageFilter::subsets() const
+    {
+        return std::vector<std::string>(subsets_.begin(), subsets_.end());
+    }
+}  // namespace bufr
+}  // namespace Ingester
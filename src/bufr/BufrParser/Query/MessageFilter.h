@@ -0,0 +1,70 @@
+/*
+ * (C) Copyright 2023 NOAA/NWS/NCEP/EMC
+ *
+ * This software is licensed under the terms of the Apache Licence Version 2.0
+ * which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+ */
+
+#pragma once
+
+#include <cstdint>
+#include <set>
+#include <string>
+#include <vector>
+
+
+namespace Ingester {
+namespace bufr {
+
+    /// \brief Selects the BUFR messages to process using only what is known once the message
+    /// header has been read (its position in the file, its subset (Table A mnemonic) and its
+    /// section 1 date), so messages that are not wanted are skipped before any of their
+    /// subsets are unpacked.
+    class MessageFilter
+    {
+     public:
+        /// \brief Constructor. The default filter lets every message through.
+        /// \param subsets Table A mnemonics of the messages to keep (empty keeps all).
+        /// \param startMessage Index of the first message to keep (0 based, counting every
+        ///                     message read since the file was opened or rewound, so the
+        ///                     index carries on across successive File::execute calls).
+        /// \param endMessage Index one past the last message to keep (0 for the end of the
+        ///                   file).
+        /// \param startDate Earliest section 1 date to keep as YYYYMMDDHH (0 for no limit).
+        /// \param endDate Latest section 1 date to keep as YYYYMMDDHH (0 for no limit).
+        explicit MessageFilter(const std::vector<std::string>& subsets = {},
+                               size_t startMessage = 0,
+                               size_t endMessage = 0,
+                               int64_t startDate = 0,
+                               int64_t endDate = 0);
+
+        /// \brief Should the message with the given index, subset and date be processed?
+        /// \param msgIdx The index of the message (0 based).
+        /// \param subset The subset (Table A mnemonic) of the message.
+        /// \param msgDate The section 1 date of the message as returned by ireadmg (YYMMDDHH or
+        ///                YYYYMMDDHH).
+        bool includesMessage(size_t msgIdx, const std::string& subset, int64_t msgDate) const;
+
+        /// \brief Are all messages from msgIdx onwards excluded (so reading can stop)?
+        /// \param msgIdx The index of the message (0 based).
+        bool isPastEnd(size_t msgIdx) const
+        {
+            return endMessage_ > 0 && msgIdx >= endMessage_;
+        }
+
+        // Getters
+        std::vector<std::string> subsets() const;
+        size_t startMessage() const { return startMessage_; }
+        size_t endMessage() const { return endMessage_; }
+        int64_t startDate() const { return startDate_; }
+        int64_t endDate() const { return endDate_; }
+
+     private:
+        std::set<std::string> subsets_;
+        size_t startMessage_;
+        size_t endMessage_;
+        int64_t startDate_;
+        int64_t endDate_;
+    };
+}  // namespace bufr
+}  // namespace Ingester
@@ -6,9 +6,11 @@
  */
 #include "QueryRunner.h"
 
+#include <algorithm>
 #include <string>
 #include <iostream>
 #include <memory>
+#include <utility>
 
 #ifdef BUILD_IODA_BINDING
     #include "oops/util/Logger.h"
@@ -22,6 +24,9 @@
 namespace Ingester {
 namespace bufr
 {
+    /// \brief Number of subsets per worker thread gathered before a batch is started.
+    const size_t SubsetsPerThread = 256;
+
     struct NodeData
     {
         std::vector<double> values;
@@ -30,20 +35,99 @@ namespace bufr
 
     QueryRunner::QueryRunner(const QuerySet &querySet,
                              ResultSet &resultSet,
-                             const DataProviderType &dataProvider) :
+                             const DataProviderType &dataProvider,
+                             size_t numThreads) :
         querySet_(querySet),
         resultSet_(resultSet),
-        dataProvider_(dataProvider)
+        dataProvider_(dataProvider),
+        numThreads_(std::max<size_t>(numThreads, 1))
     {
     }
 
+    QueryRunner::~QueryRunner()
+    {
+        // Don't leave worker threads running on data that is about to be destroyed.
+        for (auto& worker : workers_)
+        {
+            if (worker.valid()) worker.wait();
+        }
+    }
+
     void QueryRunner::accumulate()
     {
         Targets targets;
         std::shared_ptr<__details::ProcessingMasks> masks;
 
+        // Finding the targets calls into the BUFR library, which is not thread safe, so it is
+        // always done here (it is cached for each subset variant).
         findTargets(targets, masks);
-        collectData(targets, masks, resultSet_);
+
+        if (numThreads_ == 1)
+        {
+            collectData(*dataProvider_, targets, masks, resultSet_.nextDataFrame());
+            return;
+        }
+
+        pendingSubsets_.push_back({dataProvider_->getSubsetData(), targets, masks});
+        if (pendingSubsets_.size() >= numThreads_ * SubsetsPerThread)
+        {
+            startBatch();
+        }
+    }
+
+    void QueryRunner::flush()
+    {
+        startBatch();
+        finishBatch();
+    }
+
+    void QueryRunner::startBatch()
+    {
+        // Only one batch is in flight at a time, the next one is gathered while it runs.
+        finishBatch();
+        if (pendingSubsets_.empty()) return;
+
+        batchSubsets_ = std::move(pendingSubsets_);
+        pendingSubsets_.clear();
+        batchFrames_ = std::vector<DataFrame>(batchSubsets_.size(),
+                                              DataFrame(querySet_.names().size()));
+
+        const size_t numSubsets = batchSubsets_.size();
+        const size_t chunkSize = (numSubsets + numThreads_ - 1) / numThreads_;
+        for (size_t start = 0; start < numSubsets; start += chunkSize)
+        {
+            const size_t end = std::min(start + chunkSize, numSubsets);
+            workers_.push_back(std::async(std::launch::async, [this, start, end]()
+            {
+                for (size_t idx = start; idx < end; ++idx)
+                {
+                    const auto& subset = batchSubsets_[idx];
+                    collectData(subset.data, subset.targets, subset.masks, batchFrames_[idx]);
+                }
+            }));
+        }
+    }
+
+    void QueryRunner::finishBatch()
+    {
+        if (workers_.empty()) return;
+
+        // Wait for every worker before rethrowing any error so none are left running.
+        for (auto& worker : workers_)
+        {
+            worker.wait();
+        }
+
+        auto workers = std::move(workers_);
+        workers_.clear();
+        for (auto& worker : workers)
+        {
+            worker.get();
+        }
+
+        resultSet_.addDataFrames(std::move(batchFrames_));
+        batchFrames_.clear();
+        batchSubsets_.clear();
     }
 
     void QueryRunner::findTargets(Targets &targets,
@@ -160,17 +244,20 @@ namespace bufr
         maskCache_.insert({dataProvider_->getSubsetVariant(), masks});
     }
 
-    bool QueryRunner::isQueryNode(int nodeIdx) const
+    template <typename SubsetDataType>
+    bool QueryRunner::isQueryNode(const SubsetDataType& subsetData, int nodeIdx) const
     {
-        return (dataProvider_->getTyp(nodeIdx) == Typ::DelayedRep ||
-                dataProvider_->getTyp(nodeIdx) == Typ::FixedRep ||
-                dataProvider_->getTyp(nodeIdx) == Typ::DelayedRepStacked ||
-                dataProvider_->getTyp(nodeIdx) == Typ::DelayedBinary);
+        return (subsetData.getTyp(nodeIdx) == Typ::DelayedRep ||
+                subsetData.getTyp(nodeIdx) == Typ::FixedRep ||
+                subsetData.getTyp(nodeIdx) == Typ::DelayedRepStacked ||
+                subsetData.getTyp(nodeIdx) == Typ::DelayedBinary);
     }
 
-    void QueryRunner::collectData(Targets &targets,
-                                  std::shared_ptr<__details::ProcessingMasks> masks,
-                                  ResultSet &resultSet) const
+    template <typename SubsetDataType>
+    void QueryRunner::collectData(const SubsetDataType& subsetData,
+                                  const Targets &targets,
+                                  const std::shared_ptr<__details::ProcessingMasks>& masks,
+                                  DataFrame& dataFrame) const
     {
         std::vector<int> currentPath;
         std::vector<int> currentPathReturns;
@@ -178,34 +265,33 @@ namespace bufr
         currentPath.reserve(10);
         currentPathReturns.reserve(10);
 
-        auto &dataFrame = resultSet.nextDataFrame();
         int returnNodeIdx = -1;
         int lastNonZeroReturnIdx = -1;
 
         // Reorganize the data into a NodeValueTable to make lookups faster (avoid looping over all
         // the data a bunch of times)
         auto dataTable = __details::OffsetArray<NodeData>(
-            dataProvider_->getInode(),
-            dataProvider_->getIsc(dataProvider_->getInode()));
+            subsetData.getInode(),
+            subsetData.getIsc(subsetData.getInode()));
 
-        for (size_t dataCursor = 1; dataCursor <= dataProvider_->getNVal(); ++dataCursor)
+        for (size_t dataCursor = 1; dataCursor <= subsetData.getNVal(); ++dataCursor)
         {
-            int nodeIdx = dataProvider_->getInv(dataCursor);
+            int nodeIdx = subsetData.getInv(dataCursor);
 
             if (masks->valueNodeMask[nodeIdx])
             {
-                dataTable[nodeIdx].values.push_back(dataProvider_->getVal(dataCursor));
+                dataTable[nodeIdx].values.push_back(subsetData.getVal(dataCursor));
             }
 
             // Unfortuantely the fixed replicated sequences do not store their counts as values for
             // the Fixed Replication nodes. It's therefore necessary to discover this information by
             // manually tracing the nested sequences and counting everything manually. Since we have
             // to do it for fixed reps anyways, its easier just to do it for all the squences.
-            if (dataProvider_->getJmpb(nodeIdx) > 0 &&
-                masks->pathNodeMask[dataProvider_->getJmpb(nodeIdx)])
+            if (subsetData.getJmpb(nodeIdx) > 0 &&
+                masks->pathNodeMask[subsetData.getJmpb(nodeIdx)])
             {
-                const auto typ = dataProvider_->getTyp(nodeIdx);
-                const auto jmpbTyp = dataProvider_->getTyp(dataProvider_->getJmpb(nodeIdx));
+                const auto typ = subsetData.getTyp(nodeIdx);
+                const auto jmpbTyp = subsetData.getTyp(subsetData.getJmpb(nodeIdx));
                 if ((typ == Typ::Sequence && (jmpbTyp == Typ::Sequence ||
                                               jmpbTyp == Typ::DelayedBinary ||
                                               jmpbTyp == Typ::FixedRep)) ||
@@ -219,7 +305,7 @@ namespace bufr
             if (currentPath.size() >= 1)
             {
                 if (nodeIdx == returnNodeIdx ||
-                    dataCursor == dataProvider_->getNVal() ||
+                    dataCursor == subsetData.getNVal() ||
                     (currentPath.size() > 1 && nodeIdx == *(currentPath.end() - 1) + 1))
                 {
                     // Look for the first path return idx that is not 0 and check if its this node
@@ -233,7 +319,7 @@ namespace bufr
                         auto seqNodeIdx = currentPath.back();
                         currentPath.pop_back();
 
-                        const auto typSeqNode = dataProvider_->getTyp(seqNodeIdx);
+                        const auto typSeqNode = subsetData.getTyp(seqNodeIdx);
                         if (typSeqNode == Typ::DelayedRep ||
                             typSeqNode == Typ::DelayedRepStacked)
                         {
@@ -246,17 +332,17 @@ namespace bufr
                 }
             }
 
-            if (masks->pathNodeMask[nodeIdx] && isQueryNode(nodeIdx))
+            if (masks->pathNodeMask[nodeIdx] && isQueryNode(subsetData, nodeIdx))
             {
-                if (dataProvider_->getTyp(nodeIdx) == Typ::DelayedBinary &&
-                    dataProvider_->getVal(dataCursor) == 0)
+                if (subsetData.getTyp(nodeIdx) == Typ::DelayedBinary &&
+                    subsetData.getVal(dataCursor) == 0)
                 {
                     // Ignore the node if it is a delayed binary and the value is 0
                 }
                 else
                 {
                     currentPath.push_back(nodeIdx);
-                    const auto tmpReturnNodeIdx = dataProvider_->getLink(nodeIdx);
+                    const auto tmpReturnNodeIdx = subsetData.getLink(nodeIdx);
                     currentPathReturns.push_back(tmpReturnNodeIdx);
 
                     if (tmpReturnNodeIdx != 0)
@@ -269,12 +355,12 @@ namespace bufr
                         lastNonZeroReturnIdx = 0;
                         returnNodeIdx = 0;
 
-                        if (dataCursor != dataProvider_->getNVal())
+                        if (dataCursor != subsetData.getNVal())
                         {
                             for (int pathIdx = currentPath.size() - 1; pathIdx >= 0; --pathIdx)
                             {
-                                returnNodeIdx = dataProvider_->getLink(
-                                        dataProvider_->getJmpb(currentPath[pathIdx]));
+                                returnNodeIdx = subsetData.getLink(
+                                        subsetData.getJmpb(currentPath[pathIdx]));
                                 lastNonZeroReturnIdx = (currentPathReturns.size() - 1) - pathIdx;
 
                                 if (returnNodeIdx != 0) break;
@@ -10,6 +10,8 @@
 #include <string>
 #include <vector>
 #include <array>
+#include <future>  // NOLINT
+#include <memory>
 #include <unordered_map>
 
 #include "QuerySet.h"
@@ -49,6 +51,14 @@ namespace bufr {
             std::vector<bool> valueNodeMask;
             std::vector<bool> pathNodeMask;
         };
+
+        /// \brief A message subset waiting to be processed by a worker thread, along with the
+        /// targets and masks that apply to it.
+        struct PendingSubset {
+            SubsetData data;
+            Targets targets;
+            std::shared_ptr<ProcessingMasks> masks;
+        };
     }  // namespace __details
 
     /// \brief Manages the execution of queries against on a BUFR file.
@@ -59,15 +69,35 @@ namespace bufr {
         /// \param[in] querySet The set of queries to execute against the BUFR file.
         /// \param[in, out] resultSet The object used to store the accumulated collected data.
         /// \param[in] dataProvider The BUFR data provider to use.
+        /// \param[in] numThreads The number of threads used to collect the data. With more than
+        ///            one thread the subsets are copied and handed to worker threads in batches,
+        ///            so call flush once all the subsets have been accumulated.
         QueryRunner(const QuerySet& querySet,
                     ResultSet& resultSet,
-                    const DataProviderType& dataProvider);
+                    const DataProviderType& dataProvider,
+                    size_t numThreads = 1);
+
+        ~QueryRunner();
+
+        /// \brief Collect the data for the currently open BUFR message subset.
         void accumulate();
 
+        /// \brief Wait for the subsets handed to the worker threads and add their data to the
+        /// ResultSet in the order the subsets were read.
+        void flush();
+
      private:
         const QuerySet querySet_;
         ResultSet& resultSet_;
         const DataProviderType& dataProvider_;
+        const size_t numThreads_;
+
+        // Subsets read since the last batch was started, and the batch being processed by the
+        // worker threads (with the DataFrames they fill in).
+        std::vector<__details::PendingSubset> pendingSubsets_;
+        std::vector<__details::PendingSubset> batchSubsets_;
+        std::vector<DataFrame> batchFrames_;
+        std::vector<std::future<void>> workers_;
 
         std::unordered_map<SubsetVariant, Targets> targetCache_;
         std::unordered_map<SubsetVariant, std::shared_ptr<__details::ProcessingMasks>> maskCache_;
@@ -85,17 +115,29 @@ namespace bufr {
 
         /// \brief Does the node idx correspond to an element you'd find in a query string (repeat
         /// or binary sequence)?
+        /// \param[in] subsetData The data provider or subset copy the node belongs to.
         /// \param[in] nodeIdx The node index to check.
-        bool isQueryNode(int nodeIdx) const;
+        template <typename SubsetDataType>
+        bool isQueryNode(const SubsetDataType& subsetData, int nodeIdx) const;
 
 
-        /// \brief Accumulate the data for the currently open BUFR message subset.
+        /// \brief Accumulate the data for a BUFR message subset.
+        /// \param[in] subsetData The data provider (for the currently open subset) or a copy of
+        ///            the subset data.
         /// \param[in] targets The list of targets to collect for this subset.
         /// \param[in] masks The processing masks to use.
-        /// \param[in, out] resultSet The object used to store the accumulated collected data.
-        void collectData(Targets& targets,
-                         std::shared_ptr<__details::ProcessingMasks> masks,
-                         ResultSet& resultSet) const;
+        /// \param[in, out] dataFrame The DataFrame to store the collected data in.
+        template <typename SubsetDataType>
+        void collectData(const SubsetDataType& subsetData,
+                         const Targets& targets,
+                         const std::shared_ptr<__details::ProcessingMasks>& masks,
+                         DataFrame& dataFrame) const;
+
+        /// \brief Start processing the pending subsets on the worker threads.
+        void startBatch();
+
+        /// \brief Wait for the current batch and add its DataFrames to the ResultSet.
+        void finishBatch();
 
 
         /// \brief Given data counts and a filter specification this function creates the resulting
@@ -10,6 +10,7 @@
 #include "eckit/exception/Exceptions.h"
 
 #include <algorithm>
+#include <iterator>
 #include <string>
 #include <iostream>
 
@@ -89,8 +90,9 @@ namespace bufr {
                                            const std::string& groupByFieldName,
                                            const std::string& overrideType) const
         {
+            // The data object is discarded afterwards, so numpy can take over its buffer.
             auto dataObj = get(fieldName, groupByFieldName, overrideType);
-            return dataObj->getNumpyArray();
+            return dataObj->releaseNumpyArray();
         }
 
         py::array ResultSet::getNumpyDatetimeArray(const std::string& year,
@@ -175,6 +177,12 @@ namespace bufr {
         return dataFrames_.back();
     }
 
+    void ResultSet::addDataFrames(std::vector<DataFrame>&& frames)
+    {
+        dataFrames_.reserve(dataFrames_.size() + frames.size());
+        std::move(frames.begin(), frames.end(), std::back_inserter(dataFrames_));
+    }
+
     void ResultSet::getRawValues(const std::string& fieldName,
                                  const std::string& groupByField,
                                  std::vector<double>& data,
@@ -505,9 +513,9 @@ namespace bufr {
                                 const std::string& groupByFieldName,
                                 TypeInfo& info,
                                 const std::string& overrideType,
-                                const std::vector<double> data,
-                                const std::vector<int> dims,
-                                const std::vector<Query> dimPaths) const
+                                const std::vector<double>& data,
+                                const std::vector<int>& dims,
+                                const std::vector<Query>& dimPaths) const
     {
         std::shared_ptr<DataObjectBase> object;
         if (overrideType.empty())
@@ -155,8 +155,16 @@ namespace bufr {
         /// \return A reference to the new DataFrame.
         DataFrame& nextDataFrame();
 
+        /// \brief Appends DataFrames that were filled in elsewhere (ex: by worker threads), in
+        /// order.
+        /// \param frames The DataFrames to add.
+        void addDataFrames(std::vector<DataFrame>&& frames);
+
         void setTargets(Targets targets) { targets_ = targets; }
 
+        /// \brief Does the ResultSet contain no data (no subsets were read)?
+        bool empty() const { return dataFrames_.empty(); }
+
      private:
         Targets targets_;
         std::vector<DataFrame> dataFrames_;
@@ -209,9 +217,9 @@ namespace bufr {
                                 const std::string& groupByFieldName,
                                 TypeInfo& info,
                                 const std::string& overrideType,
-                                const std::vector<double> data,
-                                const std::vector<int> dims,
-                                const std::vector<Query> dimPaths) const;
+                                const std::vector<double>& data,
+                                const std::vector<int>& dims,
+                                const std::vector<Query>& dimPaths) const;
 
         /// \brief Make an appropriate DataObject for data with the TypeInfo
         /// \param info The meta data for the element.
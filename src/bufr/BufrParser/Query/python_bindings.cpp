@@ -11,6 +11,7 @@
 
 #include "QuerySet.h"
 #include "File.h"
+#include "MessageFilter.h"
 #include "ResultSet.h"
 
 
@@ -19,6 +20,7 @@ namespace py = pybind11;
 using Ingester::bufr::ResultSet;
 using Ingester::bufr::QuerySet;
 using Ingester::bufr::File;
+using Ingester::bufr::MessageFilter;
 
     PYBIND11_MODULE(bufr, m)
     {
@@ -30,6 +32,23 @@ using Ingester::bufr::File;
             .def("size", &QuerySet::size, "Get the number of queries in the query set.")
             .def("add", &QuerySet::add, "Add a query to the query set.");
 
+        py::class_<MessageFilter>(m, "MessageFilter")
+            .def(py::init<const std::vector<std::string>&, size_t, size_t, int64_t, int64_t>(),
+                 py::arg("subsets") = std::vector<std::string>(),
+                 py::arg("start_message") = static_cast<size_t>(0),
+                 py::arg("end_message") = static_cast<size_t>(0),
+                 py::arg("start_date") = static_cast<int64_t>(0),
+                 py::arg("end_date") = static_cast<int64_t>(0),
+                 "Select the messages to process by subset, by position (start_message up to but "
+                 "not including end_message, 0 meaning the end of the file) and by section 1 "
+                 "date (YYYYMMDDHH, inclusive). Excluded messages are skipped before their "
+                 "subsets are unpacked.")
+            .def_property_readonly("subsets", &MessageFilter::subsets)
+            .def_property_readonly("start_message", &MessageFilter::startMessage)
+            .def_property_readonly("end_message", &MessageFilter::endMessage)
+            .def_property_readonly("start_date", &MessageFilter::startDate)
+            .def_property_readonly("end_date", &MessageFilter::endDate);
+
         py::class_<File>(m, "File")
             .def(py::init<const std::string&, const std::string&>(),
                  py::arg("filename"),
@@ -37,15 +56,24 @@ using Ingester::bufr::File;
             .def("execute", &File::execute,
                              py::arg("query_set"),
                              py::arg("next") = static_cast<int>(0),
-                             "Execute a query set on the file. Returns a ResultSet object.")
+                             py::arg("threads") = static_cast<int>(1),
+                             py::arg("filter") = MessageFilter(),
+                             "Execute a query set on the file. Returns a ResultSet object. "
+                             "The query results are collected on the given number of threads.",
+                             py::call_guard<py::gil_scoped_release>())
             .def("rewind", &File::rewind,
                            "Rewind the file to the beginning.")
+            .def("is_at_end", &File::isAtEnd,
+                              "True once every message has been read, so a file can be read "
+                              "in chunks with execute(q, next=N) until is_at_end().")
             .def("close", &File::close,
                           "Close the file.")
             .def("__enter__", [](File &f) { return &f; })
             .def("__exit__", [](File &f, py::args args) { f.close(); });
 
         py::class_<ResultSet>(m, "ResultSet")
+            .def("empty", &ResultSet::empty,
+                          "True if no subsets were read (ex: a chunk with no matching messages).")
             .def("get", &ResultSet::getNumpyArray,
                         py::arg("field_name"),
                         py::arg("group_by") = std::string(""),
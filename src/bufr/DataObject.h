@@ -125,6 +125,11 @@ namespace Ingester
 #ifdef BUILD_PYTHON_BINDING
        /// \brief Return a numpy array of the data.
        virtual py::array getNumpyArray() const = 0;
+
+       /// \brief Return a numpy array that takes over the data buffer of this object instead of
+       /// copying it. The object is left empty, so only use this on objects that are discarded
+       /// afterwards.
+       virtual py::array releaseNumpyArray() = 0;
 #endif
 
         bool hasSamePath(const std::shared_ptr<DataObjectBase>& dataObject);
@@ -178,6 +183,13 @@ namespace Ingester
                                       const std::vector<ioda::Dimensions_t>& chunks,
                                       int compressionLevel) const = 0;
 
+        /// \brief Writes the data into an existing ioda::Variable starting at the given index
+        /// of its first (Location) dimension, which must already be large enough.
+        /// \param var The variable to write into
+        /// \param locOffset Location index where the first row of the data goes
+        virtual void appendToVariable(ioda::Variable& var,
+                                      ioda::Dimensions_t locOffset) const = 0;
+
         /// \brief Makes a new dimension scale using this data object as the source
         /// \param name The name of the dimension variable.
         /// \param dimIdx The idx of the data dimension to use.
@@ -258,6 +270,12 @@ namespace Ingester
             return _getNumpyArray();
         }
 
+        /// \brief Return a numpy array that takes over the data buffer of this object.
+        py::array releaseNumpyArray() final
+        {
+            return _releaseNumpyArray();
+        }
+
         template<typename U = void>
         py::array _getNumpyArray(
             typename std::enable_if<std::is_arithmetic<T>::value, U>::type* = nullptr) const
@@ -267,20 +285,33 @@ namespace Ingester
             T* dataPtr = static_cast<T*>(data.mutable_data());
             std::copy(data_.begin(), data_.end(), dataPtr);
 
-            // Create the mask array
-            py::array_t<bool> mask(dims_);
-            bool* maskPtr = static_cast<bool*>(mask.mutable_data());
-            for (size_t idx = 0; idx < data_.size(); idx++)
+            return _makeMaskedArray(data, data_);
+        }
+
+        template<typename U = void>
+        py::array _releaseNumpyArray(
+            typename std::enable_if<std::is_arithmetic<T>::value, U>::type* = nullptr)
+        {
+            // Move the data into a vector owned by the numpy array (through a capsule), so the
+            // array uses the buffer in place.
+            auto buffer = new std::vector<T>(std::move(data_));
+            data_ = std::vector<T>();
+
+            py::capsule owner(buffer, [](void* ptr)
             {
-                maskPtr[idx] = isMissing(idx);
-            }
+                delete static_cast<std::vector<T>*>(ptr);
+            });
 
-            // Create a masked array from the data and mask arrays
-            py::object numpyModule = py::module::import("numpy");
-            py::array maskedArray = numpyModule.attr("ma").attr("masked_array")(data, mask);
-            numpyModule.attr("ma").attr("set_fill_value")(maskedArray, missingValue());
+            py::array_t<T> data(dims_, buffer->data(), owner);
+            return _makeMaskedArray(data, *buffer);
+        }
 
-            return maskedArray;
+        template<typename U = void>
+        py::array _releaseNumpyArray(
+            typename std::enable_if<std::is_same<T, std::string>::value, U>::type* = nullptr)
+        {
+            // Python strings have to be made for every element anyway.
+            return _getNumpyArray();
         }
 
         template<typename U = void>
@@ -300,15 +331,24 @@ namespace Ingester
             py::array data = numpyModule.attr("array")(pyStrList, py::dtype("O"));
             data = data.attr("reshape")(dims_);
 
+            return _makeMaskedArray(data, data_);
+        }
+
+        /// \brief Wrap a numpy array of the data in a masked array, masking the elements of
+        /// values that are missing.
+        py::array _makeMaskedArray(const py::array& data, const std::vector<T>& values) const
+        {
             // Create the mask array
             py::array_t<bool> mask(dims_);
             bool* maskPtr = static_cast<bool*>(mask.mutable_data());
-            for (size_t idx = 0; idx < data_.size(); idx++)
+            const T missing = missingValue();
+            for (size_t idx = 0; idx < values.size(); idx++)
             {
-                maskPtr[idx] = isMissing(idx);
+                maskPtr[idx] = (values[idx] == missing);
             }
 
-            // Create a masked array from the data and mask arrays
+            // Create a masked array from the data and mask arrays (neither is copied)
+            py::object numpyModule = py::module::import("numpy");
             py::array maskedArray = numpyModule.attr("ma").attr("masked_array")(data, mask);
             numpyModule.attr("ma").attr("set_fill_value")(maskedArray, missingValue());
 
@@ -335,6 +375,26 @@ namespace Ingester
             return var;
         };
 
+        /// \brief Writes the data into an existing ioda::Variable starting at the given index
+        /// of its first (Location) dimension, which must already be large enough.
+        /// \param var The variable to write into
+        /// \param locOffset Location index where the first row of the data goes
+        void appendToVariable(ioda::Variable& var, ioda::Dimensions_t locOffset) const final
+        {
+            const auto dims = getDims();
+            std::vector<ioda::Dimensions_t> count(dims.begin(), dims.end());
+            std::vector<ioda::Dimensions_t> start(count.size(), 0);
+
+            ioda::Selection memSelection;
+            memSelection.extent(count).select({ioda::SelectionOperator::SET, start, count});
+
+            start[0] = locOffset;
+            ioda::Selection fileSelection;
+            fileSelection.select({ioda::SelectionOperator::SET, start, count});
+
+            var.write(data_, memSelection, fileSelection);
+        }
+
         /// \brief Makes a new dimension scale using this data object as the source
         /// \param name The name of the dimension variable.
         /// \param dimIdx The idx of the data dimension to use.
@@ -20,6 +20,7 @@ namespace
         const char* Dimensions = "dimensions";
         const char* Variables = "variables";
         const char* Globals = "globals";
+        const char* Threads = "threads";
 
         namespace Dimension
         {
@@ -84,6 +85,17 @@ namespace Ingester
             }
         }
 
+        if (conf.has(ConfKeys::Threads))
+        {
+            const auto numThreads = conf.getInt(ConfKeys::Threads);
+            if (numThreads < 1)
+            {
+                throw eckit::BadParameter("ioda::threads must be at least 1.");
+            }
+
+            numThreads_ = static_cast<size_t>(numThreads);
+        }
+
         if (conf.has(ConfKeys::Dimensions))
         {
             auto dimConfs = conf.getSubConfigurations(ConfKeys::Dimensions);
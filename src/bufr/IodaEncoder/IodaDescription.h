@@ -112,10 +112,12 @@ namespace Ingester
         // Setters
         inline void setBackend(const ioda::Engines::BackendNames& backend) { backend_ = backend; }
         inline void setFilepath(const std::string& filepath) { filepath_ = filepath; }
+        inline void setNumThreads(size_t numThreads) { numThreads_ = numThreads; }
 
         // Getters
         inline ioda::Engines::BackendNames getBackend() const { return backend_; }
         inline std::string getFilepath() const { return filepath_; }
+        inline size_t getNumThreads() const { return numThreads_; }
         inline DimDescriptions getDims() const { return dimensions_; }
         inline VariableDescriptions getVariables() const { return variables_; }
         inline GlobalDescriptions getGlobals() const { return globals_; }
@@ -127,6 +129,9 @@ namespace Ingester
         /// \brief The relative path of the output file to create
         std::string filepath_;
 
+        /// \brief The number of threads used to encode the categories
+        size_t numThreads_ = 1;
+
         /// \brief Collection of defined dimensions
         DimDescriptions dimensions_;
 
@@ -7,10 +7,15 @@
 
 #include "IodaEncoder.h"
 
+#include <algorithm>
+#include <atomic>
+#include <future>  // NOLINT
 #include <memory>
 #include <map>
+#include <numeric>
 #include <string>
 #include <sstream>
+#include <vector>
 
 #include "eckit/exception/Exceptions.h"
 #include "oops/util/Logger.h"
@@ -32,11 +37,7 @@ namespace Ingester
     std::map<SubCategory, ioda::ObsGroup>
         IodaEncoder::encode(const std::shared_ptr<DataContainer>& dataContainer, bool append)
     {
-        auto backendParams = ioda::Engines::BackendCreationParameters();
-        std::map<SubCategory, ioda::ObsGroup> obsGroups;
-
         // Get the named dimensions
-        NamedPathDims namedLocDims;
         NamedPathDims namedExtraDims;
 
         // Get a list of all the named dimensions
@@ -80,238 +81,395 @@ namespace Ingester
             }
         }
 
-        // Got through each unique category
-        for (const auto& categories : dataContainer->allSubCategories())
-        {
-            // Create the dimensions variables
-            std::map<std::string, std::shared_ptr<DimensionDataBase>> dimMap;
+        // Encode the categories (they share no output) on a pool of threads, each thread taking
+        // the next category that is left until all are done.
+        const auto allCategories = dataContainer->allSubCategories();
+        std::vector<std::optional<ioda::ObsGroup>> categoryObsGroups(allCategories.size());
+        std::atomic<size_t> nextCatIdx(0);
+        std::mutex backendMutex;
 
-            auto dataObjectGroupBy = dataContainer->getGroupByObject(
-                description_.getVariables()[0].source, categories);
-
-            // When we find that the primary index is zero we need to skip this category
-            if (dataObjectGroupBy->getDims()[0] == 0)
+        auto encodeCategories = [&]()
+        {
+            try
             {
-                for (auto category : categories)
+                for (auto catIdx = nextCatIdx++;
+                     catIdx < allCategories.size();
+                     catIdx = nextCatIdx++)
                 {
-                    oops::Log::warning() << "  Skipped category " << category << std::endl;
+                    categoryObsGroups[catIdx] = encodeCategory(dataContainer,
+                                                               allCategories[catIdx],
+                                                               append,
+                                                               namedExtraDims,
+                                                               backendMutex);
                 }
-
-                continue;
             }
+            catch (...)
+            {
+                // Stop the other threads from starting more categories
+                nextCatIdx = allCategories.size();
+                throw;
+            }
+        };
 
-            // Create the root Location dimension for this category
-            auto rootDim = std::make_shared<DimensionData<int>>(dataObjectGroupBy->getDims()[0]);
-            rootDim->dimScale =
-                ioda::NewDimensionScale<int>(LocationName, dataObjectGroupBy->getDims()[0]);
-            dimMap[LocationName] = rootDim;
+        const auto numThreads = std::min(description_.getNumThreads(), allCategories.size());
+        if (numThreads <= 1)
+        {
+            encodeCategories();
+        }
+        else
+        {
+            std::vector<std::future<void>> threads;
+            for (size_t threadIdx = 0; threadIdx < numThreads; threadIdx++)
+            {
+                threads.push_back(std::async(std::launch::async, encodeCategories));
+            }
 
-            // Add the root Location dimension as a named dimension
-            auto rootLocation = DimensionDescription();
-            rootLocation.name = LocationName;
-            rootLocation.source = "";
-            namedLocDims[{dataObjectGroupBy->getDimPaths()[0]}] = rootLocation;
+            // Wait for all the threads before any error is rethrown
+            for (auto& thread : threads) thread.wait();
+            for (auto& thread : threads) thread.get();
+        }
 
-            // Create the dimension data for dimensions which include source data
-            for (const auto& dimDesc : description_.getDims())
+        std::map<SubCategory, ioda::ObsGroup> obsGroups;
+        for (size_t catIdx = 0; catIdx < allCategories.size(); catIdx++)
+        {
+            if (categoryObsGroups[catIdx])
             {
-                if (!dimDesc.source.empty())
-                {
-                    auto dataObject = dataContainer->get(dimDesc.source, categories);
+                obsGroups.insert({allCategories[catIdx], *categoryObsGroups[catIdx]});
+                obsGroups_.insert_or_assign(allCategories[catIdx], *categoryObsGroups[catIdx]);
+            }
+        }
 
-                    // Validate the path for the source field makes sense for the dimension
-                    if (std::find(dimDesc.paths.begin(),
-                                  dimDesc.paths.end(),
-                                  dataObject->getDimPaths().back()) == dimDesc.paths.end())
-                    {
-                        std::stringstream errStr;
-                        errStr << "ioda::dimensions: Source field " << dimDesc.source << " in ";
-                        errStr << dimDesc.name << " is not in the correct path.";
-                        throw eckit::BadParameter(errStr.str());
-                    }
+        return obsGroups;
+    }
 
-                    // Create the dimension data
-                    dimMap[dimDesc.name] = dataObject->createDimensionFromData(
-                        dimDesc.name,
-                        dataObject->getDimPaths().size() - 1);
-                }
-            }
+    std::optional<ioda::ObsGroup>
+        IodaEncoder::encodeCategory(const std::shared_ptr<DataContainer>& dataContainer,
+                                    const SubCategory& categories,
+                                    bool append,
+                                    NamedPathDims namedExtraDims,
+                                    std::mutex& backendMutex) const
+    {
+        auto backendParams = ioda::Engines::BackendCreationParameters();
+        NamedPathDims namedLocDims;
 
-            // Discover and create the dimension data for dimensions with no source field. If
-            // dim is un-named (not listed) then call it dim_<number>
-            int autoGenDimNumber = 2;
-            for (const auto& varDesc : description_.getVariables())
-            {
-                auto dataObject = dataContainer->get(varDesc.source, categories);
+        // Only the in memory backend can be used from several threads at once, so the other
+        // (HDF5) backends are locked while they are called. Everything that only reads the
+        // DataContainer (the data objects, dimension data and dimension names of each variable)
+        // is worked out before, so other threads can do it while one writes.
+        std::unique_lock<std::mutex> backendLock(backendMutex, std::defer_lock);
+        const bool lockBackend =
+            (description_.getBackend() != ioda::Engines::BackendNames::ObsStore);
 
-                for (std::size_t dimIdx  = 1; dimIdx < dataObject->getDimPaths().size(); dimIdx++)
-                {
-                    auto dimPath = dataObject->getDimPaths()[dimIdx];
-                    std::string dimName = "";
+        // Create the dimensions variables
+        std::map<std::string, std::shared_ptr<DimensionDataBase>> dimMap;
 
-                    if (existsInNamedPath(dimPath, namedExtraDims))
-                    {
-                        dimName = dimForDimPath(dimPath, namedExtraDims).name;
-                    }
-                    else
-                    {
-                        auto newDimStr = std::ostringstream();
-                        newDimStr << DefualtDimName << "_" << autoGenDimNumber;
+        auto dataObjectGroupBy = dataContainer->getGroupByObject(
+            description_.getVariables()[0].source, categories);
 
-                        dimName = newDimStr.str();
+        // When we find that the primary index is zero we need to skip this category
+        if (dataObjectGroupBy->getDims()[0] == 0)
+        {
+            for (auto category : categories)
+            {
+                oops::Log::warning() << "  Skipped category " << category << std::endl;
+            }
 
-                        auto dimDesc = DimensionDescription();
-                        dimDesc.name = dimName;
-                        dimDesc.source = "";
+            return std::nullopt;
+        }
 
-                        namedExtraDims[{dimPath}] = dimDesc;
-                        autoGenDimNumber++;
-                    }
+        // Get the data for each variable
+        std::vector<VariableData> varsData;
+        for (const auto& varDesc : description_.getVariables())
+        {
+            auto varData = VariableData();
+            varData.description = varDesc;
+            varData.dataObject = dataContainer->get(varDesc.source, categories);
+            varsData.push_back(varData);
+        }
 
-                    if (dimMap.find(dimName) == dimMap.end())
-                    {
-                        dimMap[dimName] = dataObject->createEmptyDimension(dimName, dimIdx);
-                    }
+        if (append && obsGroups_.find(categories) != obsGroups_.end())
+        {
+            auto obsGroup = obsGroups_.at(categories);
+            if (lockBackend) backendLock.lock();
+            appendToObsGroup(obsGroup, dataObjectGroupBy->getDims()[0], varsData);
+            return obsGroup;
+        }
+
+        // Create the root Location dimension for this category (unlimited so more data can
+        // be appended)
+        const auto numLocs = dataObjectGroupBy->getDims()[0];
+        auto rootDim = std::make_shared<DimensionData<int>>(numLocs);
+        rootDim->dimScale =
+            ioda::NewDimensionScale<int>(LocationName, numLocs, ioda::Unlimited, numLocs);
+        dimMap[LocationName] = rootDim;
+
+        // Add the root Location dimension as a named dimension
+        auto rootLocation = DimensionDescription();
+        rootLocation.name = LocationName;
+        rootLocation.source = "";
+        namedLocDims[{dataObjectGroupBy->getDimPaths()[0]}] = rootLocation;
+
+        // Create the dimension data for dimensions which include source data
+        for (const auto& dimDesc : description_.getDims())
+        {
+            if (!dimDesc.source.empty())
+            {
+                auto dataObject = dataContainer->get(dimDesc.source, categories);
+
+                // Validate the path for the source field makes sense for the dimension
+                if (std::find(dimDesc.paths.begin(),
+                              dimDesc.paths.end(),
+                              dataObject->getDimPaths().back()) == dimDesc.paths.end())
+                {
+                    std::stringstream errStr;
+                    errStr << "ioda::dimensions: Source field " << dimDesc.source << " in ";
+                    errStr << dimDesc.name << " is not in the correct path.";
+                    throw eckit::BadParameter(errStr.str());
                 }
+
+                // Create the dimension data
+                dimMap[dimDesc.name] = dataObject->createDimensionFromData(
+                    dimDesc.name,
+                    dataObject->getDimPaths().size() - 1);
             }
+        }
 
-            // Make the filename string
-            if (description_.getBackend() == ioda::Engines::BackendNames::Hdf5File)
+        // Discover and create the dimension data for dimensions with no source field. If
+        // dim is un-named (not listed) then call it dim_<number>
+        int autoGenDimNumber = 2;
+        for (const auto& varData : varsData)
+        {
+            const auto& dataObject = varData.dataObject;
+
+            for (std::size_t dimIdx  = 1; dimIdx < dataObject->getDimPaths().size(); dimIdx++)
             {
-                std::string filename = description_.getFilepath();
+                auto dimPath = dataObject->getDimPaths()[dimIdx];
+                std::string dimName = "";
 
-                size_t catIdx = 0;
-                std::map<std::string, std::string> substitutions;
-                for (const auto &catPair : dataContainer->getCategoryMap())
+                if (existsInNamedPath(dimPath, namedExtraDims))
                 {
-                    substitutions.insert({catPair.first, categories.at(catIdx)});
-                    catIdx++;
+                    dimName = dimForDimPath(dimPath, namedExtraDims).name;
                 }
+                else
+                {
+                    auto newDimStr = std::ostringstream();
+                    newDimStr << DefualtDimName << "_" << autoGenDimNumber;
 
-                backendParams.fileName = makeStrWithSubstitions(filename, substitutions);
-            }
+                    dimName = newDimStr.str();
 
-            backendParams.openMode = ioda::Engines::BackendOpenModes::Read_Write;
-            backendParams.createMode = ioda::Engines::BackendCreateModes::Truncate_If_Exists;
-            backendParams.action = append ? ioda::Engines::BackendFileActions::Open : \
-                                        ioda::Engines::BackendFileActions::Create;
-            backendParams.flush = true;
-            backendParams.allocBytes = dataContainer->size(categories);
+                    auto dimDesc = DimensionDescription();
+                    dimDesc.name = dimName;
+                    dimDesc.source = "";
 
-            auto rootGroup = ioda::Engines::constructBackend(description_.getBackend(),
-                                                             backendParams);
+                    namedExtraDims[{dimPath}] = dimDesc;
+                    autoGenDimNumber++;
+                }
 
-            ioda::NewDimensionScales_t allDims;
-            for (auto dimPair : dimMap)
+                if (dimMap.find(dimName) == dimMap.end())
+                {
+                    dimMap[dimName] = dataObject->createEmptyDimension(dimName, dimIdx);
+                }
+            }
+        }
+
+        // Find the names of the dimensions of the source fields (they are all written with
+        // their data) and of each variable
+        auto dimNamesFor = [&](const std::shared_ptr<DataObjectBase>& dataObject)
+        {
+            std::vector<std::string> dimNames;
+            for (size_t dimIdx = 0; dimIdx < dataObject->getDims().size(); dimIdx++)
             {
-                allDims.push_back(dimPair.second->dimScale);
+                auto dimPath = dataObject->getDimPaths()[dimIdx];
+                const auto& namedPathDims = (dimIdx == 0) ? namedLocDims : namedExtraDims;
+                dimNames.push_back(dimForDimPath(dimPath, namedPathDims).name);
             }
 
-            auto policy = ioda::detail::DataLayoutPolicy::Policies::ObsGroup;
-            auto layoutPolicy = ioda::detail::DataLayoutPolicy::generate(policy);
-            auto obsGroup = ioda::ObsGroup::generate(rootGroup, allDims, layoutPolicy);
+            return dimNames;
+        };
 
-            // Create Globals
-            for (auto& global : description_.getGlobals())
+        std::vector<std::string> sourceDimNames;
+        for (const auto& dimDesc : description_.getDims())
+        {
+            if (!dimDesc.source.empty())
             {
-                global->addTo(rootGroup);
+                auto dimNames = dimNamesFor(dataContainer->get(dimDesc.source, categories));
+                sourceDimNames.insert(sourceDimNames.end(), dimNames.begin(), dimNames.end());
             }
+        }
+
+        for (auto& varData : varsData)
+        {
+            varData.dimNames = dimNamesFor(varData.dataObject);
+        }
 
-            // Write the Dimension Variables
-            for (const auto& dimDesc : description_.getDims())
+        // Make the filename string
+        if (description_.getBackend() == ioda::Engines::BackendNames::Hdf5File)
+        {
+            std::string filename = description_.getFilepath();
+
+            size_t catIdx = 0;
+            std::map<std::string, std::string> substitutions;
+            for (const auto &catPair : dataContainer->getCategoryMap())
             {
-                if (!dimDesc.source.empty())
-                {
-                    auto dataObject = dataContainer->get(dimDesc.source, categories);
-                    for (size_t dimIdx = 0; dimIdx < dataObject->getDims().size(); dimIdx++)
-                    {
-                        auto dimPath = dataObject->getDimPaths()[dimIdx];
-
-                        NamedPathDims namedPathDims;
-                        if (dimIdx == 0)
-                        {
-                            namedPathDims = namedLocDims;
-                        }
-                        else
-                        {
-                            namedPathDims = namedExtraDims;
-                        }
-
-                        auto dimName = dimForDimPath(dimPath, namedPathDims).name;
-                        auto dimVar = obsGroup.vars[dimName];
-                        dimMap[dimName]->write(dimVar);
-                    }
-                }
+                substitutions.insert({catPair.first, categories.at(catIdx)});
+                catIdx++;
             }
 
-            // Write all the other Variables
-            for (const auto& varDesc : description_.getVariables())
-            {
-                std::vector<ioda::Dimensions_t> chunks;
-                auto dimensions = std::vector<ioda::Variable>();
-                auto dataObject = dataContainer->get(varDesc.source, categories);
-                for (size_t dimIdx = 0; dimIdx < dataObject->getDims().size(); dimIdx++)
-                {
-                    auto dimPath = dataObject->getDimPaths()[dimIdx];
+            backendParams.fileName = makeStrWithSubstitions(filename, substitutions);
+        }
 
-                    NamedPathDims namedPathDims;
-                    if (dimIdx == 0)
-                    {
-                        namedPathDims = namedLocDims;
-                    }
-                    else
-                    {
-                        namedPathDims = namedExtraDims;
-                    }
+        backendParams.openMode = ioda::Engines::BackendOpenModes::Read_Write;
+        backendParams.createMode = ioda::Engines::BackendCreateModes::Truncate_If_Exists;
+        backendParams.action = ioda::Engines::BackendFileActions::Create;
+        backendParams.flush = true;
+        backendParams.allocBytes = dataContainer->size(categories);
 
-                    auto dimVar = obsGroup.vars[dimForDimPath(dimPath, namedPathDims).name];
-                    dimensions.push_back(dimVar);
+        ioda::NewDimensionScales_t allDims;
+        for (auto dimPair : dimMap)
+        {
+            allDims.push_back(dimPair.second->dimScale);
+        }
 
-                    if (dimIdx < varDesc.chunks.size())
-                    {
-                        chunks.push_back(std::min(dimVar.getChunkSizes()[0],
-                                                  varDesc.chunks[dimIdx]));
-                    }
-                    else
-                    {
-                        chunks.push_back(dimVar.getChunkSizes()[0]);
-                    }
-                }
+        auto policy = ioda::detail::DataLayoutPolicy::Policies::ObsGroup;
+        auto layoutPolicy = ioda::detail::DataLayoutPolicy::generate(policy);
 
-                auto var = dataObject->createVariable(obsGroup,
-                                                      varDesc.name,
-                                                      dimensions,
-                                                      chunks,
-                                                      varDesc.compressionLevel);
+        // Only the backend calls are left
+        if (lockBackend) backendLock.lock();
 
-                var.atts.add<std::string>("long_name", { varDesc.longName }, {1});
+        auto rootGroup = ioda::Engines::constructBackend(description_.getBackend(),
+                                                         backendParams);
 
-                if (!varDesc.units.empty())
-                {
-                    var.atts.add<std::string>("units", { varDesc.units }, {1});
-                }
+        auto obsGroup = ioda::ObsGroup::generate(rootGroup, allDims, layoutPolicy);
+
+        // Create Globals
+        for (auto& global : description_.getGlobals())
+        {
+            global->addTo(rootGroup);
+        }
 
-                if (varDesc.coordinates)
+        // Write the Dimension Variables
+        for (const auto& dimName : sourceDimNames)
+        {
+            auto dimVar = obsGroup.vars[dimName];
+            dimMap[dimName]->write(dimVar);
+        }
+
+        // Write all the other Variables
+        for (const auto& varData : varsData)
+        {
+            const auto& varDesc = varData.description;
+
+            std::vector<ioda::Dimensions_t> chunks;
+            auto dimensions = std::vector<ioda::Variable>();
+            for (size_t dimIdx = 0; dimIdx < varData.dimNames.size(); dimIdx++)
+            {
+                auto dimVar = obsGroup.vars[varData.dimNames[dimIdx]];
+                dimensions.push_back(dimVar);
+
+                if (dimIdx < varDesc.chunks.size())
                 {
-                    var.atts.add<std::string>("coordinates", { *varDesc.coordinates }, {1});
+                    chunks.push_back(std::min(dimVar.getChunkSizes()[0],
+                                              varDesc.chunks[dimIdx]));
                 }
-
-                if (varDesc.range)
+                else
                 {
-                    var.atts.add<float>("valid_range",
-                                            {varDesc.range->start, varDesc.range->end},
-                                            {2});
+                    chunks.push_back(dimVar.getChunkSizes()[0]);
                 }
             }
 
-            obsGroups.insert({categories, obsGroup});
+            auto var = varData.dataObject->createVariable(obsGroup,
+                                                          varDesc.name,
+                                                          dimensions,
+                                                          chunks,
+                                                          varDesc.compressionLevel);
+
+            var.atts.add<std::string>("long_name", { varDesc.longName }, {1});
+
+            if (!varDesc.units.empty())
+            {
+                var.atts.add<std::string>("units", { varDesc.units }, {1});
+            }
+
+            if (varDesc.coordinates)
+            {
+                var.atts.add<std::string>("coordinates", { *varDesc.coordinates }, {1});
+            }
+
+            if (varDesc.range)
+            {
+                var.atts.add<float>("valid_range",
+                                        {varDesc.range->start, varDesc.range->end},
+                                        {2});
+            }
         }
 
-        return obsGroups;
+        return obsGroup;
+    }
+
+    void IodaEncoder::appendToObsGroup(ioda::ObsGroup& obsGroup,
+                                       ioda::Dimensions_t numLocs,
+                                       const std::vector<VariableData>& varsData) const
+    {
+        auto locationVar = obsGroup.vars.open(LocationName);
+        const auto locOffset = locationVar.getDimensions().dimsCur[0];
+        obsGroup.resize({{locationVar, locOffset + numLocs}});
+
+        // Carry on the Location values the way encodeCategory wrote them for the first data.
+        // ioda numbers a new Location scale from 1, but writing a dimension with source data
+        // also writes the (0 filled) root dimension data over it.
+        {
+            const auto& dims = description_.getDims();
+            const bool locationsFromData =
+                std::any_of(dims.begin(), dims.end(),
+                            [](const auto& dimDesc) { return !dimDesc.source.empty(); });
+
+            std::vector<int> locations(numLocs, 0);
+            if (!locationsFromData)
+            {
+                std::iota(locations.begin(), locations.end(), static_cast<int>(locOffset) + 1);
+            }
+
+            const std::vector<ioda::Dimensions_t> count = {numLocs};
+            ioda::Selection memSelection;
+            memSelection.extent(count).select({ioda::SelectionOperator::SET, {0}, count});
+
+            ioda::Selection fileSelection;
+            fileSelection.select({ioda::SelectionOperator::SET, {locOffset}, count});
+
+            locationVar.write(locations, memSelection, fileSelection);
+        }
+
+        for (const auto& varData : varsData)
+        {
+            const auto& varDesc = varData.description;
+            const auto& dataObject = varData.dataObject;
+            auto var = obsGroup.vars.open(varDesc.name);
+
+            // Only the Location dimension can grow, the others must match what was written
+            const auto varDims = var.getDimensions().dimsCur;
+            const auto dataDims = dataObject->getDims();
+            bool dimsMatch = (varDims.size() == dataDims.size());
+            for (size_t dimIdx = 1; dimsMatch && dimIdx < dataDims.size(); dimIdx++)
+            {
+                dimsMatch = (varDims[dimIdx] == dataDims[dimIdx]);
+            }
+
+            if (!dimsMatch)
+            {
+                std::ostringstream errStr;
+                errStr << "IodaEncoder: Can't append " << varDesc.name << ", the sizes of its ";
+                errStr << "non Location dimensions differ from the data written before. ";
+                errStr << "Encode all the data at once instead.";
+                throw eckit::BadValue(errStr.str());
+            }
+
+            dataObject->appendToVariable(var, locOffset);
+        }
     }
 
-    std::string IodaEncoder::makeStrWithSubstitions(const std::string& prototype,
-                                                   const std::map<std::string, std::string>& subMap)
+    std::string IodaEncoder::makeStrWithSubstitions(
+        const std::string& prototype,
+        const std::map<std::string, std::string>& subMap) const
     {
         auto resultStr = prototype;
         auto subIdxs = findSubIdxs(prototype);
@@ -339,7 +497,7 @@ namespace Ingester
     }
 
     std::vector<std::pair<std::string, std::pair<int, int>>>
-    IodaEncoder::findSubIdxs(const std::string& str)
+    IodaEncoder::findSubIdxs(const std::string& str) const
     {
         std::vector<std::pair<std::string, std::pair<int, int>>>  result;
 
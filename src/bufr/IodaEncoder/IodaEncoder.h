@@ -7,7 +7,13 @@
 
 #pragma once
 
+#include <map>
 #include <memory>
+#include <mutex>  // NOLINT
+#include <optional>
+#include <string>
+#include <utility>
+#include <vector>
 
 #include "eckit/config/LocalConfiguration.h"
 #include "ioda/Group.h"
@@ -28,7 +34,11 @@ namespace Ingester
 
         /// \brief Encode the data into an ioda::ObsGroup object
         /// \param data The data container to use
-        /// \param append Add data to existing file?
+        /// \param append Append the data along the Location dimension of the ObsGroups made by
+        ///        the previous encode calls (ex: to write a file one parsed chunk at a time).
+        ///        Categories that were not seen before get new ObsGroups.
+        /// \details The categories (ex: one per satellite for a CategorySplit) are encoded on
+        ///          the number of threads set by ioda::threads in the description.
         std::map<SubCategory, ioda::ObsGroup> encode(const std::shared_ptr<DataContainer>& data,
                                                     bool append = false);
 
@@ -38,16 +48,51 @@ namespace Ingester
         /// \brief The description
         const IodaDescription description_;
 
+        /// \brief The ObsGroups made so far, kept so later data can be appended to them
+        std::map<SubCategory, ioda::ObsGroup> obsGroups_;
+
+        /// \brief A variable to write for a category, found before the backend is locked
+        struct VariableData
+        {
+            VariableDescription description;
+            std::shared_ptr<DataObjectBase> dataObject;
+            std::vector<std::string> dimNames;  // Empty when appending
+        };
+
+        /// \brief Encode the data for one category into a new ObsGroup, or append it to the
+        ///        ObsGroup made for the category by a previous encode call.
+        /// \param dataContainer The data container to use
+        /// \param categories The category to encode
+        /// \param append Append to the ObsGroup made before for the category (if any)
+        /// \param namedExtraDims The named (non Location) dimensions from the description
+        /// \param backendMutex Held while the backend is called (creating and writing the
+        ///        ObsGroup), except with the in memory backend
+        /// \return The ObsGroup, or nothing if the category has no locations
+        std::optional<ioda::ObsGroup>
+        encodeCategory(const std::shared_ptr<DataContainer>& dataContainer,
+                       const SubCategory& categories,
+                       bool append,
+                       NamedPathDims namedExtraDims,
+                       std::mutex& backendMutex) const;
+
+        /// \brief Append the data for a category to the end of an existing ObsGroup.
+        /// \param obsGroup The ObsGroup made by a previous encode call for the category
+        /// \param numLocs The number of locations to append
+        /// \param varsData The variables to append
+        void appendToObsGroup(ioda::ObsGroup& obsGroup,
+                              ioda::Dimensions_t numLocs,
+                              const std::vector<VariableData>& varsData) const;
+
         /// \brief Create a string from a template string.
         /// \param prototype A template string ex: "my {dogType} barks". Sections labeled {__key__}
         ///        are treated as keys into the dictionary that defines their replacment values.
         std::string makeStrWithSubstitions(const std::string& prototype,
-                                           const std::map<std::string, std::string>& subMap);
+                                           const std::map<std::string, std::string>& subMap) const;
 
         /// \brief Used to find indicies of { and } by the makeStrWithSubstitions method.
         /// \param str Template string to search.
         std::vector<std::pair<std::string, std::pair<int, int>>>
-        findSubIdxs(const std::string& str);
+        findSubIdxs(const std::string& str) const;
 
         /// \brief Check if the subquery string is a named dimension.
         /// \param path The subquery string to check.
@@ -7,6 +7,9 @@
 
 #pragma once
 
+#include <functional>
+#include <memory>
+
 #include "eckit/config/LocalConfiguration.h"
 
 #include "DataContainer.h"
@@ -25,6 +28,18 @@ namespace Ingester
         /// \param maxMsgsToParse Messages to parse (0 for everything)
         virtual std::shared_ptr<DataContainer> parse(const size_t maxMsgsToParse = 0) = 0;
 
+        /// \brief Parse the input in chunks of (up to) msgsPerChunk messages, handing each
+        /// chunk's data to processChunk before the next one is parsed. This bounds the memory
+        /// needed to the size of a chunk. The default implementation parses everything at once.
+        /// \param msgsPerChunk Messages per chunk (0 for everything in one chunk)
+        /// \param processChunk Called with the data of each chunk, in order
+        virtual void parseChunks(
+            const size_t msgsPerChunk,
+            const std::function<void(const std::shared_ptr<DataContainer>&)>& processChunk)
+        {
+            processChunk(parse());
+        }
+
         /// \brief Start over from the beginning
         virtual void reset() = 0;
     };
@@ -5,6 +5,7 @@
  * which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
  */
 
+#include <future>  // NOLINT
 #include <string>
 #include <iostream>
 #include <ostream>
@@ -23,7 +24,31 @@ namespace Ingester
 {
     typedef ObjectFactory<Ingester::Parser, const eckit::LocalConfiguration&> ParseFactory;
 
-    void parse(const std::string& yamlPath, std::size_t numMsgs = 0)
+    /// \brief Parse and encode the file one chunk of messages at a time, so that only a chunk
+    /// worth of data is in memory at once. Each chunk is encoded (appended to the output) on
+    /// another thread while the next one is parsed.
+    void parseInChunks(Parser& parser, IodaEncoder& encoder, std::size_t msgsPerChunk)
+    {
+        std::future<void> encoding;
+        bool append = false;
+
+        parser.parseChunks(msgsPerChunk,
+            [&encoding, &encoder, &append](const std::shared_ptr<DataContainer>& data)
+            {
+                // Wait for the previous chunk (also rethrows its errors)
+                if (encoding.valid()) encoding.get();
+
+                encoding = std::async(std::launch::async,
+                                      [&encoder, data, append]() { encoder.encode(data, append); });
+                append = true;
+            });
+
+        if (encoding.valid()) encoding.get();
+    }
+
+    void parse(const std::string& yamlPath,
+               std::size_t numMsgs = 0,
+               std::size_t msgsPerChunk = 0)
     {
         ParseFactory parseFactory;
         parseFactory.registerObject<BufrParser>("bufr");
@@ -44,10 +69,17 @@ namespace Ingester
 
                 auto configuration = obsConf.getSubConfiguration("obs space");
                 auto parser = parseFactory.create("bufr", configuration);
-                auto data = parser->parse(numMsgs);
-
                 auto encoder = IodaEncoder(obsConf.getSubConfiguration("ioda"));
-                encoder.encode(data);
+
+                if (msgsPerChunk > 0)
+                {
+                    parseInChunks(*parser, encoder, msgsPerChunk);
+                }
+                else
+                {
+                    auto data = parser->parse(numMsgs);
+                    encoder.encode(data);
+                }
             }
         }
         else
@@ -60,10 +92,12 @@ namespace Ingester
 
 static void showHelp()
 {
-    std::cerr << "Usage: bufr2ioda.x [-n NUM_MESSAGES] YAML_PATH"
+    std::cerr << "Usage: bufr2ioda.x [-n NUM_MESSAGES] [-c CHUNK_MESSAGES] YAML_PATH"
               << "Options:\n"
               << "  -h,  Show this help message\n"
-              << "  -n NUM_MESSAGES,  Number of BUFR messages to parse."
+              << "  -n NUM_MESSAGES,  Number of BUFR messages to parse.\n"
+              << "  -c CHUNK_MESSAGES,  Parse and write the whole file CHUNK_MESSAGES BUFR messages"
+              << " at a time to bound the memory used (-n is ignored)."
               << std::endl;
 }
 
@@ -78,6 +112,7 @@ int main(int argc, char **argv)
 
     std::string yamlPath;
     std::size_t numMsgs = 0;
+    std::size_t msgsPerChunk = 0;
 
     std::size_t argIdx = 1;
     while (argIdx < static_cast<std::size_t> (argc))
@@ -96,6 +131,20 @@ int main(int argc, char **argv)
 
             argIdx += 2;
         }
+        else if (strcmp(argv[argIdx], "-c") == 0)
+        {
+            if (static_cast<std::size_t> (argc) > argIdx + 1)
+            {
+                msgsPerChunk = atoi(argv[argIdx + 1]);
+            }
+            else
+            {
+                showHelp();
+                return 0;
+            }
+
+            argIdx += 2;
+        }
         else if (strcmp(argv[argIdx], "-h") == 0)
         {
             showHelp();
@@ -108,11 +157,11 @@ int main(int argc, char **argv)
         }
     }
 
-    Ingester::parse(yamlPath, numMsgs);
+    Ingester::parse(yamlPath, numMsgs, msgsPerChunk);
 
     try
     {
-//        Ingester::parse(yamlPath, numMsgs);
+//        Ingester::parse(yamlPath, numMsgs, msgsPerChunk);
     }
     catch (const std::exception &e)
     {
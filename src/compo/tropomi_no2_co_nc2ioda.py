@@ -13,13 +13,14 @@ import numpy as np
 import os
 
 import pyiodaconv.ioda_conv_engines as iconv
+import pyiodaconv.thinning_utils as thinning
 from collections import defaultdict, OrderedDict
 from pyiodaconv.orddicts import DefaultOrderedDict
 
 locationKeyList = [
     ("latitude", "float"),
     ("longitude", "float"),
-    ("dateTime", "string"),
+    ("dateTime", "long"),
 ]
 
 AttrData = {
@@ -32,12 +33,13 @@ DimDict = {
 
 
 class tropomi(object):
-    def __init__(self, filenames, varname, columnType, qa_flg, thin, obsVar):
+    def __init__(self, filenames, varname, columnType, qa_flg, thin, obsVar, thinner=None):
         self.filenames = filenames
         self.varname = varname
         self.columnType = columnType
         self.qa_flg = qa_flg
         self.thin = thin
+        self.thinner = thinner
         self.obsVar = obsVar
         self.varDict = defaultdict(lambda: defaultdict(dict))
         self.outdata = defaultdict(lambda: DefaultOrderedDict(OrderedDict))
@@ -58,8 +60,8 @@ class tropomi(object):
         self.varAttrs[iodavar, iconv.OqcName()]['coordinates'] = 'longitude latitude'
         self.varAttrs[iodavar, iconv.OvalName()]['units'] = 'mol m-2'
         self.varAttrs[iodavar, iconv.OerrName()]['units'] = 'mol m-2'
-        # loop through input filenames
-        first = True
+        # loop through input filenames, concatenating once at the end
+        obs = iconv.ChunkedObsData()
         for f in self.filenames:
             ncd = nc.Dataset(f, 'r')
 
@@ -74,7 +76,7 @@ class tropomi(object):
             nlocs = len(lats)
             lons = ncd.groups['PRODUCT'].variables['longitude'][:].ravel()
             qa_value = ncd.groups['PRODUCT'].variables['qa_value'][:]  # 2D
-            times = np.empty_like(qa_value, dtype=object)
+            npixels = qa_value.shape[-1]
             qa_value = qa_value.ravel()
             nlevs = ncd.groups['PRODUCT'].dimensions['layer'].size
 
@@ -86,10 +88,9 @@ class tropomi(object):
             qc_flag = ncd.groups['PRODUCT'].groups['SUPPORT_DATA'].groups['DETAILED_RESULTS']\
                 .variables['processing_quality_flags'][:]
             qc_flag = qc_flag.ravel().astype('int32')
+            # one time per scanline, truncated to whole seconds
             time1 = ncd.groups['PRODUCT'].variables['time_utc'][:]
-            for t in range(len(time1[0])):
-                times[0, t, :] = time1[0, t][0:19]+'Z'
-            times = times.ravel()
+            times = np.repeat(iconv.datetime_to_epoch(np.asarray(time1[0], dtype='U19')), npixels)
 
             if self.varname == 'no2':
                 # grab the averaging kernel and reshape it
@@ -134,30 +135,15 @@ class tropomi(object):
             nlocf = len(lats[flg])
             scaleAK = np.ones((nlocf, nlevs), dtype=np.float32)
 
-            if first:
-                # add metadata variables
-                self.outdata[('dateTime', 'MetaData')] = times[flg]
-                self.outdata[('latitude', 'MetaData')] = lats[flg]
-                self.outdata[('longitude', 'MetaData')] = lons[flg]
-                self.outdata[('quality_assurance_value', 'MetaData')] = qa_value[flg]
-
-                self.outdata[('averagingKernel', 'RetrievalAncillaryData')] = avg_kernel[flg]
-                self.outdata[('pressureVertice', 'RetrievalAncillaryData')] = preslv[flg]
-
-            else:
-                self.outdata[('dateTime', 'MetaData')] = np.concatenate((
-                    self.outdata[('dateTime', 'MetaData')], times[flg]))
-                self.outdata[('latitude', 'MetaData')] = np.concatenate((
-                    self.outdata[('latitude', 'MetaData')], lats[flg]))
-                self.outdata[('longitude', 'MetaData')] = np.concatenate((
-                    self.outdata[('longitude', 'MetaData')], lons[flg]))
-                self.outdata[('quality_assurance_value', 'MetaData')] = np.concatenate((
-                    self.outdata[('quality_assurance_value', 'MetaData')], qa_value[flg]))
-
-                self.outdata[('averagingKernel', 'RetrievalAncillaryData')] = np.concatenate((
-                    self.outdata[('averagingKernel', 'RetrievalAncillaryData')], avg_kernel[flg]))
-                self.outdata[('pressureVertice', 'RetrievalAncillaryData')] = np.concatenate((
-                    self.outdata[('pressureVertice', 'RetrievalAncillaryData')], preslv[flg]))
+            file_obs_data = {
+                # metadata variables
+                ('dateTime', 'MetaData'): times[flg],
+                ('latitude', 'MetaData'): lats[flg],
+                ('longitude', 'MetaData'): lons[flg],
+                ('quality_assurance_value', 'MetaData'): qa_value[flg],
+                ('averagingKernel', 'RetrievalAncillaryData'): avg_kernel[flg],
+                ('pressureVertice', 'RetrievalAncillaryData'): preslv[flg],
+            }
 
             for ncvar, iodavar in self.obsVar.items():
 
@@ -169,20 +155,21 @@ class tropomi(object):
                     data = ncd.groups['PRODUCT'].groups['SUPPORT_DATA'].groups['DETAILED_RESULTS'].variables[ncvar][:].ravel()[flg]
                     err = ncd.groups['PRODUCT'].groups['SUPPORT_DATA'].groups['DETAILED_RESULTS'].variables[ncvar+'_precision'][:].ravel()[flg]
 
-                if first:
-                    self.outdata[self.varDict[iodavar]['valKey']] = data
-                    self.outdata[self.varDict[iodavar]['errKey']] = err
-                    self.outdata[self.varDict[iodavar]['qcKey']] = qc_flag[flg]
-                else:
-                    self.outdata[self.varDict[iodavar]['valKey']] = np.concatenate(
-                        (self.outdata[self.varDict[iodavar]['valKey']], data))
-                    self.outdata[self.varDict[iodavar]['errKey']] = np.concatenate(
-                        (self.outdata[self.varDict[iodavar]['errKey']], err))
-                    self.outdata[self.varDict[iodavar]['qcKey']] = np.concatenate(
-                        (self.outdata[self.varDict[iodavar]['qcKey']], qc_flag[flg]))
+                file_obs_data[self.varDict[iodavar]['valKey']] = data
+                file_obs_data[self.varDict[iodavar]['errKey']] = err
+                file_obs_data[self.varDict[iodavar]['qcKey']] = qc_flag[flg]
+
+            obs.append(file_obs_data)
+
+        obs_data = obs.finalize()
 
-            first = False
+        # optional spatial thinning of the observations of all the files
+        # at once, keeping the highest qa value in each box
+        if self.thinner is not None:
+            obs_data = self.thinner.thin(obs_data, ('latitude', 'MetaData'), ('longitude', 'MetaData'),
+                                         qc=-obs_data[('quality_assurance_value', 'MetaData')])
 
+        self.outdata.update(obs_data)
         DimDict['Location'] = len(self.outdata[('dateTime', 'MetaData')])
         AttrData['Location'] = np.int32(DimDict['Location'])
         DimDict['Layer'] = nlevs
@@ -244,6 +231,7 @@ def main():
         help="percentage of random thinning from 0.0 to 1.0. Zero indicates"
         " no thinning is performed. (default: %(default)s)",
         type=float, default=0.0)
+    thinning.add_thinning_arguments(parser, rules=thinning.SELECT_RULES)
 
     args = parser.parse_args()
 
@@ -279,7 +267,10 @@ def main():
     varDims['pressureVertice'] = ['Location', 'Vertice']
 
     # Read in the NO2 data
-    var = tropomi(args.input, args.variable, args.column, args.qa_value, args.thin, obsVar)
+    thinner = thinning.thinner_from_args(args)
+    var = tropomi(args.input, args.variable, args.column, args.qa_value, args.thin, obsVar, thinner)
+    if thinner is not None:
+        AttrData['spatialThinning'] = str(thinner)
 
     # setup the IODA writer
     writer = iconv.IodaWriter(args.output, locationKeyList, DimDict)
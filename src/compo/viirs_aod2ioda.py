@@ -14,6 +14,7 @@ import numpy as np
 import os
 
 import pyiodaconv.ioda_conv_engines as iconv
+import pyiodaconv.thinning_utils as thinning
 from collections import defaultdict, OrderedDict
 from pyiodaconv.orddicts import DefaultOrderedDict
 
@@ -45,11 +46,12 @@ long_missing_value = nc.default_fillvals['i8']
 
 
 class AOD(object):
-    def __init__(self, filenames, method, mask, thin):
+    def __init__(self, filenames, method, mask, thin, thinner=None):
         self.filenames = filenames
         self.mask = mask
         self.method = method
         self.thin = thin
+        self.thinner = thinner
         self.varDict = defaultdict(lambda: defaultdict(dict))
         self.outdata = defaultdict(lambda: DefaultOrderedDict(OrderedDict))
         self.varAttrs = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
@@ -79,7 +81,8 @@ class AOD(object):
             self.outdata[self.varDict[iodavar]['errKey']] = np.array([], dtype=np.float32)
             self.outdata[self.varDict[iodavar]['qcKey']] = np.array([], dtype=np.int32)
 
-        # loop through input filenamess
+        # loop through input filenamess, concatenating once at the end
+        obs = iconv.ChunkedObsData()
         for f in self.filenames:
             ncd = nc.Dataset(f, 'r')
             gatts = {attr: getattr(ncd, attr) for attr in ncd.ncattrs()}
@@ -137,18 +140,29 @@ class AOD(object):
                 errs[qcpath % 4 == 2] = 0.0550472 + 0.299558*vals[qcpath % 4 == 2]   # over bright land
 
             #  Write out data
-            self.outdata[('latitude', metaDataName)] = np.append(self.outdata[('latitude', metaDataName)], np.array(lats, dtype=np.float32))
-            self.outdata[('longitude', metaDataName)] = np.append(self.outdata[('longitude', metaDataName)], np.array(lons, dtype=np.float32))
-            self.outdata[('dateTime', metaDataName)] = np.append(self.outdata[('dateTime', metaDataName)], np.array(obs_time, dtype=object))
-
+            file_obs_data = {
+                ('latitude', metaDataName): np.array(lats, dtype=np.float32),
+                ('longitude', metaDataName): np.array(lons, dtype=np.float32),
+                ('dateTime', metaDataName): np.array(obs_time, dtype=object),
+            }
             for iodavar in obsvars:
-                self.outdata[self.varDict[iodavar]['valKey']] = np.append(
-                    self.outdata[self.varDict[iodavar]['valKey']], np.array(vals, dtype=np.float32))
-                self.outdata[self.varDict[iodavar]['errKey']] = np.append(
-                    self.outdata[self.varDict[iodavar]['errKey']], np.array(errs, dtype=np.float32))
-                self.outdata[self.varDict[iodavar]['qcKey']] = np.append(
-                    self.outdata[self.varDict[iodavar]['qcKey']], np.array(qcall, dtype=np.int32))
-
+                file_obs_data[self.varDict[iodavar]['valKey']] = np.array(vals, dtype=np.float32)
+                file_obs_data[self.varDict[iodavar]['errKey']] = np.array(errs, dtype=np.float32)
+                file_obs_data[self.varDict[iodavar]['qcKey']] = np.array(qcall, dtype=np.int32)
+            obs.append(file_obs_data)
+
+        obs_data = obs.finalize()
+
+        # optional spatial thinning or superobbing of all the granules at
+        # once, preferring the best overall quality flag in each box
+        if self.thinner is not None:
+            superob_keys = [(self.varDict[iodavar]['valKey'], self.varDict[iodavar]['errKey'])
+                            for iodavar in obsvars]
+            obs_data = self.thinner.thin(obs_data, ('latitude', metaDataName), ('longitude', metaDataName),
+                                         qc=obs_data[self.varDict[obsvars[0]]['qcKey']],
+                                         superob_keys=superob_keys)
+
+        self.outdata.update(obs_data)
         DimDict['Location'] = len(self.outdata[('latitude', metaDataName)])
         DimDict['Channel'] = np.array(channels)
 
@@ -186,13 +200,17 @@ def main():
         help="percentage of random thinning fro 0.0 to 1.0. Zero indicates"
         " no thinning is performed. (default: %(default)s)",
         type=float, default=0.0)
+    thinning.add_thinning_arguments(parser)
 
     args = parser.parse_args()
 
     # setup the IODA writer
 
     # Read in the AOD data
-    aod = AOD(args.input, args.method, args.mask, args.thin)
+    thinner = thinning.thinner_from_args(args)
+    aod = AOD(args.input, args.method, args.mask, args.thin, thinner)
+    if thinner is not None:
+        AttrData['spatialThinning'] = str(thinner)
 
     # write everything out
 
@@ -14,6 +14,7 @@ from collections import defaultdict, OrderedDict
 from pyiodaconv.orddicts import DefaultOrderedDict
 import pyiodaconv.ioda_conv_engines as iconv
 import pyiodaconv.meteo_utils as meteo_utils
+import pyiodaconv.ecc_bufr_utils as ecc_bufr_utils
 
 os.environ["TZ"] = "UTC"
 
@@ -105,11 +106,17 @@ dtypes = {'string': object,
           'double': np.float64}
 
 
-def main(file_names, output_file):
+# One set of meteorological helpers, and one cache of the BUFR keys each
+# message template defines, shared by every message.
+met_utils = meteo_utils.meteo_utils()
+metadata_keys = [var for v in metaDataKeyList.values() for var in v]
+key_cache = ecc_bufr_utils.TemplateKeyCache(metadata_keys + raw_obsvars)
+
+
+def main(file_names, output_file, workers=1, categories=None, index_dir=None):
 
     # initialize
     count = [0, 0, 0]
-    start_pos = None
     start_time = time.time()
 
     obs_data = {}          # The final outputs.
@@ -123,10 +130,13 @@ def main(file_names, output_file):
     varAttrs = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
 
     for fname in file_names:
-        logging.debug("Reading file: " + fname)
         AttrData['sourceFiles'] += ", " + fname
 
-        data, count, start_pos = read_file(fname, count, start_pos, data)
+    # Decode the indexed messages of the files on the worker pool and
+    # append the results in input order.
+    tasks = ecc_bufr_utils.split_work(file_names, workers, categories, index_dir)
+    parts = ecc_bufr_utils.map_tasks(read_task, tasks, workers)
+    data, count = ecc_bufr_utils.merge_parts(data, count, parts)
 
     AttrData['sourceFiles'] = AttrData['sourceFiles'][2:]
     logging.debug("All source files: " + AttrData['sourceFiles'])
@@ -254,18 +264,35 @@ def is_all_missing(data):
     return False
 
 
-def read_file(file_name, count, start_pos, data):
+def read_task(task):
+
+    # Decode the BUFR messages at the given byte offsets of one file.
+    file_name, offsets = task
+    logging.debug(f"Reading file: {file_name} ({len(offsets)} messages)")
+
+    count = [0, 0, 0]
+    data = {}
+    for key in obsvars:
+        data[key] = []
+    for key in meta_keys:
+        data[key] = []
+
+    return read_file(file_name, count, data, offsets)
+
+
+def read_file(file_name, count, data, offsets):
 
     f = open(file_name, 'rb')
 
-    while True:
+    # The message index already skipped incomplete messages, so each
+    # message is read straight from its offset.
+    for offset in offsets:
+        f.seek(offset)
         # Use eccodes to decode each bufr message in the file
-        data, count, start_pos = read_bufr_message(f, count, start_pos, data)
+        data, count, start_pos = read_bufr_message(f, count, None, data)
 
-        if start_pos is None:
-            break
-
-    return data, count, start_pos
+    f.close()
+    return data, count
 
 
 def read_bufr_message(f, count, start_pos, data):
@@ -280,8 +307,6 @@ def read_bufr_message(f, count, start_pos, data):
     count[0] += 1
     logging.info("BUFR message number: " + str(count[0]))
 
-    met_utils = meteo_utils.meteo_utils()
-
     try:
         bufr = ecc.codes_bufr_new_from_file(f)
     except:  # noqa
@@ -295,12 +320,15 @@ def read_bufr_message(f, count, start_pos, data):
         start_pos = None
         return data, count, start_pos
 
+    # Keys this message's template defines, so absent alternatives are skipped.
+    defined = key_cache.defined_keys(bufr)
+
     # First, get the MetaData we are interested in (list is in metaDataKeyList)
     for k, v in metaDataKeyList.items():
         meta_data[k] = []
         if (len(v) > 1):
             for var in v:
-                if (var != 'Constructed'):
+                if (var != 'Constructed') and (var in defined):
                     try:
                         avals = ecc.codes_get_array(bufr, var)
                         meta_data[k] = assign_values(avals, k)
@@ -309,7 +337,7 @@ def read_bufr_message(f, count, start_pos, data):
                     except ecc.KeyValueNotFoundError:
                         logging.warning("Caution: unable to find requested BUFR key: " + var)
         else:
-            if (v[0] != 'Constructed'):
+            if (v[0] != 'Constructed') and (v[0] in defined):
                 try:
                     avals = ecc.codes_get_array(bufr, v[0])
                     meta_data[k] = assign_values(avals, k)
@@ -426,6 +454,9 @@ def read_bufr_message(f, count, start_pos, data):
     # TO-DO: currently all ObsValue variables are float type, might need integer/other.
     for variable in raw_obsvars:    # ['airTemperature','mixingRatio','windDirection','windSpeed']
         vals[variable] = []
+        if variable not in defined:
+            vals[variable] = np.full(target_number, float_missing_value, dtype=np.float32)
+            continue
         try:
             avals = ecc.codes_get_array(bufr, variable)
             if (len(avals) != target_number):
@@ -456,14 +487,15 @@ def read_bufr_message(f, count, start_pos, data):
     # Need to transform some variables to others (wind speed/direction to components for example).
     uwnd = np.full(target_number, float_missing_value)
     vwnd = np.full(target_number, float_missing_value)
-    for n, wdir in enumerate(vals['windDirection']):
-        if (wdir >= 0 and wdir <= 360 and vals['windSpeed'][n] != float_missing_value):
-            uwnd[n], vwnd[n] = met_utils.dir_speed_2_uv(wdir, vals['windSpeed'][n])
+    wdir = vals['windDirection'].astype(np.float64)
+    wspd = vals['windSpeed'].astype(np.float64)
+    good = (wdir >= 0) & (wdir <= 360) & (vals['windSpeed'] != float_missing_value)
+    uwnd[good], vwnd[good] = met_utils.dir_speed_2_uv(wdir[good], wspd[good])
 
     spfh = np.full(target_number, float_missing_value)
-    for n, mixing_ratio in enumerate(vals['mixingRatio']):
-        if (mixing_ratio > 0 and mixing_ratio < 25.E-3):
-            spfh[n] = mixing_ratio / (1.0 + mixing_ratio)
+    mixing_ratio = vals['mixingRatio'].astype(np.float64)
+    good = (mixing_ratio > 0) & (mixing_ratio < 25.E-3)
+    spfh[good] = mixing_ratio[good] / (1.0 + mixing_ratio[good])
 
     # Move everything into the final data dictionary, including metadata.
     data['windEastward'] = np.append(data['windEastward'], uwnd)
@@ -502,6 +534,16 @@ if __name__ == "__main__":
                           help='enable debug messages')
     optional.add_argument('--verbose', action='store_true',
                           help='enable verbose debug messages')
+    optional.add_argument('-j', '--workers', dest='workers', type=int,
+                          action='store', default=1,
+                          help='number of processes used to decode the input files')
+    optional.add_argument('--categories', dest='categories', type=int, nargs='+',
+                          action='store', default=None,
+                          help='only decode BUFR messages of these data categories, e.g. 4 for single level upper-air data')
+
+    optional.add_argument('--index-dir', dest='index_dir',
+                          action='store', default=None,
+                          help='directory in which to cache the BUFR message index of each input file')
 
     args = parser.parse_args()
 
@@ -516,4 +558,4 @@ if __name__ == "__main__":
         if not os.path.isfile(file_name):
             parser.error('Input (-i option) file: ', file_name, ' does not exist')
 
-    main(args.file_names, args.output_file)
+    main(args.file_names, args.output_file, args.workers, args.categories, args.index_dir)
@@ -14,6 +14,7 @@ from collections import defaultdict, OrderedDict
 from pyiodaconv.orddicts import DefaultOrderedDict
 import pyiodaconv.ioda_conv_engines as iconv
 import pyiodaconv.meteo_utils as meteo_utils
+import pyiodaconv.ecc_bufr_utils as ecc_bufr_utils
 
 os.environ["TZ"] = "UTC"
 
@@ -107,11 +108,17 @@ dtypes = {'string': object,
           'double': np.float64}
 
 
-def main(file_names, output_file):
+# One set of meteorological helpers, and one cache of the BUFR keys each
+# message template defines, shared by every message.
+met_utils = meteo_utils.meteo_utils()
+metadata_keys = [var for v in metaDataKeyList.values() for var in v]
+key_cache = ecc_bufr_utils.TemplateKeyCache(metadata_keys + raw_obsvars)
+
+
+def main(file_names, output_file, workers=1, categories=None, index_dir=None):
 
     # initialize
     count = [0, 0, 0]
-    start_pos = None
     start_time = time.time()
 
     obs_data = {}          # The final outputs.
@@ -125,10 +132,13 @@ def main(file_names, output_file):
     varAttrs = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
 
     for fname in file_names:
-        logging.debug("Reading file: " + fname)
         AttrData['sourceFiles'] += ", " + fname
 
-        data, count, start_pos = read_file(fname, count, start_pos, data)
+    # Decode the indexed messages of the files on the worker pool and
+    # append the results in input order.
+    tasks = ecc_bufr_utils.split_work(file_names, workers, categories, index_dir)
+    parts = ecc_bufr_utils.map_tasks(read_task, tasks, workers)
+    data, count = ecc_bufr_utils.merge_parts(data, count, parts)
 
     AttrData['sourceFiles'] = AttrData['sourceFiles'][2:]
     logging.debug("All source files: " + AttrData['sourceFiles'])
@@ -256,18 +266,35 @@ def is_all_missing(data):
     return False
 
 
-def read_file(file_name, count, start_pos, data):
+def read_task(task):
+
+    # Decode the BUFR messages at the given byte offsets of one file.
+    file_name, offsets = task
+    logging.debug(f"Reading file: {file_name} ({len(offsets)} messages)")
+
+    count = [0, 0, 0]
+    data = {}
+    for key in obsvars:
+        data[key] = []
+    for key in meta_keys:
+        data[key] = []
+
+    return read_file(file_name, count, data, offsets)
+
+
+def read_file(file_name, count, data, offsets):
 
     f = open(file_name, 'rb')
 
-    while True:
+    # The message index already skipped incomplete messages, so each
+    # message is read straight from its offset.
+    for offset in offsets:
+        f.seek(offset)
         # Use eccodes to decode each bufr message in the file
-        data, count, start_pos = read_bufr_message(f, count, start_pos, data)
+        data, count, start_pos = read_bufr_message(f, count, None, data)
 
-        if start_pos is None:
-            break
-
-    return data, count, start_pos
+    f.close()
+    return data, count
 
 
 def read_bufr_message(f, count, start_pos, data):
@@ -282,8 +309,6 @@ def read_bufr_message(f, count, start_pos, data):
     count[0] += 1
     logging.info("BUFR message number: " + str(count[0]))
 
-    met_utils = meteo_utils.meteo_utils()
-
     try:
         bufr = ecc.codes_bufr_new_from_file(f)
     except:  # noqa
@@ -297,12 +322,15 @@ def read_bufr_message(f, count, start_pos, data):
         start_pos = None
         return data, count, start_pos
 
+    # Keys this message's template defines, so absent alternatives are skipped.
+    defined = key_cache.defined_keys(bufr)
+
     # First, get the MetaData we are interested in (list is in metaDataKeyList)
     for k, v in metaDataKeyList.items():
         meta_data[k] = []
         if (len(v) > 1):
             for var in v:
-                if (var != 'Constructed'):
+                if (var != 'Constructed') and (var in defined):
                     try:
                         avals = ecc.codes_get_array(bufr, var)
                         meta_data[k] = assign_values(avals, k)
@@ -311,7 +339,7 @@ def read_bufr_message(f, count, start_pos, data):
                     except ecc.KeyValueNotFoundError:
                         logging.warning("Caution: unable to find requested BUFR key: " + var)
         else:
-            if (v[0] != 'Constructed'):
+            if (v[0] != 'Constructed') and (v[0] in defined):
                 try:
                     avals = ecc.codes_get_array(bufr, v[0])
                     meta_data[k] = assign_values(avals, k)
@@ -437,6 +465,9 @@ def read_bufr_message(f, count, start_pos, data):
     # TO-DO: currently all ObsValue variables are float type, might need integer/other.
     for variable in raw_obsvars:
         vals[variable] = []
+        if variable not in defined:
+            vals[variable] = np.full(target_number, float_missing_value, dtype=np.float32)
+            continue
         try:
             avals = ecc.codes_get_array(bufr, variable)
             if (len(avals) != target_number):
@@ -467,21 +498,22 @@ def read_bufr_message(f, count, start_pos, data):
     # Need to transform some variables to others (wind speed/direction to components for example).
     uwnd = np.full(target_number, float_missing_value)
     vwnd = np.full(target_number, float_missing_value)
-    for n, wdir in enumerate(vals['windDirection']):
-        if (wdir >= 0 and wdir <= 360 and vals['windSpeed'][n] != float_missing_value):
-            uwnd[n], vwnd[n] = met_utils.dir_speed_2_uv(wdir, vals['windSpeed'][n])
+    wdir = vals['windDirection'].astype(np.float64)
+    wspd = vals['windSpeed'].astype(np.float64)
+    good = (wdir >= 0) & (wdir <= 360) & (vals['windSpeed'] != float_missing_value)
+    uwnd[good], vwnd[good] = met_utils.dir_speed_2_uv(wdir[good], wspd[good])
 
     # Most ships are floating at or near sea level, so assign MSLP to surface_pressure if needed.
-    for n, psfc in enumerate(vals['nonCoordinatePressure']):
-        mslp = vals['pressureReducedToMeanSeaLevel'][n]
-        if ((psfc < 75000 or psfc > 107900) and (mslp > 75000 and mslp < 107900)):
-            vals['nonCoordinatePressure'][n] = mslp
+    psfc = vals['nonCoordinatePressure']
+    mslp = vals['pressureReducedToMeanSeaLevel']
+    use_mslp = ((psfc < 75000) | (psfc > 107900)) & (mslp > 75000) & (mslp < 107900)
+    psfc[use_mslp] = mslp[use_mslp]
 
     spfh = np.full(target_number, float_missing_value)
-    for n, dewpoint in enumerate(vals['dewpointTemperature']):
-        psfc = vals['nonCoordinatePressure'][n]
-        if (dewpoint > 90 and dewpoint < 325 and psfc > 30000 and psfc < 109900):
-            spfh[n] = met_utils.specific_humidity(dewpoint, psfc)
+    dewpoint = vals['dewpointTemperature'].astype(np.float64)
+    psfc = vals['nonCoordinatePressure'].astype(np.float64)
+    good = (dewpoint > 90) & (dewpoint < 325) & (psfc > 30000) & (psfc < 109900)
+    spfh[good] = met_utils.specific_humidity(dewpoint[good], psfc[good])
 
     # Move everything into the final data dictionary, including metadata.
     data['windEastward'] = np.append(data['windEastward'], uwnd)
@@ -522,6 +554,16 @@ if __name__ == "__main__":
                           help='enable debug messages')
     optional.add_argument('--verbose', action='store_true',
                           help='enable verbose debug messages')
+    optional.add_argument('-j', '--workers', dest='workers', type=int,
+                          action='store', default=1,
+                          help='number of processes used to decode the input files')
+    optional.add_argument('--categories', dest='categories', type=int, nargs='+',
+                          action='store', default=None,
+                          help='only decode BUFR messages of these data categories, e.g. 1 for sea surface data')
+
+    optional.add_argument('--index-dir', dest='index_dir',
+                          action='store', default=None,
+                          help='directory in which to cache the BUFR message index of each input file')
 
     args = parser.parse_args()
 
@@ -536,4 +578,4 @@ if __name__ == "__main__":
         if not os.path.isfile(file_name):
             parser.error('Input (-i option) file: ', file_name, ' does not exist')
 
-    main(args.file_names, args.output_file)
+    main(args.file_names, args.output_file, args.workers, args.categories, args.index_dir)
@@ -17,8 +17,10 @@ from copy import deepcopy as dcop
 # These modules need the path to lib-python modules
 import pyiodaconv.ioda_conv_engines as iconv
 import pyiodaconv.meteo_utils as meteo_utils
+import pyiodaconv.ecc_bufr_utils as ecc_bufr_utils
 from pyiodaconv.orddicts import DefaultOrderedDict
 from collections import defaultdict
+from functools import partial
 
 os.environ["TZ"] = "UTC"
 
@@ -151,7 +153,21 @@ iso8601_string = locationKeyList[meta_keys.index('dateTime')][2]
 epoch = datetime.fromisoformat(iso8601_string[14:-1])
 
 
-def main(file_names, station_table, output_file, datetimeRef):
+# Alternative keys holding the delayed replication factors, in order of preference.
+repfac_keys = ['extendedDelayedDescriptorReplicationFactor',
+               'extendedDelayedDescriptorAndDataRepetitionFactor',
+               'delayedDescriptorReplicationFactor',
+               'delayedDescriptorAndDataRepetitionFactor',
+               'shortDelayedDescriptorReplicationFactor']
+
+# One set of meteorological helpers, and one cache of the BUFR keys each
+# message template defines, shared by every message.
+met_utils = meteo_utils.meteo_utils()
+metadata_keys = [var for v in metaDataKeyList.values() for var in v]
+key_cache = ecc_bufr_utils.TemplateKeyCache(metadata_keys + raw_obsvars + repfac_keys)
+
+
+def main(file_names, station_table, output_file, datetimeRef, workers=1, categories=None, index_dir=None):
 
     # initialize
     count = [1, 0, 0, 0, 0]
@@ -169,14 +185,28 @@ def main(file_names, station_table, output_file, datetimeRef):
     # Load a static list (json) of station info: WMO number, lat, lon, elev
     STATIONS = loadStations(station_table)
 
-    # Open one input file at a time.
     for fname in file_names:
-        count[4] = 0
         AttrData['sourceFiles'] += ", " + fname
 
-        # Read from a BUFR file.
-        data, count = read_file(fname, count, data, datetimeRef)
-        print(f"Finished reading {fname} and found {count[4]} distinct sites\n")
+    # Decode the indexed messages of the files on the worker pool (each
+    # worker loads the station table) and append the results in input order.
+    tasks = ecc_bufr_utils.split_work(file_names, workers, categories, index_dir)
+    parts = ecc_bufr_utils.map_tasks(partial(read_task, datetimeRef=datetimeRef), tasks, workers,
+                                     initializer=loadStations, initargs=(station_table,))
+
+    # A station already found in an earlier task is a duplicate, exactly as if
+    # the tasks had been read one after another.
+    seen = set()
+    sites_not_found.clear()
+    kept_parts = []
+    for part_data, part_count, part_sites_not_found in parts:
+        ids = np.asarray(part_data['stationIdentification'])
+        keep = np.array([sid not in seen for sid in ids], dtype=bool)
+        seen.update(ids.tolist())
+        kept_parts.append(({key: np.asarray(part_data[key])[keep] for key in data.keys()}, part_count))
+        sites_not_found.extend(part_sites_not_found)
+    data, count = ecc_bufr_utils.merge_parts(data, count, kept_parts)
+    count[1] = len(data['dateTime'])
 
     AttrData['datetimeReference'] = datetimeRef
     AttrData['sourceFiles'] = AttrData['sourceFiles'][2:]
@@ -235,22 +265,41 @@ def main(file_names, station_table, output_file, datetimeRef):
     logging.info("--- {:9.4f} total seconds ---".format(time.time() - start_time))
 
 
-def read_file(file_name, count, data, datetimeRef):
+def read_task(task, datetimeRef):
+
+    # Decode the BUFR messages at the given byte offsets of one file, the
+    # duplicate-station bookkeeping only covers this task.
+    file_name, offsets = task
+    stations_found.clear()
+    sites_not_found.clear()
+
+    count = [0, 0, 0, 0, 0]
+    data = {}
+    for key in obsvars:
+        data[key] = []
+    for key in meta_keys:
+        data[key] = []
+
+    data, count = read_file(file_name, count, data, datetimeRef, offsets)
+    print(f"Finished reading {file_name} and found {count[4]} distinct sites\n")
+    return data, count, list(sites_not_found)
+
+
+def read_file(file_name, count, data, datetimeRef, offsets):
 
     f = open(file_name, 'rb')
-    fsize = os.path.getsize(file_name)
-    logging.info(f"Processing file {file_name} with size: {fsize}")
-    start_pos = 0
+    logging.info(f"Processing file {file_name} with {len(offsets)} messages")
 
-    while True:
-        logging.info(f"  within file, reading BUFR msg ({count[0]}) starting at: {start_pos}")
+    # The message index already skipped incomplete messages, so each
+    # message is read straight from its offset.
+    for offset in offsets:
+        logging.info(f"  within file, reading BUFR msg ({count[0]}) starting at: {offset}")
+        f.seek(offset)
         # Use eccodes to decode each bufr message in the file
-        data, count, start_pos = read_bufr_message(f, count, start_pos, data, datetimeRef)
+        data, count, start_pos = read_bufr_message(f, count, offset, data, datetimeRef)
         count[0] += 1
 
-        if ((start_pos is None) or (start_pos >= fsize)):
-            break
-
+    f.close()
     return data, count
 
 
@@ -430,7 +479,6 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
     avals = []              # Temporarily hold array of values.
     start_pos = f.tell()
 
-    met_utils = meteo_utils.meteo_utils()
     significance_table = def_significance_table()
 
     try:
@@ -450,9 +498,7 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
         ecc.codes_set(bufr, 'unpack', 1)
     except ecc.CodesInternalError:
         ecc.codes_release(bufr)
-        logging.info(f"INCOMPLETE BUFR message, skipping ({msg_size} bytes)")
-        start_pos += int(0.5*msg_size)
-        f.seek(start_pos)
+        logging.info(f"Unable to unpack BUFR message, skipping ({msg_size} bytes)")
         return data, count, start_pos
 
     # Some BUFR messages have subsets (multiple) soundings in a single message (China especially).
@@ -481,24 +527,18 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
                 print(f" name: {keyname}")
     '''
 
+    # Keys this message's template defines, so absent alternatives are skipped.
+    defined = key_cache.defined_keys(bufr)
+
     # If multiple soundings repfacs will be vector of length of each sounding.
     repfacs = []
-    try:
-        repfacs = ecc.codes_get_array(bufr, 'extendedDelayedDescriptorReplicationFactor').tolist()
-    except ecc.KeyValueNotFoundError:
-        try:
-            repfacs = ecc.codes_get_array(bufr, 'extendedDelayedDescriptorAndDataRepetitionFactor').tolist()
-        except ecc.KeyValueNotFoundError:
+    for repfac_key in repfac_keys:
+        if repfac_key in defined:
             try:
-                repfacs = ecc.codes_get_array(bufr, 'delayedDescriptorReplicationFactor').tolist()
+                repfacs = ecc.codes_get_array(bufr, repfac_key).tolist()
+                break
             except ecc.KeyValueNotFoundError:
-                try:
-                    repfacs = ecc.codes_get_array(bufr, 'delayedDescriptorAndDataRepetitionFactor').tolist()
-                except ecc.KeyValueNotFoundError:
-                    try:
-                        repfacs = ecc.codes_get_array(bufr, 'shortDelayedDescriptorReplicationFactor').tolist()
-                    except ecc.KeyValueNotFoundError:
-                        pass
+                pass
 
     # First, get the MetaData we are interested in (list is in metaDataKeyList)
     max_mlen = 0
@@ -506,7 +546,7 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
         temp_data[k] = []
         if (len(v) > 1):
             for var in v:
-                if (var != 'Constructed'):
+                if (var != 'Constructed') and (var in defined):
                     try:
                         avals = ecc.codes_get_array(bufr, var)
                         max_mlen = max(max_mlen, len(avals))
@@ -519,7 +559,7 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
                 else:
                     temp_data[k] = None
         else:
-            if (v[0] != 'Constructed'):
+            if (v[0] != 'Constructed') and (v[0] in defined):
                 try:
                     avals = ecc.codes_get_array(bufr, v[0])
                     max_mlen = max(max_mlen, len(avals))
@@ -557,6 +597,10 @@ def read_bufr_message(f, count, start_pos, data, datetimeRef):
     repfactors = {}
     for variable in raw_obsvars:
         temp_data[variable] = []
+        if variable not in defined:
+            repfactors[variable] = []
+            temp_data[variable] = None
+            continue
         if not compressed and nsubsets > 1:
             repfactors[variable] = []
             for n in range(nsubsets):
@@ -1024,6 +1068,16 @@ if __name__ == "__main__":
     optional.add_argument('--date', dest='datetimeReference',
                           action='store', default=' ',
                           help='date reference string (ISO8601)')
+    optional.add_argument('-j', '--workers', dest='workers', type=int,
+                          action='store', default=1,
+                          help='number of processes used to decode the input files')
+    optional.add_argument('--categories', dest='categories', type=int, nargs='+',
+                          action='store', default=None,
+                          help='only decode BUFR messages of these data categories, e.g. 2 for vertical soundings')
+
+    optional.add_argument('--index-dir', dest='index_dir',
+                          action='store', default=None,
+                          help='directory in which to cache the BUFR message index of each input file')
 
     args = parser.parse_args()
 
@@ -1045,4 +1099,5 @@ if __name__ == "__main__":
         print("creating output directory: ", apath)
         os.makedirs(apath)
 
-    main(args.file_names, args.station_table, args.output_file, args.datetimeReference)
+    main(args.file_names, args.station_table, args.output_file, args.datetimeReference,
+         args.workers, args.categories, args.index_dir)
@@ -22,6 +22,8 @@ import numpy as np
 import netCDF4 as nc
 from cartopy import geodesic
 from copy import deepcopy as dcop
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 # These modules need the path to lib-python modules
 import pyiodaconv.ioda_conv_engines as iconv
@@ -60,6 +62,7 @@ scale_wspd = 1.0
 knots2mps = 0.51444   # convert from knots to meters per second
 
 STATIONS = {}
+STATIONS_FILE = None
 
 # The outgoing IODA MetaData variables, their data type, and units.
 MetaDataKeyList = [
@@ -140,7 +143,7 @@ def loadStations(stationfile, skipIfLoaded=True):
     :return: True on success, False on error
     """
 
-    global STATIONS
+    global STATIONS, STATIONS_FILE
 
     if skipIfLoaded and len(STATIONS) > 0:
         return True
@@ -150,6 +153,7 @@ def loadStations(stationfile, skipIfLoaded=True):
         data = fh.read()
         fh.close()
         STATIONS = json.loads(data)
+        STATIONS_FILE = stationfile
         return True
     except Exception as e:
         logger.error("Could not read station info from json file '%s': %s" % (stationfile, e))
@@ -204,10 +208,52 @@ def getProfile(filename, synopId, target_date):
     if not sections:
         return None
 
+    return decodeStation(synopId, sections[synopId], year, month)
+
+
+def getProfiles(filename, target_date, workers=1):
+    """
+    Get the parsed profiles of every known station from the given RAOBS file, reading
+    the file once and decoding the sections of the stations in parallel
+    :param filename:
+    :param target_date: format=2022-05-18T12:00:00Z
+    :param workers: The number of processes decoding the stations
+    :return: A dict keyed by synop ID, in the order of the station file, of parsed sounding dicts
+    """
+
+    # Starting textual data contains no year or month, set from target_date
+    year = int(target_date[0:4])
+    month = int(target_date[5:7])
+
+    sections = getSections(filename, set(STATIONS.keys()))
+    if not sections:
+        return {}
+
+    synopIds = [synopId for synopId in STATIONS.keys() if synopId in sections]
+    args = (synopIds, [sections[synopId] for synopId in synopIds],
+            repeat(year), repeat(month))
+    if workers <= 1:
+        profiles = map(decodeStation, *args)
+    else:
+        chunksize = max(1, len(synopIds) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=loadStations,
+                                 initargs=(STATIONS_FILE,)) as executor:
+            profiles = list(executor.map(decodeStation, *args, chunksize=chunksize))
+
+    return dict(zip(synopIds, profiles))
+
+
+def decodeStation(synopId, stationSections, year, month):
+    """
+    Decode and merge the TT/PP sections of one station into a profile
+    :param synopId:
+    :param stationSections: A dict keyed by section type, containing the unparsed sections
+    :return: A parsed sounding dict, or None
+    """
     logging.info(f" retrieving data for site: {synopId}")
     s = []
-    for type in sections[synopId].keys():
-        sc = decode(sections[synopId][type], year, month)
+    for type in stationSections.keys():
+        sc = decode(stationSections[type], year, month)
         if sc is not None:
             s.append(sc)
 
@@ -226,20 +272,24 @@ def getSections(filename, stationList=None):
     sections = {}
     line = None
     try:
-        fh = open(filename, 'rb')
-        while True:
-            line = fh.readline()
-            if not line:
-                break
-
+        with open(filename, 'rb') as fh:
             # get rid of non-ASCII characters
-            line = ''.join(chr(i) for i in line if i < 128)
-
+            lines = [raw.decode('ascii', 'ignore') for raw in fh]
+
+        # A section runs on to the next line holding "=", even when its header
+        # line already ends with one. The lines a station's section swallows
+        # this way are not read again for that station, but they still start
+        # the sections of other stations, as when each station had a pass of
+        # its own.
+        consumed = {}
+        for iline, line in enumerate(lines):
             (type, tokens, id) = getTokens(line)
             if type == "":
                 continue
             if stationList is not None and id not in stationList:
                 continue
+            if iline < consumed.get(id, 0):
+                continue
             if id not in sections.keys():
                 sections[id] = {}
 
@@ -247,25 +297,20 @@ def getSections(filename, stationList=None):
             if "NIL=" in soundingStr:
                 continue
 
-            while True:
-                line = fh.readline()
-                # get rid of non-ASCII characters
-                line = ''.join(chr(i) for i in line if i < 128)
-
-                if line:
-                    line = line.replace(chr(13), "").replace(chr(10), " ")
-                    if line == "" or line == " ":
-                        continue
-                    soundingStr += line
-                    if "=" in line:
-                        break
-                else:
+            jline = iline + 1
+            while jline < len(lines):
+                line = lines[jline].replace(chr(13), "").replace(chr(10), " ")
+                jline += 1
+                if line == "" or line == " ":
+                    continue
+                soundingStr += line
+                if "=" in line:
                     break
+            consumed[id] = jline
 
             if "NIL=" not in soundingStr:
                 sections[id][type] = soundingStr
 
-        fh.close()
         return sections
 
     except Exception as e:
@@ -1118,6 +1163,9 @@ if __name__ == "__main__":
                           help='enable verbose debug messages')
     optional.add_argument('--netcdf', action='store_true',
                           help='enable netCDF output file (IODA/JEDI Data Conventions)')
+    optional.add_argument('-j', '--workers', dest='workers', type=int,
+                          action='store', default=1,
+                          help='number of processes decoding the stations')
 
     args = parser.parse_args()
 
@@ -1166,9 +1214,9 @@ if __name__ == "__main__":
         logging.debug(f"Reading input file: {file_name}")
 
         nstations = 0
-        for n, station in enumerate(STATIONS.keys()):
-            logging.debug(f"\n seeking data from station {station} within {file_name} for {args.date_string}")
-            profile = getProfile(file_name, station, args.date_string)
+        logging.debug(f"\n seeking data from all stations within {file_name} for {args.date_string}")
+        profiles = getProfiles(file_name, args.date_string, args.workers)
+        for station, profile in profiles.items():
 
             if profile:
                 nstations += 1
@@ -14,6 +14,7 @@ from collections import defaultdict
 from pyiodaconv.orddicts import DefaultOrderedDict
 import pyiodaconv.ioda_conv_engines as iconv
 import pyiodaconv.meteo_utils as meteo_utils
+import pyiodaconv.ecc_bufr_utils as ecc_bufr_utils
 
 os.environ["TZ"] = "UTC"
 
@@ -122,11 +123,17 @@ dtypes = {'string': object,
           'double': np.float64}
 
 
-def main(file_names, output_file):
+# One set of meteorological helpers, and one cache of the BUFR keys each
+# message template defines, shared by every message.
+met_utils = meteo_utils.meteo_utils()
+metadata_keys = [var for v in metaDataKeyList.values() for var in v]
+key_cache = ecc_bufr_utils.TemplateKeyCache(metadata_keys + raw_obsvars)
+
+
+def main(file_names, output_file, workers=1, categories=None, index_dir=None):
 
     # initialize
     count = [0, 0, 0]
-    start_pos = None
     start_time = time.time()
 
     obs_data = {}          # The final outputs.
@@ -140,10 +147,13 @@ def main(file_names, output_file):
     varAttrs = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
 
     for fname in file_names:
-        logging.debug("Reading file: " + fname)
         AttrData['sourceFiles'] += ", " + fname
 
-        data, count, start_pos = read_file(fname, count, start_pos, data)
+    # Decode the indexed messages of the files on the worker pool and
+    # append the results in input order.
+    tasks = ecc_bufr_utils.split_work(file_names, workers, categories, index_dir)
+    parts = ecc_bufr_utils.map_tasks(read_task, tasks, workers)
+    data, count = ecc_bufr_utils.merge_parts(data, count, parts)
 
     AttrData['sourceFiles'] = AttrData['sourceFiles'][2:]
     logging.debug("All source files: " + AttrData['sourceFiles'])
@@ -319,19 +329,36 @@ def specialty_time(year, month, day, hour, minute, second):
     return time_offset
 
 
-def read_file(file_name, count, start_pos, data):
+def read_task(task):
+
+    # Decode the BUFR messages at the given byte offsets of one file.
+    file_name, offsets = task
+    logging.debug(f"Reading file: {file_name} ({len(offsets)} messages)")
+
+    count = [0, 0, 0]
+    data = {}
+    for key in obsvars:
+        data[key] = []
+    for key in meta_keys:
+        data[key] = []
+
+    return read_file(file_name, count, data, offsets)
+
+
+def read_file(file_name, count, data, offsets):
 
     f = open(file_name, 'rb')
 
-    while True:
+    # The message index already skipped incomplete messages, so each
+    # message is read straight from its offset.
+    for offset in offsets:
         count[0] += 1
+        f.seek(offset)
         # Use eccodes to decode each bufr message in the file
-        data, count, start_pos = read_bufr_message(f, count, start_pos, data)
-
-        if start_pos is None:
-            break
+        data, count, start_pos = read_bufr_message(f, count, None, data)
 
-    return data, count, start_pos
+    f.close()
+    return data, count
 
 
 def read_bufr_message(f, count, start_pos, data):
@@ -343,8 +370,6 @@ def read_bufr_message(f, count, start_pos, data):
     call_fail = False
     start_pos = f.tell()
 
-    met_utils = meteo_utils.meteo_utils()
-
     try:
         bufr = ecc.codes_bufr_new_from_file(f)
         try:
@@ -362,9 +387,7 @@ def read_bufr_message(f, count, start_pos, data):
         ecc.codes_set(bufr, 'unpack', 1)
     except ecc.CodesInternalError:
         ecc.codes_release(bufr)
-        logging.info(f"INCOMPLETE BUFR message, skipping ({msg_size} bytes)")
-        start_pos += int(0.5*msg_size)
-        f.seek(start_pos)
+        logging.info(f"Unable to unpack BUFR message, skipping ({msg_size} bytes)")
         return data, count, start_pos
 
     # Some BUFR messages have subsets (multiple) observations in a single message.
@@ -380,13 +403,16 @@ def read_bufr_message(f, count, start_pos, data):
     # have to do things differently.
     compressed = ecc.codes_get(bufr, 'compressedData')
 
+    # Keys this message's template defines, so absent alternatives are skipped.
+    defined = key_cache.defined_keys(bufr)
+
     # First, get the MetaData we are interested in (list is in metaDataKeyList)
     max_mlen = 0
     for k, v in metaDataKeyList.items():
         temp_data[k] = []
         if (len(v) > 1):
             for var in v:
-                if (var != 'Constructed'):
+                if (var != 'Constructed') and (var in defined):
                     try:
                         avals = ecc.codes_get_array(bufr, var)
                         max_mlen = max(max_mlen, len(avals))
@@ -399,7 +425,7 @@ def read_bufr_message(f, count, start_pos, data):
                 else:
                     temp_data[k] = None
         else:
-            if (v[0] != 'Constructed'):
+            if (v[0] != 'Constructed') and (v[0] in defined):
                 try:
                     avals = ecc.codes_get_array(bufr, v[0])
                     max_mlen = max(max_mlen, len(avals))
@@ -429,6 +455,9 @@ def read_bufr_message(f, count, start_pos, data):
     max_dlen = 0
     for variable in raw_obsvars:
         temp_data[variable] = []
+        if variable not in defined:
+            temp_data[variable] = None
+            continue
         if not compressed and nsubsets > 1:
             for n in range(nsubsets):
                 var = '/subsetNumber=' + str(n+1) + '/' + variable
@@ -604,6 +633,16 @@ if __name__ == "__main__":
                           help='enable debug messages')
     optional.add_argument('--verbose', action='store_true',
                           help='enable verbose debug messages')
+    optional.add_argument('-j', '--workers', dest='workers', type=int,
+                          action='store', default=1,
+                          help='number of processes used to decode the input files')
+    optional.add_argument('--categories', dest='categories', type=int, nargs='+',
+                          action='store', default=None,
+                          help='only decode BUFR messages of these data categories, e.g. 0 for land surface data')
+
+    optional.add_argument('--index-dir', dest='index_dir',
+                          action='store', default=None,
+                          help='directory in which to cache the BUFR message index of each input file')
 
     args = parser.parse_args()
 
@@ -618,4 +657,4 @@ if __name__ == "__main__":
         if not os.path.isfile(file_name):
             parser.error('Input (-i option) file: ', file_name, ' does not exist')
 
-    main(args.file_names, args.output_file)
+    main(args.file_names, args.output_file, args.workers, args.categories, args.index_dir)
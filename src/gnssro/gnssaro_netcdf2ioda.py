@@ -12,7 +12,6 @@ import sys
 import argparse
 from datetime import datetime, timedelta
 import dateutil.parser
-from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import os
 import netCDF4 as nc
@@ -20,7 +19,6 @@ import h5py as h5
 
 import pyiodaconv.ioda_conv_engines as iconv
 from pyiodaconv.orddicts import DefaultOrderedDict
-from pyiodaconv.def_jedi_utils import concat_obs_dict
 
 # globals
 ioda_float_type = 'float32'
@@ -48,18 +46,10 @@ def main(args):
     pool_input_01 = args.input
     pool_input_02 = np.arange(len(args.input))
     pool_inputs = [[i, j] for i, j in zip(pool_input_01, pool_input_02)]
-    obs_data = {}
-
-    # create a thread pool
-    with ProcessPoolExecutor(max_workers=args.threads) as executor:
-        for file_obs_data in executor.map(read_input, pool_inputs):
-            if not file_obs_data:
-                print(f"INFO: non-nominal file skipping")
-                continue
-            if obs_data:
-                concat_obs_dict(obs_data, file_obs_data)
-            else:
-                obs_data = file_obs_data
+    obs_data, file_nlocs = iconv.read_columns_in_parallel(read_input, pool_inputs, args.threads)
+    for nlocs in file_nlocs:
+        if nlocs == 0:
+            print(f"INFO: non-nominal file skipping")
 
     if len(obs_data) == 0:
         print('ERROR: no occultations to write out')
@@ -454,7 +444,7 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to read the input files in parallel.'
              '(default: %(default)s)',
         type=int, default=1)
 
@@ -12,7 +12,7 @@ import sys
 import argparse
 from datetime import datetime, timedelta
 import dateutil.parser
-from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 import os
 from pathlib import Path
@@ -21,7 +21,6 @@ import netCDF4 as nc
 import h5py
 import pyiodaconv.ioda_conv_engines as iconv
 from pyiodaconv.orddicts import DefaultOrderedDict
-from pyiodaconv.def_jedi_utils import concat_obs_dict
 
 # globals
 ioda_int_type = 'int32'
@@ -49,26 +48,13 @@ def main(args):
     pool_input_01 = args.input
     pool_input_02 = np.arange(len(args.input))+args.recordnumber
     pool_inputs = [[i, j] for i, j in zip(pool_input_01, pool_input_02)]
-    obs_data = {}
-    # create a thread pool -- multi-threading
-    # normal serial loop
-    record_number = args.recordnumber
-    for input_file in args.input:
-        file_obs_data = read_input([input_file, record_number], add_qc=qc)
-        timeoff = file_obs_data[('dateTime', 'MetaData')][0] - round((args.date-epoch).total_seconds())
-
-        if not file_obs_data:
-            print("INFO: non-nominal file skipping")
-            continue
-        if timeoff < -args.window*3600 or timeoff >= args.window*3600:
-            print("INFO: outside time window file skipping")
-            continue
+    # each file is read with its own record number, the profiles are
+    # renumbered below once those outside the time window are dropped
+    obs_data, file_nlocs = iconv.read_columns_in_parallel(partial(read_input, add_qc=qc), pool_inputs,
+                                                          args.threads)
 
-        record_number += 1
-        if obs_data:
-            concat_obs_dict(obs_data, file_obs_data)
-        else:
-            obs_data = file_obs_data
+    obs_data, record_number = select_time_window(obs_data, file_nlocs, args.date, float(args.window) * 3600,
+                                                 args.recordnumber)
 
     if len(obs_data) == 0:
         print('ERROR: no occultations to write out')
@@ -156,6 +142,52 @@ def main(args):
     sys.exit()
 
 
+def select_time_window(obs_data, file_nlocs, date, window, first_record):
+    """
+    Drops the files whose first profile is outside the time window and
+    numbers the profiles of the remaining ones from first_record on
+
+    Arguments:
+
+        obs_data: the columns returned by read_columns_in_parallel
+        file_nlocs: the number of locations read from each file
+        date: the center of the time window (datetime)
+        window: the half width of the time window in seconds
+        first_record: the sequence number of the first profile kept
+
+    Returns:
+
+        The selected obs_data (empty when no file is kept) and the
+        sequence number following the last profile kept
+    """
+
+    keep_file = np.zeros(len(file_nlocs), dtype=bool)
+    file_start = 0
+    for ifile, nlocs in enumerate(file_nlocs):
+        if nlocs == 0:
+            print("INFO: non-nominal file skipping")
+            continue
+        timeoff = obs_data[('dateTime', 'MetaData')][file_start] - round((date-epoch).total_seconds())
+        file_start += nlocs
+        if timeoff < -window or timeoff >= window:
+            print("INFO: outside time window file skipping")
+            continue
+        keep_file[ifile] = True
+
+    record_number = first_record + np.count_nonzero(keep_file)
+    if record_number == first_record:
+        obs_data = {}
+    elif not keep_file[np.array(file_nlocs) > 0].all():
+        keep = np.repeat(keep_file, file_nlocs)
+        for k in obs_data.keys():
+            obs_data[k] = obs_data[k][keep]
+    if len(obs_data) > 0:
+        seq_key = ('sequenceNumber', 'MetaData')
+        obs_data[seq_key] = np.repeat(np.arange(first_record, record_number),
+                                      np.array(file_nlocs)[keep_file]).astype(obs_data[seq_key].dtype)
+    return obs_data, record_number
+
+
 def read_input(input_file_and_record, add_qc):
     """
     Reads/converts input file(s)
@@ -473,7 +505,7 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to read the input files in parallel.'
              '(default: %(default)s)',
         type=int, default=1)
     optional.add_argument(
@@ -12,13 +12,13 @@ import sys
 import argparse
 from datetime import datetime, timedelta
 import dateutil.parser
-from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 import os
-from itertools import repeat
 import netCDF4 as nc
 
 import pyiodaconv.ioda_conv_engines as iconv
+import pyiodaconv.ecc_bufr_utils as ecc_bufr_utils
 from pyiodaconv.def_jedi_utils import ioda_int_type, ioda_float_type
 from pyiodaconv.orddicts import DefaultOrderedDict
 
@@ -45,21 +45,18 @@ def main(args):
     dtg = datetime.strptime(args.date, '%Y%m%d%H')
     qc = args.qualitycontrol
 
-    # read / process files in parallel
-    pool_input_01 = args.input
-    pool_input_02 = np.arange(len(args.input))+args.recordnumber
-    pool_inputs = [[i, j] for i, j in zip(pool_input_01, pool_input_02)]
-    obs_data = {}
-    # create a thread pool
-    with ProcessPoolExecutor(max_workers=args.threads) as executor:
-        for file_obs_data in executor.map(read_input, pool_inputs, repeat(qc)):
-            if not file_obs_data:
-                print(f"INFO: non-nominal file skipping")
-                continue
-            if obs_data:
-                concat_obs_dict(obs_data, file_obs_data)
-            else:
-                obs_data = file_obs_data
+    # index the messages of every file and decode them in batches on the
+    # worker pool. Each profile takes the record number of its message
+    # counted across all the files, so the numbers are unique whatever
+    # the batching.
+    tasks = ecc_bufr_utils.split_work(args.input, args.threads, index_dir=args.index_dir)
+    pool_inputs = []
+    record_number = args.recordnumber
+    for file_name, offsets in tasks:
+        pool_inputs.append((file_name, offsets, record_number))
+        record_number += len(offsets)
+    obs_data, _ = iconv.read_columns_in_parallel(partial(read_input, add_qc=qc), pool_inputs,
+                                                 args.threads, StringFill=string_missing_value)
 
     if len(obs_data) == 0:
         print('ERROR: no occultations to write out')
@@ -114,31 +111,43 @@ def main(args):
     writer.BuildIoda(obs_data, VarDims, VarAttrs, GlobalAttrs)
 
 
-def read_input(input_file_and_record, add_qc):
+def read_input(input_task, add_qc):
     """
-    Reads/converts input file(s)
+    Reads/converts a batch of the occultation messages of an input file
 
     Arguments:
 
-        input_args: an input filename or names
+        input_task: a (input_file, offsets, record_number) tuple
             input_file: The name of file to read
+            offsets: The byte offsets of the messages to decode
+            record_number: The record number of the first message
 
     Returns:
 
         A dictionary holding the variables (obs_data) needed by the IODA writer
     """
-    input_file = input_file_and_record[0]
-    record_number = input_file_and_record[1]
-    print("Reading: %s" % input_file)
-    f = open(input_file, 'rb')
-    bufr = codes_bufr_new_from_file(f)
-    codes_set(bufr, 'unpack', 1)
-
-    profile_meta_data = get_meta_data(bufr)
-
-    obs_data = get_obs_data(bufr, profile_meta_data, add_qc, record_number=record_number)
+    input_file, offsets, record_number = input_task
+    print("Reading: %s (%d messages)" % (input_file, len(offsets)))
+    obs = iconv.ChunkedObsData(StringFill=string_missing_value)
+    with open(input_file, 'rb') as f:
+        for n, offset in enumerate(offsets):
+            f.seek(offset)
+            bufr = codes_bufr_new_from_file(f)
+            if bufr is None:
+                continue
+            try:
+                codes_set(bufr, 'unpack', 1)
+                profile_meta_data = get_meta_data(bufr)
+                profile_obs_data = get_obs_data(bufr, profile_meta_data, add_qc,
+                                                record_number=record_number + n)
+            finally:
+                codes_release(bufr)
+            if profile_obs_data:
+                obs.append(profile_obs_data)
+            else:
+                print(f"INFO: skipping profile of the message at byte {offset} of {input_file}")
 
-    return obs_data
+    return obs.finalize()
 
 
 def get_meta_data(bufr):
@@ -351,31 +360,6 @@ def assign_values(data):
         return np.array(data, dtype=ioda_int_type)
 
 
-def concat_obs_dict(obs_data, append_obs_data):
-    # For now we are assuming that the obs_data dictionary has the "golden" list
-    # of variables. If one is missing from append_obs_data, the obs_data variable
-    # will be extended using fill values.
-    #
-    # Use the first key in the append_obs_data dictionary to determine how
-    # long to make the fill value vector.
-    append_keys = list(append_obs_data.keys())
-    append_length = len(append_obs_data[append_keys[0]])
-    for gv_key in obs_data.keys():
-        if gv_key in append_keys:
-            obs_data[gv_key] = np.append(obs_data[gv_key], append_obs_data[gv_key])
-        else:
-            if obs_data[gv_key].dtype == float:
-                fill_data = np.repeat(float_missing_value, append_length, dtype=ioda_float_type)
-            elif obs_data[gv_key].dtype == np.int64:
-                fill_data = np.repeat(long_missing_value, append_length, dtype=np.int64)
-            elif obs_data[gv_key].dtype == int:
-                fill_data = np.repeat(int_missing_value, append_length, dtype=ioda_int_type)
-            elif obs_data[gv_key].dtype == object:
-                # string type, extend with string missing value
-                fill_data = np.repeat(string_missing_value, append_length, dtype=object)
-            obs_data[gv_key] = np.append(obs_data[gv_key], fill_data)
-
-
 if __name__ == "__main__":
 
     # Get command line arguments
@@ -404,9 +388,13 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to decode the input messages in parallel.'
              '(default: %(default)s)',
         type=int, default=1)
+    optional.add_argument(
+        '--index-dir', dest='index_dir',
+        help='directory in which to cache the BUFR message index of each input file',
+        type=str, default=None)
     optional.add_argument(
         '-r', '--recordnumber',
         help=' optional record number to associate with profile ',
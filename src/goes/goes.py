@@ -257,7 +257,26 @@ class Goes:
         """
         Closes this netCDF4 Dataset.
         """
-        self._input_dataset.close()
+        if self._input_dataset is not None:
+            self._input_dataset.close()
+            self._input_dataset = None
+
+    def set_goes_util(self, goes_util: GoesUtil):
+        """
+        Sets the GoesUtil used to sub-sample and filter the data arrays.
+        goes_util - the GoesUtil
+        """
+        self._goes_util = goes_util
+
+    def __getstate__(self):
+        """
+        Returns the state to pickle when this channel is sent to or from a worker process. The netCDF4 Dataset is
+        reopened by load and the (large, shared) GoesUtil has to be set again with set_goes_util.
+        """
+        state = self.__dict__.copy()
+        state['_input_dataset'] = None
+        state['_goes_util'] = None
+        return state
 
     def set_lat_fill_value_index_array(self, lat_fill_value_index_array):
         """
@@ -270,6 +289,8 @@ class Goes:
         """
         Loads, calculates, sub-samples, reshapes, and filters all data arrays required by the GoesConverter class.
         """
+        if self._input_dataset is None:
+            self._open()
         self._load_kappa0_variable()
         self._load_planck_variables()
         self._load_std_dev_radiance_value_of_valid_pixels_variable()
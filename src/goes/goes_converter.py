@@ -39,6 +39,8 @@
 
 import os
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from netCDF4 import Dataset
 from numpy import ma
@@ -47,11 +49,34 @@ from goes import Goes
 from goes_latlon import GoesLatLon
 from goes_util import GoesUtil
 
+# The GoesUtil shared by all the channels loaded in a worker process (see _init_load_worker).
+_worker_goes_util = None
+
+
+def _init_load_worker(goes_util):
+    """
+    Initializes a worker process of the channel loading pool. The GoesUtil (which holds the large nonexistent indices
+    array) is sent once per worker rather than once per channel.
+    goes_util - the GoesUtil
+    """
+    global _worker_goes_util
+    _worker_goes_util = goes_util
+
+
+def _load_goes(goes):
+    """
+    Loads a single channel in a worker process and returns it (with its calculated data arrays) to the parent.
+    goes - a Goes instance
+    """
+    goes.set_goes_util(_worker_goes_util)
+    goes.load()
+    return goes
+
 
 class GoesConverter:
 
     def __init__(self, input_file_paths, latlon_file_path, output_file_path_rf, output_file_path_bt, include_rf=False,
-                 resolution=8):
+                 resolution=8, workers=1):
         """
         Constructor
         input_file_paths - A list of the absolute paths to all 16 ABI channels from the same hour
@@ -60,6 +85,8 @@ class GoesConverter:
         output_file_path_bt - The path to write the IODAv2 brightness temperature data file
         include_rf - Boolean value indicating whether to create the albedo output data file: False (default)
         resolution - The resolution in km: 8 (default), 4, 8, 16, 32, 64
+        workers - The number of processes used to load and calibrate the channels: 1 (default). With more than one
+                  worker the albedo and brightness temperature files are also written at the same time.
         """
         self._input_file_paths = input_file_paths
         self._latlon_file_path = latlon_file_path
@@ -67,6 +94,7 @@ class GoesConverter:
         self._output_file_path_bt = output_file_path_bt
         self._resolution = resolution
         self._include_rf = include_rf
+        self._workers = int(workers)
         self._latlon_dataset = None
         self._check_arguments()
 
@@ -490,13 +518,41 @@ class GoesConverter:
 
     def _load_all_goes(self):
         """
-        Calls the Goes load method on all input data files.
+        Calls the Goes load method on all input data files. The channels are independent, so with more than one worker
+        they are loaded and calibrated on a pool of processes.
         """
-        for key in self._goes_dict_bt.keys():
-            self._goes_dict_bt[key].load()
+        goes_list = list(self._goes_dict_bt.values())
         if self._include_rf:
-            for key in self._goes_dict_rf.keys():
-                self._goes_dict_rf[key].load()
+            goes_list += list(self._goes_dict_rf.values())
+
+        if self._workers <= 1:
+            for goes in goes_list:
+                goes.load()
+            return
+
+        # The workers open their own copy of the input files
+        for goes in goes_list:
+            goes.close()
+        with ProcessPoolExecutor(max_workers=min(self._workers, len(goes_list)), initializer=_init_load_worker,
+                                 initargs=(self._goes_util,)) as executor:
+            loaded_goes_list = list(executor.map(_load_goes, goes_list))
+
+        for goes in loaded_goes_list:
+            goes.set_goes_util(self._goes_util)
+            abi_channel = goes.get_abi_channel()
+            if abi_channel < 7:
+                self._goes_dict_rf[abi_channel] = goes
+            else:
+                self._goes_dict_bt[abi_channel] = goes
+
+    def _write_output(self, convert_function):
+        """
+        Opens the GoesLatLon data file and calls convert_function to write an output data file.
+        convert_function - _convert_bt or _convert_rf
+        """
+        self._latlon_dataset = Dataset(self._latlon_file_path, 'r')
+        convert_function()
+        self._latlon_dataset.close()
 
     def convert(self):
         """
@@ -512,11 +568,23 @@ class GoesConverter:
         self._latlon_dataset = Dataset(self._latlon_file_path, 'r')
         nonexistent_indices_data_array = ma.getdata(self._latlon_dataset.variables['nonexistent_indices']).real
         self._goes_util.set_nonexistent_indices_data_array(nonexistent_indices_data_array)
-        self._load_all_goes()
-        self._convert_bt()
-        if self._include_rf:
-            self._convert_rf()
         self._latlon_dataset.close()
+        self._load_all_goes()
+        if self._include_rf and self._workers > 1:
+            # Write the albedo file from a forked copy of this process, which shares the loaded channel data
+            # instead of having it pickled, while this process writes the brightness temperature file.
+            rf_writer = multiprocessing.get_context('fork').Process(target=self._write_output,
+                                                                    args=(self._convert_rf,))
+            rf_writer.start()
+            self._write_output(self._convert_bt)
+            rf_writer.join()
+            if rf_writer.exitcode != 0:
+                print(f"ERROR: failed to write {self._output_file_path_rf}.")
+                sys.exit(2)
+        else:
+            self._write_output(self._convert_bt)
+            if self._include_rf:
+                self._write_output(self._convert_rf)
 
     def _convert_bt(self):
         """
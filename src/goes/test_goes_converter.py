@@ -10,11 +10,11 @@ from goes_converter import GoesConverter
 
 
 def test_goes_converter(input_file_paths, latlon_file_path, output_file_path_rf, output_file_path_bt,
-                        include_rf, resolution):
+                        include_rf, resolution, workers=1):
 
     goes_converter = \
         GoesConverter(input_file_paths, latlon_file_path, output_file_path_rf, output_file_path_bt,
-                      include_rf=include_rf, resolution=resolution)
+                      include_rf=include_rf, resolution=resolution, workers=workers)
     goes_converter.convert()
 
 
@@ -32,6 +32,7 @@ if __name__ == '__main__':
     The 5th argument is the target resolution (2, 4, 8, 16, 32, or 64 km).
     The 6th argument should be True to output reflectances or False to skip, however argument 3
         must be provided regardless.
+    The optional 7th argument is the number of worker processes used to load the channels (default 1).
     """
 
     start_time = time.time()
@@ -41,8 +42,9 @@ if __name__ == '__main__':
     output_file_path_bt = sys.argv[4]
     resolution = sys.argv[5]
     include_rf = sys.argv[6]
+    workers = int(sys.argv[7]) if len(sys.argv) > 7 else 1
 
     test_goes_converter(input_file_paths, latlon_file_path, output_file_path_rf, output_file_path_bt,
-                        include_rf, resolution)
+                        include_rf, resolution, workers)
     elapsed_time = time.time() - start_time
     print(f'elapsed time:{elapsed_time:.3g}s')
@@ -725,9 +725,69 @@ class Conv(BaseGSI):
         # number of observations
         self.nobs = len(df['Observation_Type'][:])
         self.df = df
+        self._vars = {}
+        self._groups = None
 
     def close(self):
         self.df.close()
+        self._vars = {}
+        self._groups = None
+
+    def var(self, var_name):
+        """
+        Data array.  Return a numpy array based on variable name,
+        reading each variable from the diag file only once
+        """
+        if var_name not in self._vars:
+            self._vars[var_name] = self._as_array(self.df[var_name])
+        return self._vars[var_name]
+
+    def obsidx(self, platform, var):
+        """ obsidx(platform,var):
+        platform - string of observation type: 'sondes','sfc',etc.
+        var      - string of variable type: 'tsen','tv','q', etc.
+
+        returns idx - sorted indices of the observations to write out
+        """
+        if self._groups is None:
+            # group the observations by bufr code once, so that every
+            # platform is a few slices of one stable argsort
+            code = self.var('Observation_Type')
+            order = np.argsort(code, kind='stable')
+            codes, starts = np.unique(code[order], return_index=True)
+            ends = np.append(starts[1:], len(order))
+            self._groups = {c: order[b:e] for c, b, e in zip(codes.tolist(), starts, ends)}
+        if var == 'uv':
+            codes = uv_bufrtypes[platform]
+        else:
+            codes = conv_bufrtypes[platform]
+        groups = [self._groups[c] for c in codes if c in self._groups]
+        if not groups:
+            return np.array([], dtype=np.intp)
+        idx = np.sort(np.concatenate(groups))
+        if var in ['tsen', 'tv']:
+            iqt = self.var('Setup_QC_Mark')[idx]
+            idx = idx[(iqt != 0) if var == 'tsen' else (iqt == 0)]
+        elif var in ['bend', 'refract']:
+            igps = self.var('GPS_Type')[idx]
+            idx = idx[(igps != 0) if var == 'bend' else (igps == 0)]
+        return idx
+
+    def recordidx(self, idx):
+        """ recordidx(idx):
+        idx - indices of gps observations, as returned by obsidx
+
+        returns idx, bounds - idx grouped by record_number with a stable
+                 argsort, so each profile keeps its original order, and the
+                 offsets where each profile starts, ending with len(idx), so
+                 profile i is idx[bounds[i]:bounds[i+1]]
+        """
+        record_number = self.var('record_number')[idx]
+        order = np.argsort(record_number, kind='stable')
+        record_number = record_number[order]
+        starts = np.flatnonzero(record_number[1:] != record_number[:-1]) + 1
+        bounds = np.concatenate(([0], starts, [len(order)]))
+        return idx[order], bounds
 
     def toGeovals(self, OutDir, clobber=True):
         """ toGeovals(OutDir,clobber=True)
@@ -768,34 +828,22 @@ class Conv(BaseGSI):
                             OutVars.append("surface_height")
                             InVars.append("surface_height")
 
-                idx = grabobsidx(self.df, p, v)
-                if (np.sum(idx) == 0):
+                idx = self.obsidx(p, v)
+                if (len(idx) == 0):
                     print("No matching observations for Platform:%s Var:%s" % (p, v))
                     continue
-                print("Platform:%s Var:%s #Obs:%d" % (p, v, np.sum(idx)))
+                print("Platform:%s Var:%s #Obs:%d" % (p, v, len(idx)))
                 if v == 'bend':
-                    # sort record_number
-                    record_number = self.var('record_number')[idx]
-                    id_recordnum_sort = sorted(range(len(record_number)), key=record_number.__getitem__)
+                    # group the obs by profile, in record_number order
+                    idx, _ = self.recordidx(idx)
                     print("Sorting ", v, " obs referring to record_number in geovals")
-                    # record_number_sorted = [ record_number[ksort] for ksort in id_recordnum_sort ]
-
-                    # Shuffle idx referring to sorted record_number's subscripts "id_recordnum_sort".
-                    idx_tuples = np.where(idx.data)
-                    idx_id = idx_tuples[0]
-                    idx_sorted = [idx_id[ksort] for ksort in id_recordnum_sort]
-                    # another check if idx_sorted is correct to sort record_number
-                    # record_number_new = self.var('record_number')[idx_sorted]
-                    # for isort in range(len(record_number_new)):
-                    #     print('isort, idx, record_number, record_number_new',isort,\
-                    #         record_number[isort], record_number_new[isort] )
                 # set up output file
                 ncout = nc.Dataset(outname, 'w', format='NETCDF4')
                 ncout.setncattr(
                     "date_time", np.int32(
                         self.validtime.strftime("%Y%m%d%H")))
                 # get nlocs
-                nlocs = np.sum(idx)
+                nlocs = len(idx)
                 ncout.createDimension("nlocs", nlocs)
                 # other dims
                 if (v != "sst"):
@@ -821,10 +869,7 @@ class Conv(BaseGSI):
                         if vname in geovals_metadata_dict.keys():
                             dims = ("nlocs",) + var.dimensions[1:]
                             var_out = ncout.createVariable(geovals_metadata_dict[vname], vdata.dtype, dims)
-                            if v == 'bend':
-                                var_out[...] = vdata[idx_sorted, ...]
-                            else:
-                                var_out[...] = vdata[idx, ...]
+                            var_out[...] = vdata[idx, ...]
                         if vname in geovals_vars.keys():
 
                             if (len(var.dimensions) == 1):
@@ -838,18 +883,12 @@ class Conv(BaseGSI):
 
                             var_out = ncout.createVariable(geovals_vars[vname], vdata.dtype, dims)
 
-                            if v == 'bend':
-                                var_out[...] = vdata[idx_sorted, ...]
-                            else:
-                                var_out[...] = vdata[idx, ...]
+                            var_out[...] = vdata[idx, ...]
                             if vname == "surface_geopotential_height":
                                 # Copy surface_geopotential_height to surface_geometric_height
                                 var_out = ncout.createVariable(geovals_vars["surface_height"],
                                                                var.dtype, dims)
-                                if v == 'bend':
-                                    var_out[...] = vdata[idx_sorted, ...]
-                                else:
-                                    var_out[...] = vdata[idx, ...]
+                                var_out[...] = vdata[idx, ...]
 
                 ncout.close()
 
@@ -901,11 +940,11 @@ class Conv(BaseGSI):
                         TestKeyList.append(test_fields_[ncv])
                         TestVars.append(ncv)
                 # grab obs to process
-                idx = grabobsidx(self.df, p, v)
-                if (np.sum(idx) == 0):
+                idx = self.obsidx(p, v)
+                if (len(idx) == 0):
                     print("No matching observations for Platform:%s Var:%s" % (p, v))
                     continue
-                print("Platform:%s Var:%s #Obs:%d" % (p, v, np.sum(idx)))
+                print("Platform:%s Var:%s #Obs:%d" % (p, v, len(idx)))
 
                 outvars = conv_varnames[v]
                 for value in outvars:
@@ -923,22 +962,9 @@ class Conv(BaseGSI):
                     varAttrs[varDict[value]['qcKey']]['_FillValue'] = self.INT_FILL
 
                 if v == 'bend':
-                    # sort record_number
-                    record_number = self.var('record_number')[idx]
-                    id_recordnum_sort = sorted(range(len(record_number)), key=record_number.__getitem__)
+                    # group the obs by profile, in record_number order
+                    idx, _ = self.recordidx(idx)
                     print("Sorting ", v, " obs referring to record_number")
-                    # record_number_sorted = [ record_number[ksort] for ksort in id_recordnum_sort ]
-                    # print('record_number:', record_number)
-                    # print('record_number.size:', record_number.size)
-                    # for isort in range(len(record_number_sorted)):
-                    #     print('isort, idx, record_number, record_number_sorted',isort, idx[isort],\
-                    #         record_number[isort], record_number_sorted[isort] )
-
-                    # Shuffle idx referring to sorted record_number's subscripts "id_recordnum_sort".
-                    idx_tuples = np.where(idx.data)
-                    idx_id = idx_tuples[0]
-                    idx_sorted = [idx_id[ksort] for ksort in id_recordnum_sort]
-                    idx = idx_sorted
 
                 for o in range(len(outvars)):
                     obsdata = self.var(conv_gsivarnames[v][o])[idx]
@@ -1114,40 +1140,6 @@ class Conv(BaseGSI):
                 print("Processed %d Conventional obs processed to: %s" % (len(obsdata), outname))
 
 
-def grabobsidx(obsdata, platform, var):
-    """ grabobsidx(obsdata,platform,var):
-    obsdata  - netCDF dataset object
-    platform - string of observation type: 'sondes','sfc',etc.
-    var      - string of variable type: 'tsen','tv','q', etc.
-
-    returns idx - indices of observations to write out
-    """
-    code = obsdata['Observation_Type'][:]
-    if var in ['tsen', 'tv']:
-        iqt = obsdata['Setup_QC_Mark'][:]
-        if var == 'tsen':
-            idx2 = (iqt != 0)
-        elif var == 'tv':
-            idx2 = (iqt == 0)
-    elif var in ['bend', 'refract']:
-        igps = obsdata['GPS_Type'][:]
-        if var == 'bend':
-            idx2 = (igps != 0)
-        elif var == 'refract':
-            idx2 = (igps == 0)
-    else:
-        # to be consistent
-        idx2 = (code > -999)
-    # grab np logical based off of conv_dicts entry
-    if var == 'uv':
-        codes = uv_bufrtypes[platform]
-    else:
-        codes = conv_bufrtypes[platform]
-    idx = np.logical_and(np.in1d(code, codes), idx2)
-
-    return idx
-
-
 # satellite radiance observations
 class Radiances(BaseGSI):
     """ class Radiances - satellite radiance observations
@@ -4,6 +4,8 @@ import os
 import sys
 import glob
 import time
+import traceback
+from multiprocessing import Pool
 from pathlib import Path
 
 import gsi_ncdiag as gsid
@@ -14,8 +16,10 @@ def run_conv_obs(convfile, outdir, platforms):
     startt = time.time()
     Diag = gsid.Conv(convfile)
     Diag.read()
-    Diag.toIODAobs(outdir, platforms=platforms)
-    Diag.close()
+    try:
+        Diag.toIODAobs(outdir, platforms=platforms)
+    finally:
+        Diag.close()
     print("Time (OBS) %s[%s]: %.3g sec" % (convfile, ",".join(platforms), time.time() - startt))
     return 0
 
@@ -46,7 +50,10 @@ def run_conv_geo(convfile, outdir):
     startt = time.time()
     Diag = gsid.Conv(convfile)
     Diag.read()
-    Diag.toGeovals(outdir)
+    try:
+        Diag.toGeovals(outdir)
+    finally:
+        Diag.close()
     print("Time (GEO) %s: %.3g sec" % (convfile, time.time() - startt))
     return 0
 
@@ -81,109 +88,151 @@ def run_radiances_obsdiag(radfile, outdir):
     return 0
 
 
-ScriptName = os.path.basename(sys.argv[0])
-
-# Parse command line
-ap = argparse.ArgumentParser()
-ap.add_argument("input_dir", help="Path to concatenated GSI diag files")
-ap.add_argument("-o", "--obs_dir",
-                help="Path to directory to output observations")
-ap.add_argument("-g", "--geovals_dir",
-                help="Path to directory to output observations")
-ap.add_argument("-d", "--obsdiag_dir",
-                help="Path to directory to output observations")
-ap.add_argument("-b", "--add_obsbias", default=False,
-                help="Add ObsBias group to output observations")
-ap.add_argument("-q", "--add_qcvars", default=False,
-                help="Add QC variables to output observations")
-ap.add_argument("-r", "--add_testrefs", default=False,
-                help="Add TestReference group to output observations")
-
-MyArgs = ap.parse_args()
-
-DiagDir = MyArgs.input_dir
-
-# process obs files
-if MyArgs.obs_dir:
-    ObsDir = MyArgs.obs_dir
-    if not Path(ObsDir).is_dir():
-        raise Exception("Obs dir: '%s' does not exist." % ObsDir)
-    ObsBias = MyArgs.add_obsbias
-    QCVars = MyArgs.add_qcvars
-    TestRefs = MyArgs.add_testrefs
-    # conventional obs first
-    # get list of conv diag files
-    convfiles = glob.glob(DiagDir+'/*conv*')
-    for convfile in convfiles:
-        splitfname = convfile.split('/')[-1].split('_')
-        if 'conv' in splitfname:
-            i = splitfname.index('conv')
-            c = "_".join(splitfname[i:i + 2])
-        try:
-            for p in gsid.conv_platforms[c]:
-                run_conv_obs(convfile, ObsDir, [p])
-        except (KeyError, IndexError):
-            pass
-    # radiances next
-    radfiles = glob.glob(DiagDir+'/diag*')
-    for radfile in radfiles:
-        process = False
-        for p in gsid.rad_sensors:
-            if p in radfile:
-                process = True
-        if process:
-            run_radiances_obs(radfile, ObsDir, ObsBias, QCVars, TestRefs)
-    # atmospheric composition observations
-    # ozone
-    for radfile in radfiles:
-        process = False
-        oz_sensors = gsid.oz_lay_sensors + gsid.oz_lev_sensors
-        for p in oz_sensors:
-            if p in radfile:
-                process = True
-        if process:
-            run_oz_obs(radfile, ObsDir)
-
-# process geovals files
-if MyArgs.geovals_dir:
-    GeoDir = MyArgs.geovals_dir
-    # conventional obs first
-    # get list of conv diag files
-    convfiles = glob.glob(DiagDir+'/*conv*')
-    for convfile in convfiles:
-        try:
-            run_conv_geo(convfile, GeoDir)
-        except (KeyError, IndexError):
-            pass
-    # radiances next
-    radfiles = glob.glob(DiagDir+'/diag*')
-    for radfile in radfiles:
-        process = False
-        for p in gsid.rad_sensors:
-            if p in radfile:
-                process = True
-        if process:
-            run_radiances_geo(radfile, GeoDir)
-    # atmospheric composition observations
-    # ozone
-    for radfile in radfiles:
-        process = False
-        oz_sensors = gsid.oz_lay_sensors + gsid.oz_lev_sensors
-        for p in oz_sensors:
-            if p in radfile:
-                process = True
-        if process:
-            run_oz_geo(radfile, GeoDir)
-
-# process obsdiag files
-if MyArgs.obsdiag_dir:
-    ObsdiagDir = MyArgs.obsdiag_dir
-    # radiances only
-    radfiles = glob.glob(DiagDir+'/diag*')
-    for radfile in radfiles:
-        process = False
-        for p in gsid.rad_sensors:
-            if p in radfile:
-                process = True
-        if process:
-            run_radiances_obsdiag(radfile, ObsdiagDir)
+def run_job(func, args):
+    # run one job, returning its timing and any failure instead of raising
+    # so that one bad diag file does not take down the whole pool
+    startt = time.time()
+    try:
+        func(*args)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return func.__name__, args[0], time.time() - startt, error
+
+
+def run_jobs(jobs, nprocs):
+    # largest diag files first, so the slow ones do not start last
+    jobs = sorted(jobs, key=lambda job: os.path.getsize(job[1][0]), reverse=True)
+    if nprocs <= 1:
+        return [run_job(func, args) for func, args in jobs]
+    pool = Pool(processes=nprocs)
+    res = [pool.apply_async(run_job, args=(func, args)) for func, args in jobs]
+    pool.close()
+    pool.join()
+    return [r.get() for r in res]
+
+
+def report(results, walltime):
+    print("Summary of %d jobs in %.3g sec:" % (len(results), walltime))
+    for name, fname, elapsed, error in sorted(results, key=lambda r: r[2], reverse=True):
+        status = "FAILED" if error else "ok"
+        print("  %-22s %-6s %8.3g sec  %s" % (name, status, elapsed, fname))
+    failures = [r for r in results if r[3]]
+    for name, fname, elapsed, error in failures:
+        print("Failure in %s(%s):\n%s" % (name, fname, error))
+    return len(failures)
+
+
+def main():
+
+    # Parse command line
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input_dir", help="Path to concatenated GSI diag files")
+    ap.add_argument("-o", "--obs_dir",
+                    help="Path to directory to output observations")
+    ap.add_argument("-g", "--geovals_dir",
+                    help="Path to directory to output observations")
+    ap.add_argument("-d", "--obsdiag_dir",
+                    help="Path to directory to output observations")
+    ap.add_argument("-b", "--add_obsbias", default=False,
+                    help="Add ObsBias group to output observations")
+    ap.add_argument("-q", "--add_qcvars", default=False,
+                    help="Add QC variables to output observations")
+    ap.add_argument("-r", "--add_testrefs", default=False,
+                    help="Add TestReference group to output observations")
+    ap.add_argument("-n", "--nprocs", type=int, default=1,
+                    help="Number of tasks/processors for multiprocessing")
+
+    MyArgs = ap.parse_args()
+
+    DiagDir = MyArgs.input_dir
+    startt = time.time()
+    # every run_* job is independent, so collect them all and run them together
+    jobs = []
+
+    # process obs files
+    if MyArgs.obs_dir:
+        ObsDir = MyArgs.obs_dir
+        if not Path(ObsDir).is_dir():
+            raise Exception("Obs dir: '%s' does not exist." % ObsDir)
+        ObsBias = MyArgs.add_obsbias
+        QCVars = MyArgs.add_qcvars
+        TestRefs = MyArgs.add_testrefs
+        # conventional obs first
+        # get list of conv diag files
+        convfiles = glob.glob(DiagDir+'/*conv*')
+        for convfile in convfiles:
+            splitfname = convfile.split('/')[-1].split('_')
+            if 'conv' in splitfname:
+                i = splitfname.index('conv')
+                c = "_".join(splitfname[i:i + 2])
+                if c in gsid.conv_platforms:
+                    jobs.append((run_conv_obs, (convfile, ObsDir, gsid.conv_platforms[c])))
+        # radiances next
+        radfiles = glob.glob(DiagDir+'/diag*')
+        for radfile in radfiles:
+            process = False
+            for p in gsid.rad_sensors:
+                if p in radfile:
+                    process = True
+            if process:
+                jobs.append((run_radiances_obs, (radfile, ObsDir, ObsBias, QCVars, TestRefs)))
+        # atmospheric composition observations
+        # ozone
+        for radfile in radfiles:
+            process = False
+            oz_sensors = gsid.oz_lay_sensors + gsid.oz_lev_sensors
+            for p in oz_sensors:
+                if p in radfile:
+                    process = True
+            if process:
+                jobs.append((run_oz_obs, (radfile, ObsDir)))
+
+    # process geovals files
+    if MyArgs.geovals_dir:
+        GeoDir = MyArgs.geovals_dir
+        # conventional obs first
+        # get list of conv diag files
+        convfiles = glob.glob(DiagDir+'/*conv*')
+        for convfile in convfiles:
+            jobs.append((run_conv_geo, (convfile, GeoDir)))
+        # radiances next
+        radfiles = glob.glob(DiagDir+'/diag*')
+        for radfile in radfiles:
+            process = False
+            for p in gsid.rad_sensors:
+                if p in radfile:
+                    process = True
+            if process:
+                jobs.append((run_radiances_geo, (radfile, GeoDir)))
+        # atmospheric composition observations
+        # ozone
+        for radfile in radfiles:
+            process = False
+            oz_sensors = gsid.oz_lay_sensors + gsid.oz_lev_sensors
+            for p in oz_sensors:
+                if p in radfile:
+                    process = True
+            if process:
+                jobs.append((run_oz_geo, (radfile, GeoDir)))
+
+    # process obsdiag files
+    if MyArgs.obsdiag_dir:
+        ObsdiagDir = MyArgs.obsdiag_dir
+        # radiances only
+        radfiles = glob.glob(DiagDir+'/diag*')
+        for radfile in radfiles:
+            process = False
+            for p in gsid.rad_sensors:
+                if p in radfile:
+                    process = True
+            if process:
+                jobs.append((run_radiances_obsdiag, (radfile, ObsdiagDir)))
+
+    results = run_jobs(jobs, MyArgs.nprocs)
+    if report(results, time.time() - startt):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
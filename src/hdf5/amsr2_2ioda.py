@@ -24,7 +24,6 @@ import pyiodaconv.ioda_conv_engines as iconv
 from pyiodaconv.orddicts import DefaultOrderedDict
 from pyiodaconv.def_jedi_utils import set_metadata_attributes, set_obspace_attributes
 from pyiodaconv.def_jedi_utils import compute_scan_angle
-from pyiodaconv.def_jedi_utils import concat_obs_dict
 from pyiodaconv.def_jedi_utils import iso8601_string
 from pyiodaconv.def_jedi_utils import float_missing_value, int_missing_value, long_missing_value
 
@@ -59,27 +58,14 @@ def main(args):
 
     input_files = [(i) for i in args.input]
     # initialize
-    obs_data = {}
+    obs = iconv.ChunkedObsData(StaticKeys=[('sensorChannelNumber', metaDataName)])
     # read / process files in parallel
-#   with ProcessPoolExecutor(max_workers=args.threads) as executor:
-#       for file_obs_data in executor.map(get_data_from_files, input_files):
-#           if not file_obs_data:
-#               print("INFO: non-nominal file skipping")
-#               continue
-#           if obs_data:
-#               concat_obs_dict(obs_data, file_obs_data)
-#           else:
-#               obs_data = file_obs_data
-
-    for afile in input_files:
-        file_obs_data = get_data_from_files(afile)
+    for file_obs_data in iconv.read_in_parallel(get_data_from_files, input_files, args.threads):
         if not file_obs_data:
             print("INFO: non-nominal file skipping")
             continue
-        if obs_data:
-            concat_obs_dict(obs_data, file_obs_data)
-        else:
-            obs_data = file_obs_data
+        obs.append(file_obs_data)
+    obs_data = obs.finalize()
 
     nlocs_int = np.array(len(obs_data[('latitude', metaDataName)]), dtype='int64')
     nlocs = nlocs_int.item()
@@ -333,7 +319,7 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to read the input files in parallel.'
              ' (default: %(default)s)',
         type=int, default=1)
     optional.add_argument(
@@ -19,7 +19,6 @@ import pyiodaconv.ioda_conv_engines as iconv
 from pyiodaconv.def_jedi_utils import set_metadata_attributes, set_obspace_attributes
 from pyiodaconv.def_jedi_utils import epoch
 from pyiodaconv.orddicts import DefaultOrderedDict
-from pyiodaconv.def_jedi_utils import concat_obs_dict
 
 # globals
 SNPP_WMO_sat_ID = 224
@@ -63,17 +62,7 @@ def main(args):
 
     input_files = [(i) for i in args.input]
     # read / process files in parallel
-    obs_data = {}
-    # create a thread pool -- running out of memory for multiple files
-#   with ProcessPoolExecutor(max_workers=args.threads) as executor:
-#       for file_obs_data in executor.map(get_data_from_files, input_files):
-#           if not file_obs_data:
-#               print("INFO: non-nominal file skipping")
-#               continue
-#           if obs_data:
-#               concat_obs_dict(obs_data, file_obs_data)
-#           else:
-#               obs_data = file_obs_data
+    obs = iconv.ChunkedObsData(StaticKeys=[('sensorChannelNumber', metaDataName)])
 
     WMO_sat_ID = get_WMO_satellite_ID(input_files[0])
     GlobalAttrs['platform'] = np.int32(WMO_sat_ID)
@@ -82,21 +71,19 @@ def main(args):
         file_obs_data = remapBG(input_files)
         obs_data = file_obs_data
     else:
-        for afile in input_files:
-            file_obs_data = get_data_from_files(afile)
+        file_obs_datas = iconv.read_in_parallel(get_data_from_files, input_files, args.threads)
+        for afile, file_obs_data in zip(input_files, file_obs_datas):
             WMO_sat_ID = get_WMO_satellite_ID(afile)
             if not file_obs_data:
                 print("INFO: non-nominal file skipping")
                 continue
-            if obs_data:
-                concat_obs_dict(obs_data, file_obs_data)
-            else:
-                obs_data = file_obs_data
+            obs.append(file_obs_data)
             if WMO_sat_ID != GlobalAttrs['platform']:
                 print(' ERROR:  IODA and subsequent UFO expect individual files to be a single satellite and sensor ')
                 print('    .... initial file satellite: ', GlobalAttrs['platform'])
                 print('    ...... final file satellite: ', WMO_sat_ID)
                 sys.exit()
+        obs_data = obs.finalize()
 
     nlocs_int = np.array(len(obs_data[('latitude', metaDataName)]), dtype='int64')
     nlocs = nlocs_int.item()
@@ -461,7 +448,7 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to read the input files in parallel.'
              ' (default: %(default)s)',
         type=int, default=1)
     optional.add_argument(
@@ -14,7 +14,6 @@ Python code to ingest netCDF4 or HDF5 COWVR data
 import argparse
 from datetime import datetime, timezone
 import glob
-# from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import os.path
 from os import getcwd
@@ -62,27 +61,13 @@ def main(args):
 
     input_files = [(i) for i in args.input]
     # read / process files in parallel
-    obs_data = {}
-    # create a thread pool
-#   with ProcessPoolExecutor(max_workers=args.threads) as executor:
-#       for file_obs_data in executor.map(get_data_from_files, input_files):
-#           if not file_obs_data:
-#               print("INFO: non-nominal file skipping")
-#               continue
-#           if obs_data:
-#               concat_obs_dict(obs_data, file_obs_data)
-#           else:
-#               obs_data = file_obs_data
-
-    for afile in input_files:
-        file_obs_data = get_data_from_files(afile)
+    obs = iconv.ChunkedObsData(StaticKeys=[('sensorChannelNumber', metaDataName)])
+    for file_obs_data in iconv.read_in_parallel(get_data_from_files, input_files, args.threads):
         if not file_obs_data:
             print("INFO: non-nominal file skipping")
             continue
-        if obs_data:
-            concat_obs_dict(obs_data, file_obs_data)
-        else:
-            obs_data = file_obs_data
+        obs.append(file_obs_data)
+    obs_data = obs.finalize()
 
     nlocs_int = np.array(len(obs_data[('latitude', metaDataName)]), dtype='int64')
     nlocs = nlocs_int.item()
@@ -386,17 +371,6 @@ def record_time(tic=None, print_log=True):
         return toc
 
 
-def concat_obs_dict(obs_data, append_obs_data):
-    # For now we are assuming that the obs_data dictionary has the "golden" list
-    # of variables. If one is missing from append_obs_data, a warning will be issued.
-    append_keys = list(append_obs_data.keys())
-    for gv_key in obs_data.keys():
-        if gv_key in append_keys:
-            obs_data[gv_key] = np.append(obs_data[gv_key], append_obs_data[gv_key], axis=0)
-        else:
-            print("WARNING: ", gv_key, " is missing from append_obs_data dictionary")
-
-
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(
@@ -414,7 +388,7 @@ if __name__ == "__main__":
     optional = parser.add_argument_group(title='optional arguments')
     optional.add_argument(
         '-j', '--threads',
-        help='multiple threads can be used to load input files in parallel.'
+        help='number of processes used to read the input files in parallel.'
              ' (default: %(default)s)',
         type=int, default=1)
     optional.add_argument(
@@ -10,7 +10,7 @@
 import argparse
 import netCDF4 as nc
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 
 import pyiodaconv.ioda_conv_engines as iconv
@@ -39,7 +39,6 @@ VarDims = {
 }
 
 iso8601_string = '1970-01-01T00:00:00Z'
-epoch = datetime.fromisoformat(iso8601_string[:-1])
 
 
 class ascat(object):
@@ -77,7 +76,6 @@ class ascat(object):
         errs = errs*0.01     # Scale from zero to one.
         wflg = ncd.variables['wetland_flag'][:].ravel()
         tflg = ncd.variables['topography_flag'][:].ravel()
-        times = np.empty_like(vals, dtype=object)
 
         num_cells = ncd.dimensions['numCells'].size
         secs = ncd.variables['record_start_time'][:].ravel()
@@ -100,12 +98,8 @@ class ascat(object):
             wflg = wflg[mask]
             tflg = tflg[mask]
             secs = secs[mask]
-            times = times[mask]
 
-        for i in range(len(secs)):
-            base_date = datetime(2000, 1, 1) + timedelta(seconds=int(secs[i]))
-            time_offset = np.int64(round((base_date - epoch).total_seconds()))
-            times[i] = time_offset
+        times = iconv.offsets_to_epoch(datetime(2000, 1, 1), secs.astype(np.int64))
 
         self.varAttrs['dateTime', 'MetaData']['units'] = 'seconds since ' + iso8601_string
 
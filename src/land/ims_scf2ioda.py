@@ -17,7 +17,7 @@ from pyiodaconv.orddicts import DefaultOrderedDict
 locationKeyList = [
     ("latitude", "float"),
     ("longitude", "float"),
-    ("datetime", "string")
+    ("dateTime", "long")
 ]
 
 obsvars = {
@@ -72,7 +72,6 @@ class imsscf(object):
         lons = lons.astype('float32')
         errs = 0.08*vals
         qflg = 0*vals.astype('int32')
-        times = np.empty_like(vals, dtype=object)
 
         if self.mask == "maskout":
             mask = np.logical_not(vals.mask)
@@ -81,7 +80,6 @@ class imsscf(object):
             qflg = qflg[mask]
             lons = lons[mask]
             lats = lats[mask]
-            times = times[mask]
         # get global attributes
         start_datetime = data[1].analDate
         base_datetime = start_datetime.isoformat() + "Z"
@@ -95,11 +93,11 @@ class imsscf(object):
         AttrData["sensor"] = self.sensor
         AttrData['date_time_string'] = base_datetime
 
-        for i in range(len(lons)):
-            times[i] = base_datetime
+        # every observation is valid at the analysis time
+        times = iconv.offsets_to_epoch(start_datetime, np.zeros(len(lons), dtype=np.int64))
 
         # add metadata variables
-        self.outdata[('datetime', 'MetaData')] = times
+        self.outdata[('dateTime', 'MetaData')] = times
         self.outdata[('latitude', 'MetaData')] = lats
         self.outdata[('longitude', 'MetaData')] = lons
 
@@ -108,7 +106,7 @@ class imsscf(object):
             self.outdata[self.varDict[iodavar]['valKey']] = vals
             self.outdata[self.varDict[iodavar]['errKey']] = errs
             self.outdata[self.varDict[iodavar]['qcKey']] = qflg
-        DimDict['nlocs'] = len(self.outdata[('datetime', 'MetaData')])
+        DimDict['nlocs'] = len(self.outdata[('dateTime', 'MetaData')])
         AttrData['nlocs'] = np.int32(DimDict['nlocs'])
 
 
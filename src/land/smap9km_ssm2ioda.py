@@ -9,7 +9,7 @@ import os
 import argparse
 import netCDF4 as nc
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import pyiodaconv.ioda_conv_engines as iconv
 from collections import defaultdict, OrderedDict
@@ -40,7 +40,6 @@ VarDims = {
 
 # Usual reference time for these data is off j2000 base
 iso8601_string = 'seconds since 1970-01-01T00:00:00Z'
-epoch = datetime.fromisoformat(iso8601_string[14:-1])
 j2000_string = 'second since 2000-01-01T11:58:55Z'
 j2000_base_date = datetime(2000, 1, 1, 11, 58, 55, 816)
 
@@ -93,7 +92,6 @@ class smap(object):
         refsec = ncd.groups['Soil_Moisture_Retrieval_Data'].variables['tb_time_seconds'][:].ravel()
 
         deps = np.full_like(vals, self.assumedSoilDepth)
-        times = np.empty_like(vals, dtype=np.int64)
 
         if self.mask:
             with np.errstate(invalid='ignore'):
@@ -109,7 +107,6 @@ class smap(object):
             erowi = erowi[mask]
             ecoli = ecoli[mask]
             refsec = refsec[mask]
-            times = times[mask]
 
         vals = vals.astype('float32')
         lats = lats.astype('float32')
@@ -122,10 +119,8 @@ class smap(object):
         erowi = erowi.astype('int32')
         ecoli = ecoli.astype('int32')
 
-        for i in range(len(lons)):
-            dt = j2000_base_date + timedelta(seconds=int(refsec[i]))
-            times[i] = round((dt - epoch).total_seconds())
-            errs[i] = 0.04
+        times = iconv.offsets_to_epoch(j2000_base_date, refsec.astype(np.int64))
+        errs[:] = 0.04
         # add metadata variables
         self.outdata[('dateTime', 'MetaData')] = times
         self.varAttrs[('dateTime', 'MetaData')]['units'] = iso8601_string
@@ -39,7 +39,6 @@ VarDims = {
 }
 
 iso8601_string = 'seconds since 1970-01-01T00:00:00Z'
-epoch = datetime.fromisoformat(iso8601_string[14:-1])
 
 
 class smap(object):
@@ -85,7 +84,6 @@ class smap(object):
         qflg = ncd.groups['Soil_Moisture_Retrieval_Data'].variables['retrieval_qual_flag'][:].ravel()
 
         deps = np.full_like(vals, self.assumedSoilDepth)
-        times = np.empty_like(vals, dtype=np.int64)
 
         if self.mask:
             with np.errstate(invalid='ignore'):
@@ -96,7 +94,6 @@ class smap(object):
             deps = deps[mask]
             errs = errs[mask]
             qflg = qflg[mask]
-            times = times[mask]
 
         # file provides yyyy-mm-dd as an attribute
         # str_datetime = ncd.groups['Metadata'].groups['DatasetIdentification'].getncattr('creationDate')
@@ -105,7 +102,6 @@ class smap(object):
         str_split = self.filename.split("_")
         str_datetime = str_split[7]
         my_datetime = datetime.strptime(str_datetime, "%Y%m%dT%H%M%S")
-        time_offset = round((my_datetime - epoch).total_seconds())
         vals = vals.astype('float32')
         lats = lats.astype('float32')
         lons = lons.astype('float32')
@@ -113,19 +109,13 @@ class smap(object):
         errs = errs.astype('float32')
         qflg = qflg.astype('int32')
 
-        for i in range(len(lons)):
+        # assumed 4% SM rathern than -999.0, and only positive values
+        # with a retrieval quality flag above 5 are marked good
+        good = np.ma.filled(vals > 0.0, False)
+        errs[good] = 0.04*np.ma.getdata(vals)[good]
+        qflg = np.where(good & np.ma.filled(qflg > 5, False), 0, 1).astype('int32')
 
-            if vals[i] > 0.0:
-                # assumed 4% SM rathern than -999.0
-                errs[i] = 0.04*vals[i]
-                if qflg[i] > 5:
-                    qflg[i] = 0
-                else:
-                    qflg[i] = 1
-            else:
-                qflg[i] = 1
-
-            times[i] = time_offset
+        times = iconv.offsets_to_epoch(my_datetime, np.zeros(len(lons), dtype=np.int64))
 
         # add metadata variables
         self.outdata[('dateTime', 'MetaData')] = times
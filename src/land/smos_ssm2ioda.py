@@ -9,7 +9,7 @@ import os
 import argparse
 import netCDF4 as nc
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import pyiodaconv.ioda_conv_engines as iconv
 from collections import defaultdict, OrderedDict
@@ -18,7 +18,7 @@ from pyiodaconv.orddicts import DefaultOrderedDict
 locationKeyList = [
     ("latitude", "float"),
     ("longitude", "float"),
-    ("dateTime", "string")
+    ("dateTime", "long")
 ]
 
 obsvars = {
@@ -74,7 +74,6 @@ class SMOS_L2NRT(object):
         rfip = ncd.variables['RFI_probability'][:]
         ddys = ncd.variables['days_since_01-01-2000'][:]
         secs = ncd.variables['seconds_since_midnight'][:]
-        times = np.empty_like(vals, dtype=object)
 
         vals = vals.astype('float32')
         lats = lats.astype('float32')
@@ -91,21 +90,14 @@ class SMOS_L2NRT(object):
             qflg = qflg[mask]
             ddys = ddys[mask]
             secs = secs[mask]
-            times = times[mask]
         ncd.close()
 
-        for i in range(len(lons)):
+        # defined QC flag(Kerr et al., 2016), indexed on rfip as read
+        # (before the maskout) like the per observation loop it replaces
+        qflg = np.where(np.ma.filled(rfip.ravel()[:len(lons)] > 20.0, False), 1, 0).astype('int32')
 
-            # defined QC flag(Kerr et al., 2016)
-            if rfip[i] > 20.0:
-                qflg[i] = 1
-            else:
-                qflg[i] = 0
-
-            base_date = datetime(2000, 1, 1) + timedelta(days=int(ddys[i]))
-            dt = base_date + timedelta(seconds=int(secs[i]))
-            base_datetime = dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-            times[i] = base_datetime
+        offsets = ddys.astype(np.int64)*86400 + secs.astype(np.int64)
+        times = iconv.offsets_to_epoch(datetime(2000, 1, 1), offsets)
 
         # add metadata variables
         self.outdata[('dateTime', 'MetaData')] = times
@@ -135,11 +135,8 @@ def read_input(input_args):
     for v in input_vars:
         data_in[v] = data_in[v][mask]
 
-    # create a string version of the date for each observation
-    dates = []
-    for i in range(len(lons)):
-        dates.append(round(3600*data_in['scan_line_time'][i]))
-    dates = np.array(dates, dtype=np.int64)
+    # the scan line times are in fractional hours since the basetime
+    dates = np.rint(3600*np.ma.getdata(data_in['scan_line_time'])).astype(np.int64)
 
     # output values
     nchans = len(chan_number)
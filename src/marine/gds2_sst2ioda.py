@@ -10,13 +10,13 @@
 from __future__ import print_function
 import argparse
 import netCDF4 as nc
-from datetime import datetime, timedelta
-import dateutil.parser
+from datetime import datetime
 import numpy as np
 from multiprocessing import Pool
 import os
 
 import pyiodaconv.ioda_conv_engines as iconv
+import pyiodaconv.thinning_utils as thinning
 from pyiodaconv.orddicts import DefaultOrderedDict
 
 os.environ["TZ"] = "UTC"
@@ -48,9 +48,6 @@ incoming_vars = ['quality_level',
                  'sses_standard_deviation',
                  'sea_surface_temperature']
 
-iso8601_string = locationKeyList[meta_keys.index('dateTime')][2]
-epoch = datetime.fromisoformat(iso8601_string[14:-1])
-
 metaDataName = iconv.MetaDataName()
 obsValName = iconv.OvalName()
 obsErrName = iconv.OerrName()
@@ -96,7 +93,7 @@ def read_input(input_args):
 
     # get the base time (should only have 1 or 2 time slots)
     time_base = ncd.variables['time'][:]
-    basetime = dateutil.parser.parse(ncd.variables['time'].units[-20:])
+    time_units = ncd.variables['time'].units
 
     # get some of the global attributes that we are interested in
 
@@ -159,14 +156,10 @@ def read_input(input_args):
     lats = lats[mask]
     for v in incoming_vars:
         data_in[v] = data_in[v][mask]
-
-    # create a string version of the date for each observation
-    dates = []
     data_in['sst_dtime'] = data_in['sst_dtime'][mask]
-    for i in range(len(lons)):
-        obs_date = basetime + timedelta(seconds=float(time[i]+data_in['sst_dtime'][i]))
-        obs_date = int((obs_date - epoch).total_seconds())
-        dates.append(np.int64(obs_date))
+
+    # the observation time is the basetime offset plus the sst_dtime
+    dates = iconv.cf_time_to_epoch(time + data_in['sst_dtime'], time_units)
 
     # calculate output values
     # Note: the qc flags in GDS2.0 run from 0 to 5, with higher numbers
@@ -282,6 +275,7 @@ def main():
         help='if set, only the skin or subskin sst is output.'
              ' Otherwise, bulk sst, and skin sst are both output.',
         action='store_true')
+    thinning.add_thinning_arguments(parser)
 
     args = parser.parse_args()
     args.date = datetime.strptime(args.date, '%Y%m%d%H')
@@ -299,6 +293,7 @@ def main():
     global_config['output_sst'] = args.sst
     global_config['output_skin_sst'] = args.skin_sst
     pool_inputs = [(i, global_config) for i in args.input]
+    thinner = thinning.thinner_from_args(args)
 
     # read / process files in parallel
     pool = Pool(args.threads)
@@ -311,6 +306,8 @@ def main():
     GlobalAttrs['sourceFiles'] = ", ".join(args.input)
     GlobalAttrs['datetimeReference'] = args.date.strftime("%Y-%m-%dT%H:%M:%SZ")
     GlobalAttrs['thinning'] = args.thin
+    if thinner is not None:
+        GlobalAttrs['spatialThinning'] = str(thinner)
 
     for i in range(1, len(obs)):
         for k in obs_data:
@@ -318,6 +315,15 @@ def main():
             obs_data[k] = np.concatenate(
                 (obs_data[k], obs[i][0][k]), axis=axis)
 
+    # optional spatial thinning of the observations of all the files at
+    # once, keeping the best quality level per box, or superobbing of the
+    # skin and bias corrected sst of each box
+    if thinner is not None:
+        superob_keys = [((key, obsValName), (key, obsErrName)) for key in var_keys
+                        if (key, obsValName) in obs_data]
+        obs_data = thinner.thin(obs_data, ('latitude', metaDataName), ('longitude', metaDataName),
+                                qc=obs_data[(superob_keys[0][0][0], qcName)], superob_keys=superob_keys)
+
     # Total number of observations.
     nlocs = len(obs_data[('dateTime', metaDataName)])
 
@@ -240,11 +240,8 @@ class IODA(object):
             varAttrs[(value, obsErrName)]['_FillValue'] = float_missing_value
             varAttrs[(value, qcName)]['_FillValue'] = int_missing_value
 
-        # data is the dictionary containing IODA friendly data structure
-        data = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
-
-        nprofs = 0
-        nlocs = 0
+        # Gather one chunk per profile and concatenate them once at the end.
+        profiles = iconv.ChunkedObsData()
         for obs in obsList:
 
             nprofs = obs.data['n_obs']
@@ -253,54 +250,32 @@ class IODA(object):
                 continue
 
             for n in range(nprofs):
-                for k, depth in enumerate(obs.data['depthBelowWaterSurface'][n]):
-                    nlocs += 1
-                    # Transfer the MetaData info into the IODA final data container.
-                    for key in meta_keys:
-                        dtypestr = locationKeyList[meta_keys.index(key)][1]
-                        if isinstance(obs.data[key][n], list):
-                            val = obs.data[key][n][k]
-                        else:
-                            val = obs.data[key][n]
-                        varVals = np.array(val, dtype=dtypes[dtypestr])
-                        # If on the first time through, set the data dict entry
-                        # to a numpy array with a specified data type. Otherwise, append
-                        # the incoming data to the current data.
-                        if (key, metaDataName) in data:
-                            data[(key, metaDataName)] = np.append(
-                                data[(key, metaDataName)], varVals)
-                        else:
-                            data[(key, metaDataName)] = varVals
-
-                    # Fill up the final array of observed values, obsErrors, and Qc
-                    for key in varDict.keys():
-                        value = varDict[key][0]
-                        varErr = key + '_err'
-                        varQc = key + '_qc'
-
-                        # ObsValue
-                        varVals = np.array(obs.data[key][n][k], dtype=dtypes['float'])
-                        if (value, obsValName) in data:
-                            data[(value, obsValName)] = np.append(
-                                data[(value, obsValName)], varVals)
-                        else:
-                            data[(value, obsValName)] = varVals
-
-                        # ObsError
-                        varVals = np.array(obs.data[varErr][n][k], dtype=dtypes['float'])
-                        if (value, obsErrName) in data:
-                            data[(value, obsErrName)] = np.append(
-                                data[(value, obsErrName)], varVals)
-                        else:
-                            data[(value, obsErrName)] = varVals
-
-                        # QC
-                        varVals = np.array(obs.data[varQc][n]*100, dtype=dtypes['integer'])
-                        if (value, qcName) in data:
-                            data[(value, qcName)] = np.append(
-                                data[(value, qcName)], varVals)
-                        else:
-                            data[(value, qcName)] = varVals
+                nlevs = len(obs.data['depthBelowWaterSurface'][n])
+                profile = {}
+                # Transfer the MetaData info into the IODA final data container,
+                # repeating the per profile values at every level.
+                for key in meta_keys:
+                    dtypestr = locationKeyList[meta_keys.index(key)][1]
+                    val = obs.data[key][n]
+                    if isinstance(val, (list, np.ndarray)):
+                        varVals = np.array(val[:nlevs], dtype=dtypes[dtypestr])
+                    else:
+                        varVals = np.full(nlevs, val, dtype=dtypes[dtypestr])
+                    profile[(key, metaDataName)] = varVals
+
+                # Fill up the final array of observed values, obsErrors, and Qc
+                for key in varDict.keys():
+                    value = varDict[key][0]
+                    varErr = key + '_err'
+                    varQc = key + '_qc'
+                    profile[(value, obsValName)] = np.array(obs.data[key][n][:nlevs], dtype=dtypes['float'])
+                    profile[(value, obsErrName)] = np.array(obs.data[varErr][n][:nlevs], dtype=dtypes['float'])
+                    profile[(value, qcName)] = np.full(nlevs, obs.data[varQc][n]*100, dtype=dtypes['integer'])
+
+                profiles.append(profile)
+
+        nlocs = len(profiles)
+        data = profiles.finalize()
 
         print(f"Found a total number of observations: {nlocs}")
 
@@ -111,10 +111,8 @@ def read_input(input_args):
     for v in input_vars:
         data_in[v] = data_in[v][mask]
 
-    # create a string version of the date for each observation
-    dates = np.empty(len(lons), dtype=np.int64)
-    for i in range(len(lons)):
-        dates[i] = round(data_in['time'][i])
+    # the observation times rounded to seconds since the basetime
+    dates = np.rint(np.ma.getdata(data_in['time'])).astype(np.int64)
 
     # allocate space for output depending on which variables are to be saved
     obs_dim = (len(lons))
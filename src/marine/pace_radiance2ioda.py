@@ -123,10 +123,8 @@ def read_input(input_args):
     lons = lons[mask]
     lats = lats[mask]
 
-    # create a string version of the date for each observation
-    dates = np.empty(len(lons), dtype=np.int64)
-    for i in range(len(lons)):
-        dates[i] = round(time[i])
+    # the observation times rounded to seconds since the basetime
+    dates = np.rint(np.ma.getdata(time)).astype(np.int64)
 
     # output values
     nchans = len(chan_number)
@@ -28,6 +28,8 @@ locationKeyList = [
 
 GlobalAttrs = {}
 
+float_missing_value = iconv.get_default_fill_val(np.float32)
+
 iso8601_string = 'seconds since 1970-01-01T00:00:00Z'
 epoch = datetime.fromisoformat(iso8601_string[14:-1])
 
@@ -36,7 +38,7 @@ class Salinity(object):
     def __init__(self, filenames, date):
         self.filenames = filenames
         self.date = date
-        self.data = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
+        self.data = iconv.ChunkedObsData(MergeKeys=[(name, 'MetaData') for name, _ in locationKeyList])
         self._read()
 
     # Open obs file and read/load relevant info
@@ -70,24 +72,25 @@ class Salinity(object):
             sss_err = sss_err[mask]
             sss_qc = sss_qc[mask]
 
-            for i in range(len(lon)):
-                if sss_qc[i] <= 150:
-                    sss_qc[i] = 0
-                else:
-                    sss_qc[i] = 1
-                # get date from filename
-                n = f.find("SM_")
-                date1 = f[n+19:n+19+8]
-                HH1 = f[n+19+9:n+19+11]
-                MM1 = f[n+19+11:n+19+13]
-                SS1 = f[n+19+13:n+19+15]
-                #
-                this_dt = datetime.strptime(date1+HH1+MM1+SS1, '%Y%m%d%H%M%S')
-                time_offset = round((this_dt - epoch).total_seconds())
-                locKey = lat[i], lon[i], time_offset
-                self.data[locKey][valKey] = sss[i]
-                self.data[locKey][errKey] = sss_err[i]
-                self.data[locKey][qcKey] = sss_qc[i]
+            sss_qc = np.where(sss_qc <= 150, 0, 1).astype(np.int32)
+            # get date from filename
+            n = f.find("SM_")
+            date1 = f[n+19:n+19+8]
+            HH1 = f[n+19+9:n+19+11]
+            MM1 = f[n+19+11:n+19+13]
+            SS1 = f[n+19+13:n+19+15]
+            #
+            this_dt = datetime.strptime(date1+HH1+MM1+SS1, '%Y%m%d%H%M%S')
+            time_offset = round((this_dt - epoch).total_seconds())
+            times = np.full(len(lon), time_offset, dtype=np.int64)
+            self.data.append({
+                ('latitude', 'MetaData'): np.ma.filled(lat, float_missing_value).astype(np.float32),
+                ('longitude', 'MetaData'): np.ma.filled(lon, float_missing_value).astype(np.float32),
+                ('dateTime', 'MetaData'): times,
+                valKey: np.ma.filled(sss, float_missing_value).astype(np.float32),
+                errKey: np.ma.filled(sss_err, float_missing_value).astype(np.float32),
+                qcKey: sss_qc,
+            })
             ncd.close()
 
 
@@ -122,9 +125,9 @@ def main():
     sal = Salinity(args.input, fdate)
 
     # write them out
-    ObsVars, Location = iconv.ExtractObsData(sal.data, locationKeyList)
+    ObsVars = sal.data.finalize()
 
-    DimDict = {'Location': Location}
+    DimDict = {'Location': len(ObsVars[('dateTime', 'MetaData')])}
     writer = iconv.IodaWriter(args.output, locationKeyList, DimDict)
 
     VarAttrs = DefaultOrderedDict(lambda: DefaultOrderedDict(dict))
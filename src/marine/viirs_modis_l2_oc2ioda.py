@@ -110,10 +110,8 @@ def read_input(input_args):
     for v in input_vars:
         data_in[v] = data_in[v][mask]
 
-    # create a string version of the date for each observation
-    dates = []
-    for i in range(len(lons)):
-        dates.append(np.int64(data_in['time'][i]))
+    # the observation times in whole seconds since the basetime
+    dates = np.ma.getdata(data_in['time']).astype(np.int64)
 
     # allocate space for output depending on which variables are to be saved
     obs_dim = (len(lons))
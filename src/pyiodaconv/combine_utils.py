@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+"""
+Helpers shared by the tools that combine several IODA files into one
+(combine_files.py and combine_obsspace.py): scatter the values of each
+input file onto the unique output locations, and combine the matching
+GeoVaLs files the same way.
+"""
+
+import netCDF4 as nc
+import numpy as np
+
+
+def scatter_slab(OutVals, inv, Vvals, fillvals):
+    # copy the non-missing values of one input slab into the preallocated
+    # output at the unique locations its rows map to, later files win
+    where = np.nonzero(~np.isin(Vvals, fillvals))
+    OutVals[(inv[where[0]],) + where[1:]] = Vvals[where]
+
+
+def combine_geovals(GeoFileList, OutGeoFile, inv, nlocs):
+    # combine GeoVaLs the same two-pass way, inv maps the concatenated
+    # locations of the input files to the nlocs output locations
+    GeoVarNames = []
+    GeoVarTypes = {}
+    GeoVarDims = {}
+    FileNlocs = []
+    dimsizes = {"nlocs": nlocs}
+    for f in GeoFileList:
+        ncf = nc.Dataset(f, mode='r')
+        if f == GeoFileList[0]:
+            date_time = ncf.getncattr("date_time")
+        FileNlocs.append(len(ncf.dimensions["nlocs"]))
+        for key, value in ncf.variables.items():
+            if key not in GeoVarTypes:
+                GeoVarNames.append(key)
+                GeoVarTypes[key] = value.dtype
+                if value.ndim == 1:
+                    GeoVarDims[key] = ("nlocs", )
+                elif 'nlevs' in value.dimensions:
+                    GeoVarDims[key] = ("nlocs", "nlevs")
+                else:
+                    GeoVarDims[key] = ("nlocs", "ninterfaces")
+                if value.ndim > 1:
+                    dimsizes.setdefault(GeoVarDims[key][1], value.shape[1])
+        ncf.close()
+    offsets = np.concatenate(([0], np.cumsum(FileNlocs)))
+
+    of = nc.Dataset(OutGeoFile, 'w', format='NETCDF4')
+    of.setncattr("date_time", date_time)
+    for dimname, dimsize in dimsizes.items():
+        of.createDimension(dimname, dimsize)
+    fills = [nc.default_fillvals['i4'], np.abs(nc.default_fillvals['f4'])]
+    for var in GeoVarNames:
+        shape = tuple(dimsizes[d] for d in GeoVarDims[var])
+        OutVals = np.full(shape, fills[1])
+        for i, f in enumerate(GeoFileList):
+            ncf = nc.Dataset(f, mode='r')
+            if var in ncf.variables:
+                scatter_slab(OutVals, inv[offsets[i]:offsets[i+1]], np.array(ncf.variables[var]), fills)
+            ncf.close()
+        var_out = of.createVariable(var, GeoVarTypes[var], GeoVarDims[var])
+        var_out[...] = OutVals
+    of.close()
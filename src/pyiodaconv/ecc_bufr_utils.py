@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+"""
+Helpers shared by the ecCodes based conventional BUFR converters
+(synop, ship, buoy, amdar and sonde) to index the messages of their
+input files from the section headers alone, to spread the message
+decoding over a pool of worker processes and to remember which keys
+each message template defines.
+"""
+
+import os
+import json
+import mmap
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import eccodes as ecc
+
+# Number of tasks handed to the pool per worker, a few more than
+# one so that files of uneven size still balance across the workers.
+_tasks_per_worker = 4
+
+# Optional sidecar index kept in an index directory for each input
+# file, one row per message.
+_index_suffix = '.idx'
+_index_columns = ['offset', 'length', 'edition', 'category', 'subcategory', 'nsubsets']
+
+# Keys holding the delayed replication factors of an unpacked message.
+_repfac_keys = ['delayedDescriptorReplicationFactor',
+                'shortDelayedDescriptorReplicationFactor',
+                'extendedDelayedDescriptorReplicationFactor']
+
+
+def _parse_header(buf, pos, msg_size):
+    # Read the data category and the number of subsets of the message at
+    # pos from its section 1 and section 3 headers, without unpacking it.
+    # Editions 2 and 3 put the category two octets earlier than edition 4.
+    edition = buf[pos+7]
+    sec1 = pos + 8
+    sec1_len = int.from_bytes(buf[sec1:sec1+3], 'big')
+    if edition >= 4:
+        flags, category, subcategory = buf[sec1+9], buf[sec1+10], buf[sec1+11]
+    else:
+        flags, category, subcategory = buf[sec1+7], buf[sec1+8], buf[sec1+9]
+    sec3 = sec1 + sec1_len
+    if flags & 0x80:
+        # skip the optional (local) section 2
+        sec3 += int.from_bytes(buf[sec3:sec3+3], 'big')
+    if edition < 2 or sec1_len < 17 or sec3 + 7 > pos + msg_size:
+        return None
+    nsubsets = int.from_bytes(buf[sec3+4:sec3+6], 'big')
+    return [pos, msg_size, edition, category, subcategory, nsubsets]
+
+
+def scan_messages(file_name):
+    """
+    Return one [offset, length, edition, category, subcategory, nsubsets]
+    row per complete BUFR message in a file. A message counts as complete
+    if its section 0 length points at a '7777' end section and its
+    headers are consistent; anything else is skipped.
+    """
+    messages = []
+    if os.path.getsize(file_name) == 0:
+        return messages
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        pos = buf.find(b'BUFR')
+        while pos >= 0:
+            msg_size = int.from_bytes(buf[pos+4:pos+7], 'big')
+            header = None
+            if msg_size > 8 and buf[pos+msg_size-4:pos+msg_size] == b'7777':
+                header = _parse_header(buf, pos, msg_size)
+            if header is not None:
+                messages.append(header)
+                pos = buf.find(b'BUFR', pos + msg_size)
+            else:
+                logging.info(f"Skipping incomplete BUFR message at byte {pos} of {file_name}")
+                pos = buf.find(b'BUFR', pos + 4)
+    return messages
+
+
+def load_index(file_name, index_dir=None):
+    """
+    Return the message index of a file by scanning it. When index_dir is
+    set, the index is read from the sidecar file kept there for the same
+    file path, size and modification time, or else scanned and (if the
+    directory allows it) saved there for the next run. The sidecar is
+    written to a temporary file first and moved into place, so that
+    concurrent runs never read a partly written index.
+    """
+    if index_dir is None:
+        return scan_messages(file_name)
+
+    stat = os.stat(file_name)
+    source = os.path.abspath(file_name)
+    index_file = os.path.join(index_dir, os.path.basename(file_name) + _index_suffix)
+    try:
+        with open(index_file, 'r') as fh:
+            index = json.load(fh)
+        stamp = (index['file'], index['size'], index['mtime'], index['columns'])
+        if stamp == (source, stat.st_size, stat.st_mtime, _index_columns):
+            return index['messages']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    messages = scan_messages(file_name)
+    index = {'file': source, 'size': stat.st_size, 'mtime': stat.st_mtime,
+             'columns': _index_columns, 'messages': messages}
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=index_dir, suffix=_index_suffix)
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(index, fh)
+            os.replace(tmp_file, index_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+    except OSError:
+        logging.info(f"Unable to write BUFR message index: {index_file}")
+    return messages
+
+
+def split_work(file_names, workers, categories=None, index_dir=None):
+    """
+    Split the input files into (file_name, offsets) tasks holding the
+    byte offsets of the messages to decode, keeping only messages of the
+    given data categories when categories is set, and caching the
+    message indexes in index_dir when that is set (see load_index).
+    With a single worker every file is one task; otherwise the files are
+    cut into tasks of roughly equal size so that one large file is still
+    shared out across the pool.
+    """
+    tasks = []
+    indexes = [load_index(fname, index_dir) for fname in file_names]
+    if categories is not None:
+        indexes = [[m for m in index if m[3] in categories] for index in indexes]
+    if workers <= 1:
+        for fname, index in zip(file_names, indexes):
+            tasks.append((fname, [m[0] for m in index]))
+        return tasks
+
+    total = sum(m[1] for index in indexes for m in index)
+    target = max(1, total // (workers * _tasks_per_worker))
+    for fname, index in zip(file_names, indexes):
+        offsets = []
+        size = 0
+        for m in index:
+            offsets.append(m[0])
+            size += m[1]
+            if size >= target:
+                tasks.append((fname, offsets))
+                offsets = []
+                size = 0
+        if offsets:
+            tasks.append((fname, offsets))
+    logging.info(f"Split {len(file_names)} files into {len(tasks)} tasks for {workers} workers")
+    return tasks
+
+
+def map_tasks(func, tasks, workers, initializer=None, initargs=()):
+    """
+    Apply func to every task and return the results in task order, in
+    this process when workers is 1 or else on a pool of processes.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [func(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        return list(executor.map(func, tasks))
+
+
+def merge_parts(data, count, parts):
+    """
+    Append the (data, count) results of each task onto data and count
+    in task order, which gives the same arrays as a serial decode. The
+    pieces of each key are concatenated once, as np.append of every
+    part in turn would give them.
+    """
+    pieces = {key: [np.ravel(data[key])] for key in data.keys()}
+    for part_data, part_count in parts:
+        for key in data.keys():
+            pieces[key].append(np.ravel(part_data[key]))
+        for n in range(len(count)):
+            count[n] += part_count[n]
+    for key in data.keys():
+        data[key] = np.concatenate(pieces[key])
+    return data, count
+
+
+class TemplateKeyCache(object):
+    """
+    Cache of which ecCodes keys, out of a fixed list, each BUFR template
+    defines. A template is identified by the unexpandedDescriptors of a
+    message together with which of its delayed replications are empty,
+    since a zero delayed replication drops the keys it repeats. Every key
+    is probed with codes_is_defined once per template, and the resolution
+    (found or absent) is reused for every later message of that template.
+    So the converters can skip alternative key names a template lacks
+    without raising KeyValueNotFoundError.
+    """
+
+    def __init__(self, keys):
+        self._keys = [key for key in dict.fromkeys(keys) if key != 'Constructed']
+        self._templates = {}
+
+    def defined_keys(self, bufr):
+        template = tuple(ecc.codes_get_array(bufr, 'unexpandedDescriptors'))
+        empty = []
+        for repfac_key in _repfac_keys:
+            # probe first, so messages without this kind of replication
+            # cost no KeyValueNotFoundError
+            if ecc.codes_is_defined(bufr, repfac_key):
+                empty.append(tuple(ecc.codes_get_array(bufr, repfac_key) == 0))
+            else:
+                empty.append(None)
+        template = (template, tuple(empty))
+        defined = self._templates.get(template)
+        if defined is None:
+            defined = frozenset(key for key in self._keys if ecc.codes_is_defined(bufr, key))
+            self._templates[template] = defined
+        return defined
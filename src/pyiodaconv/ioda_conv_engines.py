@@ -1,8 +1,15 @@
 #!/usr/bin/env python
 import datetime as dt
+import os
+import re
+import sys
+import warnings
 from pyioda import ioda_obs_space as ioda_os
 import numpy as np
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
 
 # define vars
 _metagroup = 'MetaData'
@@ -54,6 +61,9 @@ def get_default_fill_val(mydtype, isDateTime=False):
         fillval = -32767
     elif (NumpyDtype == np.dtype('int8')):
         fillval = -127
+    elif (NumpyDtype.kind == 'M'):
+        # datetime64 values are written as int64 epoch seconds
+        fillval = -9223372036854775806
     elif (NumpyDtype == np.dtype('S1')):
         fillval = '\x00'
     elif (NumpyDtype == np.dtype('U1')):
@@ -72,10 +82,121 @@ def get_default_fill_val(mydtype, isDateTime=False):
 _default_units = {
     'latitude': 'degrees_north',
     'longitude': 'degrees_east',
+    'dateTime': 'seconds since 1970-01-01T00:00:00Z',
+}
+
+
+def is_datetime_array(Vvals):
+    # True for datetime64 arrays and for object arrays holding datetime
+    # objects; empty arrays are never treated as datetimes
+    Vvals = np.asarray(Vvals)
+    if (Vvals.dtype.kind == 'M'):
+        return True
+    if (Vvals.dtype == np.dtype('object')) and Vvals.size > 0:
+        return isinstance(Vvals.flat[0], dt.datetime)
+    return False
+
+
+def _fill_masked_times(Vvals):
+    # replace the masked elements of a time array by values that
+    # datetime_to_epoch turns into the fill value (or drops, for ints)
+    if (Vvals.dtype.kind in ['i', 'u', 'f']):
+        return Vvals.filled(0)
+    if (Vvals.dtype.kind == 'M'):
+        return Vvals.filled(np.datetime64('NaT'))
+    if (Vvals.dtype.kind in ['U', 'S']):
+        return Vvals.filled('')
+    Filled = np.array(Vvals.data, dtype=object, copy=True)
+    Filled[np.ma.getmaskarray(Vvals)] = None
+    return Filled
+
+
+def datetime_to_epoch(Vvals):
+    # Convert an array of ISO 8601 strings ("%Y-%m-%dT%H:%M:%SZ"),
+    # datetime objects or datetime64 values to int64 seconds since
+    # 1970-01-01T00:00:00Z. Naive datetimes are taken to be UTC and
+    # integer arrays are assumed to be epoch seconds already. Times
+    # with fractions of a second are rounded to the nearest second
+    # (halves to even, as round() of the timestamp does). Missing times
+    # become the int64 fill value, and masked arrays stay masked.
+    Mask = np.ma.getmask(Vvals)
+    if (Mask is not np.ma.nomask):
+        Epochs = datetime_to_epoch(_fill_masked_times(Vvals))
+        Epochs[np.ma.getmaskarray(Vvals)] = get_default_fill_val(np.int64)
+        return np.ma.array(Epochs, mask=Mask)
+    Vvals = np.asarray(Vvals)
+    if (Vvals.size == 0):
+        return np.zeros(Vvals.shape, dtype=np.int64)
+    if (Vvals.dtype.kind in ['i', 'u']):
+        return Vvals.astype(np.int64)
+    if (Vvals.dtype == np.dtype('object')):
+        Example = next((x for x in Vvals.flat if x is not None), None)
+        if isinstance(Example, dt.datetime):
+            # numpy normalises timezone aware datetimes to UTC, warning
+            # only that datetime64 itself keeps no timezone
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                Vvals = Vvals.astype('datetime64[us]')
+        else:
+            Vvals = np.where(np.equal(Vvals, None), '', Vvals).astype(str)
+    if (Vvals.dtype.kind in ['U', 'S']):
+        # numpy parses ISO 8601 but rejects the trailing UTC designator,
+        # blank and '\x00' fill strings become NaT
+        Vvals = np.char.rstrip(Vvals.astype(str), 'Z\x00 ').astype('datetime64[us]')
+    Vvals = Vvals.astype('datetime64[us]')
+    Seconds, Micro = np.divmod(Vvals.astype(np.int64), 1000000)
+    Seconds += (Micro > 500000) | ((Micro == 500000) & (Seconds % 2 == 1))
+    return np.where(np.isnat(Vvals), get_default_fill_val(np.int64), Seconds).astype(np.int64)
+
+
+# Length in seconds of the time units accepted in CF "<units> since <time>"
+_time_unit_seconds = {
+    'microseconds': 1e-6, 'microsecond': 1e-6,
+    'milliseconds': 1e-3, 'millisecond': 1e-3, 'msec': 1e-3, 'ms': 1e-3,
+    'seconds': 1, 'second': 1, 'secs': 1, 'sec': 1, 's': 1,
+    'minutes': 60, 'minute': 60, 'mins': 60, 'min': 60,
+    'hours': 3600, 'hour': 3600, 'hrs': 3600, 'hr': 3600, 'h': 3600,
+    'days': 86400, 'day': 86400, 'd': 86400,
 }
+_cf_time_units = re.compile(r'\s*(\w+)\s+since\s+(\d{1,4})-(\d{1,2})-(\d{1,2})'
+                            r'(?:[T\s]+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?')
+
+
+def offsets_to_epoch(Reference, Offsets, Scale=1):
+    # Convert an array of time offsets from Reference (anything
+    # datetime_to_epoch accepts for one element) to int64 seconds since
+    # 1970-01-01T00:00:00Z. Offsets are multiplied by Scale to get
+    # seconds and rounded down to a whole second, as int() of a
+    # timedelta would. Masked or NaN offsets become the int64 fill value.
+    ref = datetime_to_epoch(np.asarray([Reference]))[0]
+    Offsets = np.ma.masked_invalid(np.ma.asarray(Offsets))
+    missing = np.ma.getmaskarray(Offsets)
+    Offsets = Offsets.filled(0)
+    if (Offsets.dtype.kind in ['i', 'u']) and float(Scale).is_integer():
+        Vvals = Offsets.astype(np.int64) * int(Scale)
+    else:
+        Vvals = np.floor(Offsets.astype(np.float64) * Scale).astype(np.int64)
+    return np.where(missing, get_default_fill_val(np.int64), Vvals + ref).astype(np.int64)
+
+
+def cf_time_to_epoch(Vvals, Units):
+    # Convert an array of times in CF units such as "seconds since
+    # 1981-01-01 00:00:00" or "days since 2000-1-1" to int64 seconds
+    # since 1970-01-01T00:00:00Z. The reference time is taken to be UTC.
+    match = _cf_time_units.match(Units)
+    if (match is None) or (match.group(1).lower() not in _time_unit_seconds):
+        raise ValueError("unsupported time units: '%s'" % Units)
+    Reference = dt.datetime(*[int(x) for x in match.groups()[1:] if x is not None])
+    return offsets_to_epoch(Reference, Vvals, _time_unit_seconds[match.group(1).lower()])
+
 
 _defaultF4 = 9.969209968386869e+36
 
+# Defaults for the streaming writer: number of locations per HDF5 chunk
+# and the compression filter applied to every group
+_default_chunk_locs = 10000
+_default_compression = {'compression': 'gzip', 'compression_opts': 6}
+
 
 class IodaWriter(object):
     # Constructor
@@ -97,7 +218,7 @@ class IodaWriter(object):
             else:
                 # assume it is just nlocs
                 dims = ['nlocs']
-            fillval = get_default_fill_val(Vvals.dtype, isinstance(Vvals[0], dt.datetime))
+            fillval = get_default_fill_val(Vvals.dtype, is_datetime_array(Vvals))
             # get fill value
             if VarName in GeoVarAttrs.keys():
                 if '_FillValue' in GeoVarAttrs[VarName].keys():
@@ -126,7 +247,7 @@ class IodaWriter(object):
             else:
                 # assume it is just nlocs
                 dims = ['Location']
-            fillval = get_default_fill_val(Vvals.dtype, isinstance(Vvals[0], dt.datetime))
+            fillval = get_default_fill_val(Vvals.dtype, is_datetime_array(Vvals))
             # get fill value
             if VarKey in VarAttrs.keys():
                 if '_FillValue' in VarAttrs[VarKey].keys():
@@ -155,20 +276,15 @@ class IodaWriter(object):
 
     def VerifyDateTime(self, ObsVars):
         # this method will check if the variable
-        # MetaData/dateTime is a string or datetime object
-        # if string, convert to datetime object
+        # MetaData/dateTime is a string, datetime object or datetime64
+        # array and if so convert it to int64 seconds since the epoch
         VarKey = ('dateTime', 'MetaData')
         if VarKey not in ObsVars.keys():
             raise KeyError("Required variable 'MetaData/dateTime' does not exist.")
-        dtvar = ObsVars[VarKey]
-        # check if the array is type 'object' or not
-        # otherwise we will assume it is an integer and already set up
-        if (dtvar.dtype == np.dtype('object')):
-            # object is used for strings or datetime objects
-            if (isinstance(dtvar[0], str)):
-                # convert ISO date strings to datetime objects
-                newdtvar = [dt.datetime.strptime(x, "%Y-%m-%dT%H:%M:%SZ") for x in dtvar]
-                ObsVars[VarKey] = np.array(newdtvar, dtype=object)
+        dtvar = np.asarray(ObsVars[VarKey])
+        # integers are assumed to be already set up
+        if (dtvar.dtype.kind in ['O', 'U', 'S', 'M']):
+            ObsVars[VarKey] = datetime_to_epoch(dtvar)
 
         return ObsVars
 
@@ -188,6 +304,153 @@ class IodaWriter(object):
         self.WriteGlobalAttrs(GlobalAttrs)
 
 
+class IodaStreamWriter(object):
+    ############################################################
+    # Streaming counterpart of IodaWriter. Instead of creating every
+    # variable from whole arrays in BuildIoda, converters call
+    # WriteObsVars repeatedly with blocks of locations as they read
+    # their input; each block is appended along the unlimited
+    # Location dimension and flushed to disk, so only one block has
+    # to be held in memory at a time.
+    #
+    # ChunkDict and CompressDict set the HDF5 chunk length along
+    # Location and the compression filter (h5py create_dataset
+    # keywords, or None for no compression) per variable group or
+    # per (Vname, Gname) key; the 'Location' entry of ChunkDict sets
+    # the chunk length of the Location scale itself. Variables
+    # missing from a block, or first appearing in a later block, are
+    # padded with their fill value. MetaData/dateTime is stored as
+    # int64 seconds since 1970-01-01.
+
+    # Constructor
+    def __init__(self, Fname, LocKeyList, DimDict, VarDims=None, VarAttrs=None,
+                 ChunkDict=None, CompressDict=None):
+        # h5py is only needed by the converters that stream their output
+        import h5py
+        self._h5py = h5py
+        self._loc_key_list = LocKeyList
+        self._var_dims = {} if VarDims is None else VarDims
+        self._var_attrs = {} if VarAttrs is None else VarAttrs
+        self._chunk_dict = {} if ChunkDict is None else ChunkDict
+        self._compress_dict = {} if CompressDict is None else CompressDict
+        self._nlocs = 0
+        self._file = h5py.File(Fname, 'w')
+        # Location is unlimited, all other dimensions have a fixed size
+        self._dims = OrderedDict()
+        locs = self._file.create_dataset('Location', shape=(0,), maxshape=(None,), dtype=np.int32,
+                                         chunks=(self._chunk_dict.get('Location', _default_chunk_locs),))
+        locs.make_scale('Location')
+        self._dims['Location'] = locs
+        for DimName, DimVal in DimDict.items():
+            if DimName == 'Location':
+                continue
+            DimVals = np.arange(1, DimVal+1, dtype=np.int32) if np.isscalar(DimVal) else np.asarray(DimVal)
+            dim = self._file.create_dataset(DimName, data=DimVals)
+            dim.make_scale(DimName)
+            self._dims[DimName] = dim
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _lookup(self, Table, VarKey, default):
+        # per-variable settings override per-group settings
+        if VarKey in Table.keys():
+            return Table[VarKey]
+        return Table.get(VarKey[1], default)
+
+    def _create_var(self, VarKey, Vvals):
+        (Vname, Gname) = VarKey
+        if VarKey in self._var_dims.keys():
+            dims = self._var_dims[VarKey]
+        elif Vname in self._var_dims.keys():
+            dims = self._var_dims[Vname]
+        else:
+            # assume it is just nlocs
+            dims = ['Location']
+        if dims[0] != 'Location':
+            raise ValueError("Streamed variable %s/%s must have Location as its first dimension" %
+                             (Gname, Vname))
+        if (Vvals.dtype.kind in ['O', 'U']):
+            dtype = self._h5py.string_dtype()
+            fillval = None
+        else:
+            dtype = Vvals.dtype
+            fillval = get_default_fill_val(dtype)
+        try:
+            fillval = self._var_attrs[VarKey]['_FillValue']
+        except KeyError:
+            pass
+        shape = [self._nlocs] + [len(self._dims[d]) for d in dims[1:]]
+        chunks = [self._lookup(self._chunk_dict, VarKey, _default_chunk_locs)] + shape[1:]
+        compress = self._lookup(self._compress_dict, VarKey, _default_compression)
+        compress = {} if compress is None else compress
+        var = self._file.create_dataset("{0:s}/{1:s}".format(Gname, Vname), shape=tuple(shape),
+                                        maxshape=tuple([None] + shape[1:]), dtype=dtype,
+                                        chunks=tuple(chunks), fillvalue=fillval, **compress)
+        for i, d in enumerate(dims):
+            var.dims[i].attach_scale(self._dims[d])
+        if fillval is not None:
+            var.attrs['_FillValue'] = np.array(fillval, dtype=dtype)
+
+        # add some default metadata if necessary, then the var metadata
+        attrs = dict(self._var_attrs.get(VarKey, {}))
+        if Vname in _default_units.keys() and 'units' not in attrs.keys():
+            attrs['units'] = _default_units[Vname]
+        for MetaVar, MetaVal in attrs.items():
+            if MetaVar not in ['_FillValue']:
+                var.attrs[MetaVar] = MetaVal
+        return var
+
+    def WriteObsVars(self, ObsVars):
+        # append one block of locations to the output file
+        nblock = None
+        for VarKey, Vvals in ObsVars.items():
+            if nblock is None:
+                nblock = len(Vvals)
+            elif len(Vvals) != nblock:
+                raise ValueError("Variable %s has length %d, expected %d" % (VarKey, len(Vvals), nblock))
+        if not nblock:
+            return
+        start = self._nlocs
+        self._nlocs += nblock
+        self._dims['Location'].resize((self._nlocs,))
+        self._dims['Location'][start:self._nlocs] = np.arange(start+1, self._nlocs+1, dtype=np.int32)
+        # grow every variable first so ones absent from this block get fill values
+        for Gname, group in self._file.items():
+            if isinstance(group, self._h5py.Group):
+                for var in group.values():
+                    var.resize(self._nlocs, axis=0)
+        for VarKey, Vvals in ObsVars.items():
+            if VarKey == ('dateTime', 'MetaData'):
+                Vvals = datetime_to_epoch(Vvals)
+            VarName = "{0:s}/{1:s}".format(VarKey[1], VarKey[0])
+            if VarName not in self._file:
+                var = self._create_var(VarKey, np.asarray(Vvals))
+                var.resize(self._nlocs, axis=0)
+            else:
+                var = self._file[VarName]
+            if np.ma.isMaskedArray(Vvals):
+                Vvals = Vvals.filled(var.fillvalue)
+            Vvals = np.asarray(Vvals)
+            if (Vvals.dtype.kind == 'U'):
+                Vvals = Vvals.astype(object)
+            var[start:self._nlocs, ...] = Vvals
+        self._file.flush()
+
+    def WriteGlobalAttrs(self, GlobalAttrs):
+        # this method will create global attributes from GlobalAttrs dictionary
+        for AttrKey, AttrVal in GlobalAttrs.items():
+            self._file.attrs[AttrKey] = AttrVal
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
 def ExtractObsData(ObsData, loc_key_list):
     ############################################################
     # This method will extract information from the ObsData
@@ -201,6 +464,7 @@ def ExtractObsData(ObsData, loc_key_list):
     # Walk through the structure and get counts so arrays
     # can be preallocated, and variable numbers can be assigned
     ObsVarList = []
+    ObsVarSeen = set()
     ObsVarExamples = []
     ObsVarTypes = []
     for LocKey, LocDict in ObsData.items():
@@ -208,7 +472,8 @@ def ExtractObsData(ObsData, loc_key_list):
         for VarKey, VarVal in LocDict.items():
             if (VarKey[1] == _oval_name):
                 VarNames.add(VarKey[0])
-            if (VarKey not in ObsVarList):
+            if (VarKey not in ObsVarSeen):
+                ObsVarSeen.add(VarKey)
                 ObsVarList.append(VarKey)
                 ObsVarExamples.append(VarVal)
                 ObsVarTypes.append(type(VarVal))
@@ -216,7 +481,8 @@ def ExtractObsData(ObsData, loc_key_list):
         for i in range(len(loc_key_list)):
             (LocVname, LocVtype) = loc_key_list[i]
             locvar = (LocVname, 'MetaData')
-            if (locvar not in ObsVarList):
+            if (locvar not in ObsVarSeen):
+                ObsVarSeen.add(locvar)
                 ObsVarList.append(locvar)
                 ObsVarExamples.append(LocKey[i])
                 if (LocVtype == "long"):
@@ -268,3 +534,346 @@ def ExtractObsData(ObsData, loc_key_list):
             ObsVars[VarKey][LocNum-1] = VarVal
 
     return ObsVars, _nlocs
+
+
+def _chunk_fill_value(NumpyDtype, StringFill=''):
+    # fill value used to pad a variable over chunks that lack it
+    if (NumpyDtype.kind in ['U', 'S', 'O']):
+        return StringFill
+    if (NumpyDtype.kind == 'f'):
+        return get_default_fill_val(np.float32)
+    if (NumpyDtype.kind == 'M') or (NumpyDtype in [np.dtype('int64'), np.dtype('int32'),
+                                                   np.dtype('int16'), np.dtype('int8')]):
+        return get_default_fill_val(NumpyDtype)
+    raise ValueError("No fill value for dtype %s" % NumpyDtype)
+
+
+class ChunkedObsData(object):
+    ############################################################
+    # Accumulator for converters that read their observations in
+    # pieces (an input file, granule or profile at a time). Each
+    # append() takes a dict of arrays keyed like ObsVars whose first
+    # dimension is Location, and the pieces are concatenated only
+    # once, by finalize(), or written straight out to an
+    # IodaStreamWriter by flush(), instead of regrowing every output
+    # array with np.append for each piece.
+    #
+    # Usage:
+    #   obs = ChunkedObsData(StaticKeys=[('sensorChannelNumber', 'MetaData')])
+    #   for file_obs_data in read_in_parallel(read_file, files, args.threads):
+    #       obs.append(file_obs_data)
+    #   ObsVars = obs.finalize()
+    #
+    # Dtypes and trailing dimensions are kept (2D variables are
+    # stacked along Location), masked chunks give a masked result, and
+    # a variable missing from some chunks is padded with the default
+    # fill value of its dtype, or with StringFill for string and object
+    # arrays. StaticKeys name variables that are not per location
+    # (channel numbers, level values): the array of the first chunk is
+    # kept as is and flush() leaves them out.
+    #
+    # MergeKeys (for example the MetaData latitude, longitude and
+    # dateTime keys) make finalize() collapse locations that repeat the
+    # same values of those variables, as the dict-of-dicts keyed by
+    # location tuples did: a location keeps the position of its first
+    # occurrence and the values of its last one.
+
+    def __init__(self, StaticKeys=(), MergeKeys=None, StringFill=''):
+        self._static_keys = set(StaticKeys)
+        self._merge_keys = [] if MergeKeys is None else list(MergeKeys)
+        self._string_fill = StringFill
+        self._static_vars = OrderedDict()
+        self._var_chunks = OrderedDict()
+        self._chunk_sizes = []
+        self._nflushed = 0
+
+    def __len__(self):
+        # number of locations appended so far, flushed or not
+        return self._nflushed + sum(self._chunk_sizes)
+
+    def append(self, ObsVars):
+        nchunk = None
+        for VarKey, Vvals in ObsVars.items():
+            if VarKey in self._static_keys:
+                if VarKey not in self._static_vars:
+                    self._static_vars[VarKey] = Vvals
+                continue
+            if nchunk is None:
+                nchunk = len(Vvals)
+            elif (len(Vvals) != nchunk):
+                raise ValueError("Variable %s has length %d, expected %d" %
+                                 (VarKey, len(Vvals), nchunk))
+            if (VarKey not in self._var_chunks):
+                # earlier chunks did not have this variable
+                self._var_chunks[VarKey] = [None] * len(self._chunk_sizes)
+            self._var_chunks[VarKey].append(Vvals)
+        if nchunk is None:
+            return
+        for Chunks in self._var_chunks.values():
+            if (len(Chunks) == len(self._chunk_sizes)):
+                Chunks.append(None)
+        self._chunk_sizes.append(nchunk)
+
+    def _concatenate(self, Chunks):
+        if (len(Chunks) == 1):
+            return Chunks[0]
+        Example = np.asanyarray(next(c for c in Chunks if c is not None))
+        Parts = []
+        for Chunk, nchunk in zip(Chunks, self._chunk_sizes):
+            if Chunk is None:
+                Chunk = np.full((nchunk,) + Example.shape[1:],
+                                _chunk_fill_value(Example.dtype, self._string_fill), dtype=Example.dtype)
+            Parts.append(Chunk)
+        if any(np.ma.isMaskedArray(p) for p in Parts):
+            return np.ma.concatenate(Parts)
+        return np.concatenate(Parts)
+
+    def _unique_rows(self, KeyVars):
+        # Rows to keep when collapsing repeated location keys: one per
+        # unique key, ordered by first occurrence, taken from the last.
+        keys = np.rec.fromarrays([np.asarray(v).astype(str) if np.asarray(v).dtype == np.object_
+                                  else np.asarray(v) for v in KeyVars])
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        last = np.zeros(len(first), dtype=np.int64)
+        np.maximum.at(last, inverse.ravel(), np.arange(len(keys)))
+        return last[np.argsort(first, kind='stable')]
+
+    def finalize(self):
+        ObsVars = OrderedDict(self._static_vars)
+        for VarKey, Chunks in self._var_chunks.items():
+            if any(c is not None for c in Chunks):
+                ObsVars[VarKey] = self._concatenate(Chunks)
+        if self._merge_keys and len(self) > 0:
+            rows = self._unique_rows([ObsVars[VarKey] for VarKey in self._merge_keys])
+            if len(rows) < len(self):
+                for VarKey in ObsVars.keys():
+                    if VarKey not in self._static_vars:
+                        ObsVars[VarKey] = ObsVars[VarKey][rows]
+        return ObsVars
+
+    def flush(self, Writer):
+        # append the chunks gathered so far to an IodaStreamWriter and
+        # drop them, so that only the pieces since the last flush are
+        # held in memory. Variables absent since then are padded by the
+        # writer. Locations are not merged across flushes.
+        if self._merge_keys:
+            raise ValueError("ChunkedObsData with MergeKeys can't be flushed")
+        if (sum(self._chunk_sizes) > 0):
+            Writer.WriteObsVars(OrderedDict((VarKey, self._concatenate(Chunks))
+                                            for VarKey, Chunks in self._var_chunks.items()
+                                            if any(c is not None for c in Chunks)))
+        self._nflushed = len(self)
+        self._var_chunks = OrderedDict((VarKey, []) for VarKey in self._var_chunks.keys())
+        self._chunk_sizes = []
+
+
+def _compact_obs_vars(ObsVars):
+    # turn the lists and array views of a reader's result into a plain
+    # dict of contiguous numpy arrays, which pickle as one buffer copy
+    # each; empty results (skipped inputs) are passed back as they are
+    if not ObsVars:
+        return ObsVars
+    Compact = OrderedDict()
+    for VarKey, Vvals in ObsVars.items():
+        if np.ma.isMaskedArray(Vvals):
+            Compact[VarKey] = Vvals
+        else:
+            Compact[VarKey] = np.ascontiguousarray(Vvals)
+    return Compact
+
+
+def _read_compact(ReadFunc, Input):
+    return _compact_obs_vars(ReadFunc(Input))
+
+
+def read_in_parallel(ReadFunc, Inputs, Workers=1):
+    # Yield ReadFunc(Input) for each of the Inputs (file names), in
+    # input order. With more than one worker the inputs are read on a
+    # pool of processes: ReadFunc must be a module level function that
+    # opens its file itself, and its dict of arrays is sent back as
+    # contiguous numpy arrays. Results are yielded as soon as they and
+    # all the ones before them are ready, so the caller can append them
+    # to a ChunkedObsData while later inputs are still being read.
+    Inputs = list(Inputs)
+    if (Workers <= 1) or (len(Inputs) <= 1):
+        for Input in Inputs:
+            yield ReadFunc(Input)
+        return
+    with ProcessPoolExecutor(max_workers=min(Workers, len(Inputs))) as executor:
+        yield from executor.map(partial(_read_compact, ReadFunc), Inputs)
+
+
+# Byte alignment of the columns a worker packs into its shared memory block
+_shm_align = 64
+
+
+def _create_untracked_block(nbytes):
+    # the parent unlinks the block once it has been copied out, so the
+    # resource tracker of the worker must not remove it when the worker
+    # exits. Python 3.13 can create the block untracked. Older versions
+    # always register it (on POSIX, the only place they do), and the
+    # block is unregistered by hand there through its private name,
+    # which is the one the tracker was given.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(create=True, size=nbytes, track=False)
+    Block = shared_memory.SharedMemory(create=True, size=nbytes)
+    if (os.name == 'posix') and hasattr(Block, '_name'):
+        resource_tracker.unregister(Block._name, 'shared_memory')
+    return Block
+
+
+def _read_to_shared_memory(ReadFunc, StaticKeys, Input):
+    # worker side of read_columns_in_parallel: read one input and pack
+    # its columns (the data and, for masked arrays, the mask) into a new
+    # shared memory block. Only the name and layout of the block go back
+    # through the pool; static variables and object arrays, which can't
+    # live in shared memory, are pickled as they are.
+    ObsVars = ReadFunc(Input)
+    if not ObsVars:
+        return None
+    Static = OrderedDict()
+    Pickled = OrderedDict()
+    Layout = []
+    Parts = []
+    nbytes = 0
+    nlocs = 0
+    for VarKey, Vvals in ObsVars.items():
+        if VarKey in StaticKeys:
+            Static[VarKey] = Vvals
+            continue
+        Data = np.ascontiguousarray(np.ma.getdata(Vvals))
+        nlocs = len(Data)
+        if Data.dtype.hasobject:
+            Pickled[VarKey] = Vvals
+            Layout.append((VarKey, None))
+            continue
+        Spec = []
+        for Part in (Data, np.ma.getmaskarray(Vvals) if np.ma.isMaskedArray(Vvals) else None):
+            if Part is None:
+                Spec.append(None)
+                continue
+            Spec.append((nbytes, Part.dtype.str, Part.shape))
+            Parts.append((nbytes, Part))
+            nbytes += -(-Part.nbytes // _shm_align) * _shm_align
+        Layout.append((VarKey, tuple(Spec)))
+    Name = None
+    if (nbytes > 0):
+        Block = _create_untracked_block(nbytes)
+        for Offset, Part in Parts:
+            np.ndarray(Part.shape, dtype=Part.dtype, buffer=Block.buf, offset=Offset)[...] = Part
+        Name = Block.name
+        Block.close()
+    return Name, nlocs, Layout, Pickled, Static
+
+
+def _assemble_columns(Results, Blocks, StringFill):
+    # parent side of read_columns_in_parallel: allocate every column
+    # once for all the inputs and copy each block to its offset
+    Static = OrderedDict()
+    Dtypes = OrderedDict()
+    Shapes = {}
+    Masked = set()
+    for Result in Results:
+        if Result is None:
+            continue
+        Name, nlocs, Layout, Pickled, ResultStatic = Result
+        for VarKey, Vvals in ResultStatic.items():
+            Static.setdefault(VarKey, Vvals)
+        for VarKey, Spec in Layout:
+            if Spec is None:
+                Vvals = Pickled[VarKey]
+                Dtype, Shape = np.asarray(Vvals).dtype, np.shape(Vvals)
+                if np.ma.isMaskedArray(Vvals):
+                    Masked.add(VarKey)
+            else:
+                Dtype, Shape = np.dtype(Spec[0][1]), Spec[0][2]
+                if Spec[1] is not None:
+                    Masked.add(VarKey)
+            Dtypes.setdefault(VarKey, []).append(Dtype)
+            Shapes.setdefault(VarKey, tuple(Shape[1:]))
+
+    Starts = np.cumsum([0] + [0 if r is None else r[1] for r in Results])
+    Total = Starts[-1]
+    Columns = OrderedDict()
+    Masks = {}
+    for VarKey, VarDtypes in Dtypes.items():
+        Dtype = np.result_type(*VarDtypes)
+        Columns[VarKey] = np.empty((Total,) + Shapes[VarKey], dtype=Dtype)
+        if VarKey in Masked:
+            Masks[VarKey] = np.zeros((Total,) + Shapes[VarKey], dtype=bool)
+
+    for Result, Start, End in zip(Results, Starts[:-1], Starts[1:]):
+        if Result is None:
+            continue
+        Name, nlocs, Layout, Pickled, ResultStatic = Result
+        for VarKey in Columns.keys() - dict(Layout).keys():
+            # pad the variables this input did not have
+            Columns[VarKey][Start:End] = _chunk_fill_value(Dtypes[VarKey][0], StringFill)
+        for VarKey, Spec in Layout:
+            if Spec is None:
+                Columns[VarKey][Start:End] = np.ma.getdata(Pickled[VarKey])
+                if VarKey in Masks:
+                    Masks[VarKey][Start:End] = np.ma.getmaskarray(Pickled[VarKey])
+                continue
+            for Target, Part in ((Columns, Spec[0]), (Masks, Spec[1])):
+                if Part is not None:
+                    Offset, Dtype, Shape = Part
+                    Target[VarKey][Start:End] = np.ndarray(Shape, dtype=Dtype, buffer=Blocks[Name].buf,
+                                                           offset=Offset)
+
+    ObsVars = OrderedDict(Static)
+    for VarKey, Column in Columns.items():
+        ObsVars[VarKey] = np.ma.masked_array(Column, mask=Masks[VarKey]) if VarKey in Masks else Column
+    return ObsVars
+
+
+def read_columns_in_parallel(ReadFunc, Inputs, Workers=1, StaticKeys=(), StringFill=''):
+    # Read every input with ReadFunc (a module level function returning
+    # a dict of arrays keyed like ObsVars, or nothing for an input to
+    # skip) and return the concatenated columns, as ChunkedObsData would
+    # give them (StaticKeys and StringFill as there), together with the
+    # number of locations read from each input. With more than one
+    # worker the inputs are read on a pool of processes which pack their
+    # columns into shared memory and send back only the layout and
+    # length of their data. The final columns are then allocated once
+    # and every worker's block is copied straight to its precomputed
+    # offset, rather than pickling all the arrays back to this process
+    # and growing the columns piece by piece.
+    Inputs = list(Inputs)
+    StaticKeys = set(StaticKeys)
+    if (Workers <= 1) or (len(Inputs) <= 1):
+        obs = ChunkedObsData(StaticKeys=StaticKeys, StringFill=StringFill)
+        Nlocs = []
+        for Input in Inputs:
+            nbefore = len(obs)
+            ObsVars = ReadFunc(Input)
+            if ObsVars:
+                obs.append(ObsVars)
+            Nlocs.append(len(obs) - nbefore)
+        return obs.finalize(), Nlocs
+
+    Futures = []
+    Blocks = OrderedDict()
+    try:
+        with ProcessPoolExecutor(max_workers=min(Workers, len(Inputs))) as executor:
+            Futures = [executor.submit(_read_to_shared_memory, ReadFunc, StaticKeys, Input)
+                       for Input in Inputs]
+        Results = [Future.result() for Future in Futures]
+        for Result in Results:
+            if (Result is not None) and (Result[0] is not None):
+                Blocks[Result[0]] = shared_memory.SharedMemory(name=Result[0])
+        return _assemble_columns(Results, Blocks, StringFill), [0 if r is None else r[1] for r in Results]
+    finally:
+        # also remove the blocks of the other inputs when one of them failed
+        for Future in Futures:
+            if Future.done() and not Future.cancelled() and (Future.exception() is None) and \
+                    (Future.result() is not None):
+                Name = Future.result()[0]
+                if (Name is not None) and (Name not in Blocks):
+                    try:
+                        Blocks[Name] = shared_memory.SharedMemory(name=Name)
+                    except FileNotFoundError:
+                        pass
+        for Block in Blocks.values():
+            Block.close()
+            Block.unlink()
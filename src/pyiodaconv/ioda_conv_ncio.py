@@ -270,11 +270,13 @@ class NcWriter(object):
 
         # Dimensions used by any group can be placed at in the top
         # level (root) group. This is convenient if we decide to
-        # rearrange the group structure.
-        self._fid.createDimension(self._nvars_dim_name, self._nvars)
-        self._fid.createDimension(self._nlocs_dim_name, self._nlocs)
-        self._fid.createDimension(self._nstr_dim_name, self._nstring)
-        self._fid.createDimension(self._ndatetime_dim_name, self._ndatetime)
+        # rearrange the group structure. They are created on the first
+        # call, so the obs variables can also be written a few at a time.
+        if self._nlocs_dim_name not in self._fid.dimensions:
+            self._fid.createDimension(self._nvars_dim_name, self._nvars)
+            self._fid.createDimension(self._nlocs_dim_name, self._nlocs)
+            self._fid.createDimension(self._nstr_dim_name, self._nstring)
+            self._fid.createDimension(self._ndatetime_dim_name, self._ndatetime)
 
         for VarKey, Vvals in ObsVars.items():
             (Vname, Gname) = VarKey
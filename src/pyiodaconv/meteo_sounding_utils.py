@@ -10,6 +10,7 @@
 # --+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+
 
 import math
+import numpy as np
 
 # Constants
 Rd = 287.05
@@ -173,3 +174,82 @@ def z_interp(temp_lower, temp_upper, pres_lower, pres_upper, pressure, hght_lowe
         z2 = ((t0 + s * hght_upper) * math.exp(-f2) - t0) / s
 
     return (z1 + z2) / 2
+
+# --+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+
+
+
+def _layer_arrays(*args):
+    """
+    Broadcast the layer arguments of the array routines to float arrays, and flag
+    the missing (None, NaN or masked) values.
+    """
+    args = [np.ma.masked_invalid(np.ma.asarray(a, dtype=float)) for a in args]
+    values = np.broadcast_arrays(*[a.filled(np.nan) for a in args])
+    missing = np.zeros(values[0].shape, dtype=bool)
+    for a in args:
+        missing = missing | np.ma.getmaskarray(a)
+    return values, missing
+
+
+def p_interp_array(temp_lower, temp_upper, pres_lower, pres_upper, hght_lower, hght_upper, height):
+    """
+    Array version of p_interp, taking any broadcastable mix of arrays and scalars.
+    Layers with missing inputs, or that p_interp would return None for, are masked.
+    :return: Interpolated pressure (mb), as a masked array
+    """
+    values, missing = _layer_arrays(temp_lower, temp_upper, pres_lower, pres_upper, hght_lower, hght_upper, height)
+    (temp_lower, temp_upper, pres_lower, pres_upper, hght_lower, hght_upper, height) = values
+    with np.errstate(all='ignore'):
+        bad = missing | (pres_lower <= 0) | (pres_upper > 1200) | (pres_upper <= 0) \
+            | (hght_lower <= -1000) | (hght_lower > 40000) | (hght_upper <= -1000) | (hght_upper > 40000)
+
+        # isothermal layers
+        s = G / (Rd * (temp_lower + CTOK))
+        iso = (pres_lower * np.exp(s * (hght_lower - height)) + pres_upper * np.exp(s * (hght_upper - height))) / 2
+
+        # temperature linear in height
+        tl = temp_lower + CTOK
+        tu = temp_upper + CTOK
+        s = (tu - tl) / (hght_upper - hght_lower)
+        t0 = tl - s * hght_lower
+        b1 = G * np.log((t0 + s * height) / (t0 + s * hght_lower)) / (s * Rd)
+        b2 = G * np.log((t0 + s * hght_upper) / (t0 + s * height)) / (s * Rd)
+        lin = (pres_lower / np.exp(b1) + pres_upper * np.exp(b2)) / 2
+
+        pressure = np.where(temp_upper == temp_lower, iso,
+                            np.where(hght_lower == hght_upper, pres_lower, lin))
+
+    return np.ma.masked_array(pressure, mask=bad)
+
+# --+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+---+
+
+
+def z_interp_array(temp_lower, temp_upper, pres_lower, pres_upper, pressure, hght_lower, hght_upper):
+    """
+    Array version of z_interp, taking any broadcastable mix of arrays and scalars.
+    Layers with missing inputs, or that z_interp would return None for, are masked.
+    :return: Interpolated height (m), as a masked array
+    """
+    values, missing = _layer_arrays(temp_lower, temp_upper, pres_lower, pres_upper, pressure, hght_lower, hght_upper)
+    (temp_lower, temp_upper, pres_lower, pres_upper, pressure, hght_lower, hght_upper) = values
+    with np.errstate(all='ignore'):
+        bad = missing | (pres_lower <= 0) | (pres_upper > 1200) | (pres_upper <= 0) \
+            | (hght_lower <= -1000) | (hght_lower > 40000) | (hght_upper <= -1000) | (hght_upper > 40000)
+
+        # isothermal layers
+        s = Rd * (temp_lower + CTOK) / G
+        iso = (hght_lower - s * np.log(pressure / pres_lower) + hght_upper + s * np.log(pres_upper / pressure)) / 2
+
+        # temperature linear in height
+        tl = temp_lower + CTOK
+        tu = temp_upper + CTOK
+        s = (tu - tl) / (hght_upper - hght_lower)
+        f1 = (s * Rd / G) * np.log(pres_lower / pressure)
+        f2 = (s * Rd / G) * np.log(pressure / pres_upper)
+        t0 = tl - s * hght_lower
+        lin = (((t0 + s * hght_lower) * np.exp(f1) - t0) / s + ((t0 + s * hght_upper) * np.exp(-f2) - t0) / s) / 2
+
+        height = np.where(temp_lower == temp_upper, iso,
+                          np.where(hght_lower == hght_upper, (hght_lower + hght_upper) / 2, lin))
+
+    return np.ma.masked_array(height, mask=bad)
@@ -10,10 +10,18 @@
 #
 
 import math
+import numpy as np
 
 
 class meteo_utils(object):
 
+    '''
+    Apart from compT_fr_The, every method works element-wise on numpy arrays
+    (broadcasting its arguments) as well as on scalars. Masked array inputs
+    give masked results, so missing values can be masked before one call
+    for a whole batch of observations.
+    '''
+
     # Constructor
     def __init__(self):
         # Define some constants used for some variable conversions
@@ -66,7 +74,7 @@ class meteo_utils(object):
         # Even at P=1050hPa and T=55C, sat. vap. pres only contributes to ~15% of total pressure.
         # The following MIN statement is needed for insanely high altitude global model tops like 1hPa.
 
-        es = min(es, pres_Pa*0.15)
+        es = np.minimum(es, pres_Pa*0.15)
 
         rs = 0.622*es/(pres_Pa-es)
 
@@ -82,7 +90,7 @@ class meteo_utils(object):
         '''
 
         c = [610.5851, 44.40316, 1.430341, 0.2641412e-1, 0.2995057e-3, 0.2031998e-5, 0.6936113e-8, 0.2564861e-11, -0.3704404e-13]
-        x = max(-80., temp_K-self.C_2_K)
+        x = np.maximum(-80., temp_K-self.C_2_K)
         es = c[0]+x*(c[1]+x*(c[2]+x*(c[3]+x*(c[4]+x*(c[5]+x*(c[6]+x*(c[7]+x*c[8])))))))
 
         '''
@@ -118,7 +126,7 @@ class meteo_utils(object):
         # Even at P=1050hPa and T=55C, sat. vap. pres only contributes to ~15% of total pressure.
         # The following MIN statement is needed for insanely high altitude global model tops like 1hPa.
 
-        esi = min(esi, pres_Pa*0.15)
+        esi = np.minimum(esi, pres_Pa*0.15)
 
         ri = 0.622*esi/(pres_Pa-esi)
 
@@ -134,7 +142,7 @@ class meteo_utils(object):
         '''
 
         c = [.609868993E03, .499320233E02, .184672631E01, .402737184E-1, .565392987E-3, .521693933E-5, .307839583E-7, .105785160E-9, .161444444E-12]
-        x = max(-80., temp_K-self.C_2_K)
+        x = np.maximum(-80., temp_K-self.C_2_K)
         esi = c[0]+x*(c[1]+x*(c[2]+x*(c[3]+x*(c[4]+x*(c[5]+x*(c[6]+x*(c[7]+x*c[8])))))))
 
         '''
@@ -172,7 +180,7 @@ class meteo_utils(object):
         standard atmos pressure in Pascals is returned for given height in meters
         '''
 
-        pr = math.exp(math.log(1.0-height/44307.692)/0.19)*101325.0
+        pr = np.exp(np.log(1.0-height/44307.692)/0.19)*101325.0
 
         return pr
 #
@@ -187,12 +195,10 @@ class meteo_utils(object):
         returned precipitable water value in meters only below 150mb
         '''
 
-        sum = 0.
-        k = 1
-        while k < len(pres_Pa):
-            if (pres_Pa[k] > 15000.0):
-                sum = sum + ((w_non[k]+w_non[k-1])*0.5) * abs(pres_Pa[k]-pres_Pa[k-1])
-            k = k + 1
+        pres_Pa = np.asarray(pres_Pa)
+        w_non = np.asarray(w_non)
+        layers = ((w_non[1:]+w_non[:-1])*0.5) * np.abs(pres_Pa[1:]-pres_Pa[:-1])
+        sum = np.sum(layers[pres_Pa[1:] > 15000.0])
 
         answer = sum/(self.g*self.RHO_WATER)
 
@@ -206,8 +212,8 @@ class meteo_utils(object):
         From wind direction and speed, compute u,v wind components
         '''
 
-        u = -wspd * math.sin(wdir*self.DEG_2_RAD)
-        v = -wspd * math.cos(wdir*self.DEG_2_RAD)
+        u = -wspd * np.sin(wdir*self.DEG_2_RAD)
+        v = -wspd * np.cos(wdir*self.DEG_2_RAD)
 
         return u, v
 #
@@ -249,7 +255,7 @@ class meteo_utils(object):
         p1 = (3.376/tlc) - 0.00254
         p2 = (rr*1000.0) * (1.0 + 0.81*rr)
 
-        thetae = xx * math.exp(p1*p2)
+        thetae = xx * np.exp(p1*p2)
 
         return thetae
 #
@@ -266,7 +272,7 @@ class meteo_utils(object):
 
         tt = temp_K
         tttd = tdew_K
-        denom = (1.0/(tttd-56.0)) + (math.log(tt/tttd)/800.)
+        denom = (1.0/(tttd-56.0)) + (np.log(tt/tttd)/800.)
         tlcl = (1.0/denom) + 56.0
 
         return tlcl
@@ -284,7 +290,7 @@ class meteo_utils(object):
         p = pres_Pa
         rr = w_non+1e-8
         es = p*rr/(.622+rr)
-        esln = math.log(es)
+        esln = np.log(es)
         tdew = (35.86*esln-4947.2325)/(esln-23.6837)
 
         return tdew
@@ -302,12 +308,14 @@ class meteo_utils(object):
         c = [-1.00922292e-10, -1.47945344e-8, -1.7303757e-6, -0.00012709, 1.15849867e-6, -3.518296861e-9, 3.5741522e-12]
         d = [0.0, -3.5223513e-10, -5.7250807e-8, -5.83975422e-6, 4.72445163e-8, -1.13402845e-10, 8.729580402e-14]
 
-        x = min(475.0, thetae_K)
+        x = np.minimum(475.0, thetae_K)
 
-        if (x <= 335.5):
-            answer = c(0)+x*(c(1)+x*(c(2)+x*(c(3)+x*(c(4)+x*(c(5)+x*c(6))))))
-        else:
-            answer = d(0)+x*(d(1)+x*(d(2)+x*(d(3)+x*(d(4)+x*(d(5)+x*d(6))))))
+        # np.ma.where keeps the mask of masked input (np.where drops it)
+        answer = np.ma.where(x <= 335.5,
+                             c[0]+x*(c[1]+x*(c[2]+x*(c[3]+x*(c[4]+x*(c[5]+x*c[6]))))),
+                             d[0]+x*(d[1]+x*(d[2]+x*(d[3]+x*(d[4]+x*(d[5]+x*d[6]))))))
+        if not np.ma.isMaskedArray(thetae_K):
+            answer = answer.filled()
 
         th_wetb = answer + self.C_2_K
 
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+"""
+Deterministic spatial thinning and superobbing for the gridded and swath
+converters. The observations are binned either on a regular latitude /
+longitude grid or on the equal-area pixels of a HEALPix ring grid, and
+each bin is reduced to a single observation: the one with the best QC,
+the one nearest to the bin center, or the mean or median of the bin with
+an inflated error.
+"""
+
+import numpy as np
+
+GRIDS = ('latlon', 'healpix')
+RULES = ('best_qc', 'nearest', 'mean', 'median')
+SELECT_RULES = ('best_qc', 'nearest')
+
+_earth_radius = 6371.0   # km
+_km_per_degree = np.pi * _earth_radius / 180.0
+
+
+def _unit_vectors(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.stack((np.cos(lat) * np.cos(lon),
+                     np.cos(lat) * np.sin(lon),
+                     np.sin(lat)), axis=-1)
+
+
+def _wrap_lon(lons):
+    return np.mod(lons + 180.0, 360.0) - 180.0
+
+
+def healpix_nside(resolution):
+    """
+    Return the HEALPix nside whose pixels are about resolution km across.
+    """
+    return max(1, int(round(_earth_radius * np.sqrt(np.pi / 3.0) / resolution)))
+
+
+def healpix_index(nside, lats, lons):
+    """
+    Return the RING scheme HEALPix pixel number of each latitude and
+    longitude (degrees). Every one of the 12*nside**2 pixels has the
+    same area.
+    """
+    z = np.sin(np.radians(np.asarray(lats, dtype=np.float64)))
+    za = np.abs(z)
+    tt = np.mod(np.radians(np.asarray(lons, dtype=np.float64)), 2.0 * np.pi) / (0.5 * np.pi)
+    pix = np.empty(z.shape, dtype=np.int64)
+
+    # equatorial belt
+    eq = za <= 2.0 / 3.0
+    temp1 = nside * (0.5 + tt[eq])
+    temp2 = nside * z[eq] * 0.75
+    jp = (temp1 - temp2).astype(np.int64)
+    jm = (temp1 + temp2).astype(np.int64)
+    ir = nside + 1 + jp - jm
+    kshift = 1 - (ir & 1)
+    ip = np.mod((jp + jm - nside + kshift + 1) // 2, 4 * nside)
+    pix[eq] = 2 * nside * (nside - 1) + (ir - 1) * 4 * nside + ip
+
+    # polar caps
+    cap = ~eq
+    tp = tt[cap] - np.floor(tt[cap])
+    tmp = nside * np.sqrt(3.0 * (1.0 - za[cap]))
+    jp = (tp * tmp).astype(np.int64)
+    jm = ((1.0 - tp) * tmp).astype(np.int64)
+    ir = jp + jm + 1
+    ip = np.mod((tt[cap] * ir).astype(np.int64), 4 * ir)
+    pix[cap] = np.where(z[cap] > 0, 2 * ir * (ir - 1) + ip,
+                        12 * nside * nside - 2 * ir * (ir + 1) + ip)
+    return pix
+
+
+def healpix_center(nside, pix):
+    """
+    Return the latitude and longitude (degrees) of the centers of RING
+    scheme HEALPix pixels.
+    """
+    pix = np.asarray(pix, dtype=np.int64)
+    npix = 12 * nside * nside
+    ncap = 2 * nside * (nside - 1)
+    z = np.empty(pix.shape, dtype=np.float64)
+    phi = np.empty(pix.shape, dtype=np.float64)
+
+    north = pix < ncap
+    south = pix >= npix - ncap
+    eq = ~(north | south)
+
+    p = pix[north]
+    iring = (1 + np.floor(np.sqrt(1.0 + 2.0 * p)).astype(np.int64)) // 2
+    iphi = p + 1 - 2 * iring * (iring - 1)
+    z[north] = 1.0 - iring * iring / (3.0 * nside * nside)
+    phi[north] = (iphi - 0.5) * 0.5 * np.pi / iring
+
+    p = pix[eq] - ncap
+    iring = p // (4 * nside) + nside
+    iphi = np.mod(p, 4 * nside) + 1
+    fodd = np.where((iring + nside) & 1, 1.0, 0.5)
+    z[eq] = (2 * nside - iring) * 2.0 / (3.0 * nside)
+    phi[eq] = (iphi - fodd) * 0.5 * np.pi / nside
+
+    p = npix - pix[south]
+    iring = (1 + np.floor(np.sqrt(2.0 * p - 1.0)).astype(np.int64)) // 2
+    iphi = 4 * iring + 1 - (p - 2 * iring * (iring - 1))
+    z[south] = -1.0 + iring * iring / (3.0 * nside * nside)
+    phi[south] = (iphi - 0.5) * 0.5 * np.pi / iring
+
+    return np.degrees(np.arcsin(z)), _wrap_lon(np.degrees(phi))
+
+
+class Thinner(object):
+    """
+    Reduce observations to one per bin of a latitude/longitude or HEALPix
+    grid of about resolution km. The rule picks what is kept per bin:
+
+        best_qc: the observation with the lowest (best) qc value, the one
+                 nearest to the bin center among equals
+        nearest: the observation nearest to the bin center
+        mean, median: a superob of the observations sharing the best qc
+                 value of the bin (all of them when no qc is given)
+
+    Ties go to the earlier observation, so the result only depends on the
+    input and never on a random draw.
+    """
+
+    def __init__(self, grid, resolution, rule='nearest'):
+        if grid not in GRIDS:
+            raise ValueError(f"unknown thinning grid: {grid}")
+        if rule not in RULES:
+            raise ValueError(f"unknown thinning rule: {rule}")
+        if resolution <= 0:
+            raise ValueError(f"thinning resolution must be positive: {resolution}")
+        self.grid = grid
+        self.resolution = resolution
+        self.rule = rule
+        self.averaging = rule not in SELECT_RULES
+        if grid == 'healpix':
+            self.nside = healpix_nside(resolution)
+        else:
+            self.dlat = resolution / _km_per_degree
+            self.nlat = int(np.ceil(180.0 / self.dlat))
+            self.nlon = int(np.ceil(360.0 / self.dlat))
+
+    def __str__(self):
+        return f"{self.grid} {self.resolution:g} km {self.rule}"
+
+    def bin_index(self, lats, lons):
+        """
+        Return the bin number of each observation and the latitude and
+        longitude of the center of its bin.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if self.grid == 'healpix':
+            bins = healpix_index(self.nside, lats, lons)
+            clat, clon = healpix_center(self.nside, bins)
+            return bins, clat, clon
+
+        ilat = np.clip(np.floor((lats + 90.0) / self.dlat).astype(np.int64), 0, self.nlat - 1)
+        ilon = np.mod(np.floor((_wrap_lon(lons) + 180.0) / self.dlat).astype(np.int64), self.nlon)
+        clat = np.minimum((ilat + 0.5) * self.dlat - 90.0, 90.0)
+        clon = _wrap_lon((ilon + 0.5) * self.dlat - 180.0)
+        return ilat * self.nlon + ilon, clat, clon
+
+    def _groups(self, lats, lons, qc):
+        # Order the observations by bin, then qc, then distance to the bin
+        # center, then position, and return that order with the start of
+        # each bin in it. With a qc only the best qc of each bin is kept.
+        bins, clat, clon = self.bin_index(lats, lons)
+        dist = np.sum((_unit_vectors(lats, lons) - _unit_vectors(clat, clon))**2, axis=-1)
+        keys = [np.arange(len(bins)), dist]
+        if qc is not None:
+            qc = np.asarray(qc)
+            keys.append(qc)
+        keys.append(bins)
+        order = np.lexsort(keys)
+        if len(order) == 0:
+            return order, order
+
+        sorted_bins = bins[order]
+        start = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+        if qc is not None:
+            sorted_qc = qc[order]
+            best = np.repeat(sorted_qc[start], np.diff(np.r_[start, len(order)]))
+            order = order[sorted_qc == best]
+            sorted_bins = bins[order]
+            start = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+        return order, start
+
+    def select(self, lats, lons, qc=None):
+        """
+        Return the sorted indices of the observations kept, one per bin.
+        The best_qc rule needs qc; the nearest rule ignores it.
+        """
+        if self.rule == 'best_qc' and qc is None:
+            raise ValueError("best_qc thinning needs a qc value per observation")
+        if self.rule == 'nearest':
+            qc = None
+        order, start = self._groups(lats, lons, qc)
+        return np.sort(order[start])
+
+    def superob(self, lats, lons, values, errors, qc=None):
+        """
+        Average the observations of each bin with the mean or median rule.
+
+        values has one row per observation and may carry extra trailing
+        dimensions (e.g. channels) that are averaged independently; errors
+        has the shape of values or of its leading dimensions. The superob
+        error is sqrt(mean(errors**2)/n + spread**2), the error of the mean
+        of n observations inflated by the spread of the values in the bin,
+        so a single observation keeps its own error. Missing values must
+        be removed beforehand; masked ones come back as NaN.
+
+        Returns (idx, lats, lons, values, errors, nobs) with one row per
+        bin, ordered like the input: idx is the member nearest to the bin
+        center (its time and metadata can stand for the superob), lats and
+        lons the mean position of the members and nobs their number.
+        """
+        if not self.averaging:
+            raise ValueError(f"the {self.rule} rule does not superob")
+        nobs = len(values)
+        values = np.ma.filled(np.ma.asarray(values, dtype=np.float64), np.nan)
+        errors = np.ma.filled(np.ma.asarray(errors, dtype=np.float64), np.nan)
+        errors = errors.reshape(errors.shape + (1,) * (values.ndim - errors.ndim))
+        errors = np.broadcast_to(errors, values.shape)
+
+        order, start = self._groups(lats, lons, qc)
+        if len(order) == 0:
+            return (order, np.empty(0), np.empty(0), values[order], errors[order], order)
+        counts = np.diff(np.r_[start, len(order)])
+        idx = order[start]
+
+        shape = values.shape
+        vals = values[order].reshape(len(order), -1)
+        errs = errors[order].reshape(len(order), -1)
+        n = counts[:, np.newaxis]
+        mean = np.add.reduceat(vals, start, axis=0) / n
+        spread = np.add.reduceat((vals - np.repeat(mean, counts, axis=0))**2, start, axis=0) / n
+        err = np.sqrt(np.add.reduceat(errs**2, start, axis=0) / n / n + spread)
+        if self.rule == 'median':
+            group = np.repeat(np.arange(len(start)), counts)
+            lower = start + (counts - 1) // 2
+            upper = start + counts // 2
+            for c in range(vals.shape[1]):
+                col = vals[np.lexsort((vals[:, c], group)), c]
+                mean[:, c] = 0.5 * (col[lower] + col[upper])
+
+        xyz = np.add.reduceat(_unit_vectors(lats, lons)[order], start, axis=0)
+        xyz /= np.linalg.norm(xyz, axis=1)[:, np.newaxis]
+        slat = np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+        slon = np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+
+        perm = np.argsort(idx, kind='stable')
+        out_shape = (len(start),) + shape[1:]
+        return (idx[perm], slat[perm], slon[perm], mean[perm].reshape(out_shape),
+                err[perm].reshape(out_shape), counts[perm])
+
+    def thin(self, obs_data, lat_key, lon_key, qc=None, superob_keys=()):
+        """
+        Thin a dict of arrays with one row per observation, e.g. the
+        columns accumulated from all the input files, so that bins shared
+        by several files or granules still keep a single observation.
+
+        The select rules keep the chosen row of every array. The mean and
+        median rules superob the (value key, error key) pairs given in
+        superob_keys and move the latitude and longitude to the mean
+        position of the bin; every other array takes the row of the member
+        nearest to the bin center. Returns a new dict.
+        """
+        lats = obs_data[lat_key]
+        lons = obs_data[lon_key]
+        if not self.averaging:
+            idx = self.select(lats, lons, qc=qc)
+            return {key: val[idx] for key, val in obs_data.items()}
+
+        values = np.stack([obs_data[vkey] for vkey, _ in superob_keys], axis=-1)
+        errors = np.stack([obs_data[ekey] for _, ekey in superob_keys], axis=-1)
+        idx, slat, slon, values, errors, _ = self.superob(lats, lons, values, errors, qc=qc)
+        thinned = {key: val[idx] for key, val in obs_data.items()}
+        thinned[lat_key] = slat.astype(np.asarray(lats).dtype)
+        thinned[lon_key] = slon.astype(np.asarray(lons).dtype)
+        for n, (vkey, ekey) in enumerate(superob_keys):
+            thinned[vkey] = values[..., n].astype(np.asarray(obs_data[vkey]).dtype)
+            thinned[ekey] = errors[..., n].astype(np.asarray(obs_data[ekey]).dtype)
+        return thinned
+
+
+def add_thinning_arguments(parser, rules=RULES):
+    """
+    Add the spatial thinning options shared by the converters to an
+    argparse parser. Converters whose observations cannot be averaged
+    (e.g. retrievals with averaging kernels) pass rules=SELECT_RULES.
+    """
+    group = parser.add_argument_group(title='spatial thinning arguments')
+    group.add_argument(
+        '--thin_grid',
+        help="keep one observation per box of a regular latitude/longitude"
+             " grid or per equal-area healpix pixel. Unset means no spatial"
+             " thinning. (default: %(default)s)",
+        choices=GRIDS, default=None)
+    group.add_argument(
+        '--thin_resolution', metavar='KM',
+        help="size of the thinning boxes in km. (default: %(default)s)",
+        type=float, default=50.0)
+    group.add_argument(
+        '--thin_rule',
+        help="observation kept per box: the best qc, the one nearest to the"
+             " box center, or a mean/median superob. (default: %(default)s)",
+        choices=rules, default='best_qc' if 'best_qc' in rules else rules[0])
+    return group
+
+
+def thinner_from_args(args):
+    """
+    Return the Thinner requested on the command line, or None.
+    """
+    if getattr(args, 'thin_grid', None) is None:
+        return None
+    return Thinner(args.thin_grid, args.thin_resolution, args.thin_rule)
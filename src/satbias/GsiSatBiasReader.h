@@ -7,35 +7,36 @@
 
 #pragma once
 
+#include <map>
 #include <string>
 #include <vector>
-#include <fstream>
-
-#include <Eigen/Dense>
 
 /// Number of predictors in GSI satbias file
 constexpr size_t gsi_npredictors = 12;
 
-/// Finds all sensors in the file (returned in \p sensors) and number of channels
-/// for all the sensors (returned in \p nchannels)
-void findSensorsChannels(const std::string & filename, std::vector<std::string> & sensors,
-                         std::vector<int> & nchannels);
+/// Bias correction coefficients of one sensor from the GSI satbias_in and satbias_pc files
+struct GsiSensorBias {
+  std::vector<int> channels;     ///< channels listed for the sensor in satbias_in
+  std::vector<float> coeffs;     ///< gsi_npredictors bias coefficients for each channel
+  std::vector<int> errChannels;  ///< channels listed for the sensor in satbias_pc
+  std::vector<float> errs;       ///< gsi_npredictors coefficient error variances per channel
+  std::vector<float> nobs;       ///< number of observations for each channel
+};
 
-/// Read bias coefficients from the GSI bias coefficients file (satbias_in)
-/// \param filename file with bias coefficients (GSI style)
-/// \param sensor instrument+satellite that is to be read from the file
-/// \param(out) channels channels for \p sensor
-/// \param(out) coeffs bias coefficients
-void readObsBiasCoefficients(const std::string & filename, const std::string & sensor,
-                             std::vector<int> & channels, Eigen::ArrayXXf & coeffs);
+/// Bias coefficients of all the sensors in the GSI files, indexed by sensor
+typedef std::map<std::string, GsiSensorBias> GsiSatBias;
 
-/// Read bias coefficients errors from the GSI file (satbias_pc)
+/// Read bias coefficients of all the sensors from the GSI bias coefficients file (satbias_in),
+/// reading the file once
 /// \param filename file with bias coefficients (GSI style)
-/// \param sensor instrument+satellite that is to be read from the file
-/// \param(out) channels channels for \p sensor
-/// \param(out) errs bias coefficients error variances
-/// \param(out) nobs number of observations
-void readObsBiasCoeffErrors(const std::string & filename, const std::string & sensor,
-                           std::vector<int> & channels, Eigen::ArrayXXf & errs,
-                           Eigen::ArrayXf & nobs);
-
+/// \param(out) sensors instrument+satellite names, in the order they appear in the file
+/// \param(out) biases channels and bias coefficients of each sensor
+void readObsBiasCoefficients(const std::string & filename, std::vector<std::string> & sensors,
+                             GsiSatBias & biases);
+
+/// Read bias coefficients errors of all the sensors from the GSI file (satbias_pc), reading
+/// the file once
+/// \param filename file with bias coefficients errors (GSI style)
+/// \param(inout) biases the channels, errors and number of observations of each sensor are
+///               added to the entries for the sensors
+void readObsBiasCoeffErrors(const std::string & filename, GsiSatBias & biases);
@@ -5,6 +5,7 @@
  * which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
  */
 
+#include <cstdint>
 #include <memory>
 #include <string>
 #include <vector>
@@ -25,22 +26,20 @@
 
 // Return ObsGroup with bias coefficients for a given sensor
 ioda::ObsGroup makeObsBiasObject(ioda::Group &empty_base_object,
-                                 const std::string & coeffile, const std::string & errfile,
-                                 const std::string & sensor,
-                                 const std::vector<std::string> & predictors,
-                                 const size_t nchannels) {
+                                 const GsiSensorBias & bias,
+                                 const std::vector<std::string> & predictors) {
   // Channels & predictors
-  std::vector<int> channels(nchannels), channels_in_errorfile(nchannels);
-  long numPreds = predictors.size();
-  long numChans = channels.size();
-
-  // Allocate space for bias coefficients and read them from GSI satbias file
-  Eigen::ArrayXXf biascoeffs(numPreds, numChans);
-  Eigen::ArrayXXf biascoefferrs(numPreds, numChans);
-  Eigen::ArrayXf  nobs(numChans);
-  readObsBiasCoefficients(coeffile, sensor, channels, biascoeffs);
-  readObsBiasCoeffErrors(errfile, sensor, channels_in_errorfile, biascoefferrs, nobs);
-  ASSERT(channels == channels_in_errorfile);
+  const std::vector<int> & channels = bias.channels;
+  ASSERT(channels == bias.errChannels);
+  int64_t numPreds = predictors.size();
+  int64_t numChans = channels.size();
+
+  // Bias coefficients read from the GSI satbias files, gsi_npredictors values per channel
+  const Eigen::ArrayXXf biascoeffs =
+      Eigen::Map<const Eigen::ArrayXXf>(bias.coeffs.data(), numPreds, numChans);
+  const Eigen::ArrayXXf biascoefferrs =
+      Eigen::Map<const Eigen::ArrayXXf>(bias.errs.data(), numPreds, numChans);
+  const Eigen::ArrayXf nobs = Eigen::Map<const Eigen::ArrayXf>(bias.nobs.data(), numChans);
 
   // Creating dimensions: npredictors & nchannels
   ioda::NewDimensionScales_t newDims {
@@ -91,14 +90,17 @@ int main(int argc, char** argv) {
   const std::string errfile  = config.getString("input err file");
 
   std::vector<std::string> sensors;
-  std::vector<int> nchannels;
+  GsiSatBias biases;
 
-  /// Find all sensors and number of channels in the GSI bias coefficients file
-  findSensorsChannels(coeffile, sensors, nchannels);
+  /// Read the bias coefficients and their errors for all the sensors from the GSI files,
+  /// reading each file once
+  readObsBiasCoefficients(coeffile, sensors, biases);
+  readObsBiasCoeffErrors(errfile, biases);
 
   std::cout << "Found " << sensors.size() << " sensors:" << std::endl;
-  for (size_t jj = 0; jj < sensors.size(); ++jj) {
-    std::cout << "-- " << sensors[jj] << ", " << nchannels[jj] << " channels." << std::endl;
+  for (const std::string & sensor : sensors) {
+    std::cout << "-- " << sensor << ", " << biases[sensor].channels.size() << " channels."
+              << std::endl;
   }
 
   std::vector<eckit::LocalConfiguration> configs = config.getSubConfigurations("output");
@@ -111,12 +113,11 @@ int main(int argc, char** argv) {
             std::to_string(gsi_npredictors) + " (same as number of predictors in GSI satinfo)";
       throw eckit::BadValue(error, Here());
     }
-    auto it = find(sensors.begin(), sensors.end(), sensor);
-    if (it != sensors.end()) {
-      int index = it - sensors.begin();
+    auto it = biases.find(sensor);
+    if (it != biases.end() && !it->second.channels.empty()) {
       ioda::Group group = ioda::Engines::HH::createFile(output_filename,
                           ioda::Engines::BackendCreateModes::Truncate_If_Exists);
-      makeObsBiasObject(group, coeffile, errfile, sensor, predictors, nchannels[index]);
+      makeObsBiasObject(group, it->second, predictors);
     } else {
       const std::string error = "No " + sensor + " sensor in the input file";
       throw eckit::BadValue(error, Here());
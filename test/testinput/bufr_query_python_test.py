@@ -96,9 +96,169 @@ def test_invalid_query():
     assert False, "Didn't throw exception for invalid query."
 
 
+def assert_same_array(actual, expected):
+    assert actual.dtype == expected.dtype
+    assert actual.shape == expected.shape
+    assert actual.fill_value == expected.fill_value
+    assert np.array_equal(np.ma.getmaskarray(actual), np.ma.getmaskarray(expected))
+    assert np.array_equal(np.ma.getdata(actual), np.ma.getdata(expected))
+
+
+def test_threaded_execute():
+    # Collecting the data on several threads gives the same ResultSet as a serial run
+    time_fields = [('year', '*/YEAR'), ('month', '*/MNTH'), ('day', '*/DAYS'),
+                   ('hour', '*/HOUR'), ('minute', '*/MINU'), ('second', '*/SECO')]
+    queries = {
+        './testinput/gdas.t00z.1bhrs4.tm00.bufr_d': time_fields + [
+            ('latitude', '*/CLAT'),
+            ('longitude', '*/CLON'),
+            ('channel', '*/BRIT/CHNM'),
+            ('radiance', '*/BRIT/TMBR')],
+        './testinput/gdas.t12z.adpupa.tm00.bufr_d': time_fields + [
+            ('borg', '*/BID/BORG'),
+            ('station', '*/RPID'),
+            ('wind_direction', '*/UARLV/UAWND/WDIR'),
+            ('pressure', '*/UARLV/PRLC'),
+            ('temperature', '*/UARLV/UATMP/TMDB')]}
+    group_by = {'./testinput/gdas.t00z.1bhrs4.tm00.bufr_d': 'radiance',
+                './testinput/gdas.t12z.adpupa.tm00.bufr_d': 'pressure'}
+
+    for path, fields in queries.items():
+        q = bufr.QuerySet()
+        for name, query in fields:
+            q.add(name, query)
+
+        results = []
+        for threads in (1, 2, 4):
+            with bufr.File(path) as f:
+                results.append(f.execute(q, threads=threads))
+
+        serial = results[0]
+        for threaded in results[1:]:
+            assert threaded.empty() == serial.empty()
+            for name, _ in fields:
+                assert_same_array(threaded.get(name), serial.get(name))
+                assert_same_array(threaded.get(name, group_by=group_by[path]),
+                                  serial.get(name, group_by=group_by[path]))
+
+            time_names = [name for name, _ in time_fields]
+            assert_same_array(threaded.get_datetime(*time_names), serial.get_datetime(*time_names))
+            assert_same_array(threaded.get_datetime(*time_names, group_by=group_by[path]),
+                              serial.get_datetime(*time_names, group_by=group_by[path]))
+
+
+def count_locations(path, q, **kwargs):
+    with bufr.File(path) as f:
+        r = f.execute(q, **kwargs)
+    return 0 if r.empty() else r.get('latitude').shape[0]
+
+
+def test_message_filter():
+    # Filtered reads keep the locations of the selected messages only
+    HRS_PATH = './testinput/gdas.t00z.1bhrs4.tm00.bufr_d'
+    UPA_PATH = './testinput/gdas.t12z.adpupa.tm00.bufr_d'
+
+    q = bufr.QuerySet()
+    q.add('latitude', '*/CLAT')
+
+    # The number of locations in each message
+    msg_counts = []
+    with bufr.File(HRS_PATH) as f:
+        while True:
+            r = f.execute(q, next=1)
+            if f.is_at_end() and r.empty():
+                break
+            msg_counts.append(0 if r.empty() else r.get('latitude').shape[0])
+
+    total = sum(msg_counts)
+    assert len(msg_counts) > 4
+    assert count_locations(HRS_PATH, q) == total
+
+    # Start and end messages
+    msg_filter = bufr.MessageFilter(start_message=1, end_message=4)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == sum(msg_counts[1:4])
+    msg_filter = bufr.MessageFilter(start_message=len(msg_counts) - 2)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == sum(msg_counts[-2:])
+    msg_filter = bufr.MessageFilter(end_message=len(msg_counts) + 10)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == total
+
+    # Dates (YYYYMMDDHH), the file has data from around 2020102700
+    msg_filter = bufr.MessageFilter(start_date=2020102518, end_date=2020102806)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == total
+
+    # Dates with 2 digit years are 20xx up to 2040
+    msg_filter = bufr.MessageFilter(start_date=20102518, end_date=20102806)
+    assert (msg_filter.start_date, msg_filter.end_date) == (20102518, 20102806)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == total
+    msg_filter = bufr.MessageFilter(start_date=2020102518, end_date=20102806)
+    assert count_locations(HRS_PATH, q, filter=msg_filter) == total
+
+    # Subsets
+    q_subset = bufr.QuerySet()
+    q_subset.add('latitude', 'NC002001/CLAT')
+    msg_filter = bufr.MessageFilter(subsets=['NC002001'])
+    assert msg_filter.subsets == ['NC002001']
+    assert count_locations(UPA_PATH, q, filter=msg_filter) == count_locations(UPA_PATH, q_subset)
+    assert count_locations(UPA_PATH, q, filter=msg_filter) < count_locations(UPA_PATH, q)
+
+    # The message index carries on across chunks, so a chunked read gives the same locations
+    msg_filter = bufr.MessageFilter(start_message=1, end_message=4)
+    with bufr.File(HRS_PATH) as f:
+        nlocs = 0
+        while not f.is_at_end():
+            r = f.execute(q, next=1, filter=msg_filter)
+            nlocs += 0 if r.empty() else r.get('latitude').shape[0]
+    assert nlocs == sum(msg_counts[1:4])
+
+
+def test_invalid_message_filter():
+    for kwargs in [{'start_message': 4, 'end_message': 2},
+                   {'start_date': 2020102700, 'end_date': 2020102600},
+                   {'start_date': 2020102700, 'end_date': 20102600}]:
+        try:
+            bufr.MessageFilter(**kwargs)
+        except Exception:
+            continue
+        assert False, "Didn't throw exception for invalid message filter %s." % kwargs
+
+
+def test_no_matching_messages():
+    # Reading the rest of the file throws when it finds no messages or no matching subsets,
+    # while a chunked read only throws once it reaches the end of the file
+    DATA_PATH = './testinput/gdas.t00z.1bhrs4.tm00.bufr_d'
+
+    q = bufr.QuerySet()
+    q.add('latitude', '*/CLAT')
+
+    with bufr.File(DATA_PATH) as f:
+        try:
+            f.execute(q, filter=bufr.MessageFilter(start_date=2030010100))
+        except Exception:
+            pass
+        else:
+            assert False, "Didn't throw exception when no messages matched the filter."
+
+    with bufr.File(DATA_PATH) as f:
+        f.execute(q)
+        try:
+            f.execute(q)
+        except Exception:
+            pass
+        else:
+            assert False, "Didn't throw exception when no messages were left."
+
+    with bufr.File(DATA_PATH) as f:
+        while not f.is_at_end():
+            f.execute(q, next=1)
+        assert f.execute(q, next=1).empty()
+
 
 if __name__ == '__main__':
     test_basic_query()
     test_string_field()
     test_type_override()
     test_invalid_query()
+    test_threaded_execute()
+    test_message_filter()
+    test_invalid_message_filter()
+    test_no_matching_messages()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+import pyiodaconv.ioda_conv_engines as iconv
+from pyiodaconv import combine_obsspace
+from pyiodaconv.combine_utils import scatter_slab
+
+
+class ObsSpace(object):
+    # the part of an ioda ObsSpace that read_var uses
+    def __init__(self, variables):
+        self._variables = variables
+
+    def Variable(self, fullvname):
+        values = self._variables[fullvname]
+
+        class Variable(object):
+            def read_data(self):
+                return values
+        return Variable()
+
+
+def test_missing_datetime():
+    # a missing dateTime in a later input doesn't replace the real one
+    t0 = datetime(2021, 8, 1, 12, tzinfo=timezone.utc)
+    t1 = datetime(2021, 8, 1, 13, tzinfo=timezone.utc)
+    fill = iconv.get_default_fill_val(np.object_, isDateTime=True)
+    first = combine_obsspace.read_var(ObsSpace({'MetaData/dateTime': [t0, t1]}), 'MetaData/dateTime')
+    second = combine_obsspace.read_var(ObsSpace({'MetaData/dateTime': [fill]}), 'MetaData/dateTime')
+    int64_fill = iconv.get_default_fill_val(np.int64)
+    assert list(second) == [int64_fill]
+
+    OutVals = np.full(2, int64_fill, dtype=np.int64)
+    scatter_slab(OutVals, np.array([0, 1]), first, [int64_fill])
+    scatter_slab(OutVals, np.array([1]), second, [int64_fill])
+    assert list(OutVals) == [int(t0.timestamp()), int(t1.timestamp())]
+
+
+if __name__ == '__main__':
+    test_missing_datetime()
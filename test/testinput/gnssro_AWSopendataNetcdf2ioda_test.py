@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+from datetime import datetime
+
+import numpy as np
+
+import pyiodaconv.ioda_conv_engines as iconv
+import gnssro_AWSopendataNetcdf2ioda as aws
+
+date = datetime(2021, 8, 2, 0)
+seq_key = ('sequenceNumber', 'MetaData')
+time_key = ('dateTime', 'MetaData')
+val_key = ('bendingAngle', 'ObsValue')
+
+
+def read_profile(input_file_and_record):
+    # stands in for read_input: profile i has i + 1 levels, at i hours
+    # from the center of the window, and profile 2 is non-nominal
+    iprof, record_number = input_file_and_record
+    if iprof == 2:
+        return None
+    nlocs = iprof + 1
+    t0 = round((date - aws.epoch).total_seconds())
+    return {time_key: np.full(nlocs, t0 + iprof * 3600, dtype=np.int64),
+            val_key: np.ma.masked_greater(np.arange(nlocs, dtype=np.float32) + iprof, 5.0),
+            seq_key: np.full(nlocs, record_number, dtype=np.int32)}
+
+
+def test_renumbering():
+    # files outside the window are dropped whatever the number of
+    # workers and the kept profiles are numbered from the first record
+    inputs = [[i, j] for i, j in zip(range(6), np.arange(6) + 1)]
+    results = []
+    for workers in (1, 2):
+        obs_data, file_nlocs = iconv.read_columns_in_parallel(read_profile, inputs, workers)
+        assert file_nlocs == [1, 2, 0, 4, 5, 6]
+        results.append(aws.select_time_window(obs_data, file_nlocs, date, 4.0 * 3600, 1))
+
+    (serial, serial_record), (parallel, parallel_record) = results
+    assert serial_record == parallel_record == 4
+    assert list(serial.keys()) == list(parallel.keys())
+    for k in serial.keys():
+        assert serial[k].dtype == parallel[k].dtype
+        assert np.array_equal(np.ma.getmaskarray(serial[k]), np.ma.getmaskarray(parallel[k]))
+        assert np.array_equal(np.ma.getdata(serial[k]), np.ma.getdata(parallel[k]))
+    assert list(serial[seq_key]) == [1, 2, 2, 3, 3, 3, 3]
+    assert serial[seq_key].dtype == np.int32
+    assert list(serial[val_key].filled(-1.0)) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, -1.0]
+
+
+def test_nothing_in_window():
+    inputs = [[i, j] for i, j in zip(range(4, 6), np.arange(2) + 1)]
+    obs_data, file_nlocs = iconv.read_columns_in_parallel(read_profile, inputs, 2)
+    obs_data, record_number = aws.select_time_window(obs_data, file_nlocs, date, 4.0 * 3600, 1)
+    assert len(obs_data) == 0
+    assert record_number == 1
+
+
+if __name__ == '__main__':
+    test_renumbering()
+    test_nothing_in_window()
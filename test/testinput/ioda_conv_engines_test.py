@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+import os
+import tempfile
+
+import h5py
+import numpy as np
+
+import pyiodaconv.ioda_conv_engines as iconv
+
+lat_key = ('latitude', 'MetaData')
+lon_key = ('longitude', 'MetaData')
+sid_key = ('stationIdentification', 'MetaData')
+qc_key = ('airTemperature', 'PreQC')
+val_key = ('airTemperature', 'ObsValue')
+chan_key = ('sensorChannelNumber', 'MetaData')
+time_key = ('dateTime', 'MetaData')
+
+
+def test_padding():
+    # variables missing from a chunk are padded with the fill value of
+    # their dtype, strings with StringFill
+    for string_fill in ('', '_'):
+        obs = iconv.ChunkedObsData(StaticKeys=[chan_key], StringFill=string_fill)
+        obs.append({lat_key: np.array([1.0, 2.0], dtype=np.float32),
+                    chan_key: np.array([1, 2, 3], dtype=np.int32),
+                    sid_key: np.array(['a', 'b'], dtype=object),
+                    qc_key: np.array([0, 1], dtype=np.int32)})
+        obs.append({lat_key: np.array([3.0], dtype=np.float32),
+                    chan_key: np.array([4, 5, 6], dtype=np.int32),
+                    val_key: np.array([[280.0, 281.0]], dtype=np.float32)})
+        assert len(obs) == 3
+        ObsVars = obs.finalize()
+        assert list(ObsVars.keys()) == [chan_key, lat_key, sid_key, qc_key, val_key]
+        assert np.array_equal(ObsVars[chan_key], [1, 2, 3])
+        assert np.array_equal(ObsVars[lat_key], [1.0, 2.0, 3.0])
+        assert ObsVars[sid_key].dtype == object
+        assert list(ObsVars[sid_key]) == ['a', 'b', string_fill]
+        assert np.array_equal(ObsVars[qc_key], [0, 1, iconv.get_default_fill_val(np.int32)])
+        fill = iconv.get_default_fill_val(np.float32)
+        assert ObsVars[val_key].shape == (3, 2)
+        assert ObsVars[val_key].dtype == np.float32
+        assert np.array_equal(ObsVars[val_key], np.array([[fill, fill], [fill, fill], [280.0, 281.0]],
+                                                         dtype=np.float32))
+
+    obs = iconv.ChunkedObsData()
+    obs.append({sid_key: np.array(['abc'])})
+    obs.append({lat_key: np.array([1.0])})
+    assert list(obs.finalize()[sid_key]) == ['abc', '']
+
+
+def test_masked_chunks():
+    # a masked chunk gives a masked result that keeps its mask
+    obs = iconv.ChunkedObsData()
+    obs.append({val_key: np.array([1.0, 2.0], dtype=np.float32)})
+    obs.append({val_key: np.ma.array([3.0, 4.0], mask=[True, False], dtype=np.float32)})
+    obs.append({lat_key: np.array([5.0])})
+    ObsVars = obs.finalize()
+    assert np.ma.isMaskedArray(ObsVars[val_key])
+    assert list(np.ma.getmaskarray(ObsVars[val_key])) == [False, False, True, False, False]
+    assert np.array_equal(ObsVars[val_key].compressed(), [1.0, 2.0, 4.0, iconv.get_default_fill_val(np.float32)])
+
+    obs = iconv.ChunkedObsData()
+    obs.append({val_key: np.array([1.0])})
+    obs.append({val_key: np.array([2.0])})
+    assert not np.ma.isMaskedArray(obs.finalize()[val_key])
+
+
+def test_merge_keys():
+    # repeated locations keep the position of their first occurrence and
+    # the values of their last one
+    obs = iconv.ChunkedObsData(MergeKeys=[lat_key, lon_key])
+    obs.append({lat_key: np.array([1.0, 2.0]), lon_key: np.array([5.0, 6.0]),
+                val_key: np.array([10.0, 20.0])})
+    obs.append({lat_key: np.array([3.0, 1.0]), lon_key: np.array([7.0, 5.0]),
+                val_key: np.array([30.0, 40.0])})
+    ObsVars = obs.finalize()
+    assert np.array_equal(ObsVars[lat_key], [1.0, 2.0, 3.0])
+    assert np.array_equal(ObsVars[val_key], [40.0, 20.0, 30.0])
+
+
+def test_chunk_lengths():
+    obs = iconv.ChunkedObsData()
+    try:
+        obs.append({lat_key: np.zeros(2), lon_key: np.zeros(3)})
+    except ValueError:
+        return
+    assert False, "Didn't throw exception for chunk variables of different lengths."
+
+
+def read_columns(i):
+    # input 1 gives nothing, input 2 lacks the station ids and input 3 has
+    # masked values
+    if i == 1:
+        return None
+    nlocs = i + 2
+    ObsVars = {chan_key: np.array([1, 2, 3], dtype=np.int32),
+               lat_key: np.linspace(-10.0, 10.0, nlocs, dtype=np.float32) + i,
+               val_key: np.arange(2 * nlocs, dtype=np.float32).reshape(nlocs, 2) + 10 * i,
+               qc_key: np.full(nlocs, i, dtype=np.int32)}
+    if i != 2:
+        ObsVars[sid_key] = np.array(['s%d_%d' % (i, j) for j in range(nlocs)], dtype=object)
+    if i == 3:
+        ObsVars[val_key] = np.ma.masked_greater(ObsVars[val_key], 35.0)
+    return ObsVars
+
+
+def test_read_columns_in_parallel():
+    # the shared memory path gives the same columns as a serial read
+    results = []
+    for workers in (1, 2):
+        results.append(iconv.read_columns_in_parallel(read_columns, range(5), workers, StaticKeys=[chan_key],
+                                                      StringFill='_'))
+
+    (serial, serial_nlocs), (parallel, parallel_nlocs) = results
+    assert serial_nlocs == parallel_nlocs == [2, 0, 4, 5, 6]
+    assert list(serial.keys()) == list(parallel.keys())
+    for VarKey in serial.keys():
+        assert serial[VarKey].dtype == parallel[VarKey].dtype
+        assert np.ma.isMaskedArray(serial[VarKey]) == np.ma.isMaskedArray(parallel[VarKey])
+        assert np.array_equal(np.ma.getmaskarray(serial[VarKey]), np.ma.getmaskarray(parallel[VarKey]))
+        assert np.array_equal(np.ma.getdata(serial[VarKey]), np.ma.getdata(parallel[VarKey]))
+    assert np.array_equal(parallel[chan_key], [1, 2, 3])
+    assert list(parallel[sid_key][2:7]) == ['_'] * 4 + ['s3_0']
+    assert np.ma.count_masked(parallel[val_key]) == 4
+
+
+def stream_chunk(i):
+    # block i of the stream writer test, the first one has no station ids
+    nlocs = 3 + i
+    ObsVars = {lat_key: np.linspace(-60.0, 60.0, nlocs, dtype=np.float32) + i,
+               lon_key: np.linspace(0.0, 90.0, nlocs, dtype=np.float32),
+               time_key: np.arange(nlocs, dtype=np.int64) + 1600000000 + 100 * i,
+               val_key: np.arange(3 * nlocs, dtype=np.float32).reshape(nlocs, 3) + 250.0,
+               qc_key: np.arange(nlocs, dtype=np.int32) % 2}
+    if i > 0:
+        ObsVars[sid_key] = np.array(['st%d%d' % (i, j) for j in range(nlocs)], dtype=object)
+    return ObsVars
+
+
+def read_back(Fname):
+    # the variables of an output file, strings decoded
+    Vars = {}
+    with h5py.File(Fname, 'r') as f:
+        def visit(name, obj):
+            if isinstance(obj, h5py.Dataset):
+                vals = obj[...]
+                if vals.dtype.kind in ['O', 'S']:
+                    vals = np.array([v.decode() if isinstance(v, bytes) else v for v in vals.ravel()],
+                                    dtype=object).reshape(vals.shape)
+                fill = obj.attrs.get('_FillValue')
+                Vars[name] = (vals, None if fill is None else np.asarray(fill).item(), obj.attrs.get('units'))
+        f.visititems(visit)
+    return Vars
+
+
+def test_stream_writer():
+    # the streamed file holds the same variables as IodaWriter writes
+    # from the whole ObsData
+    VarDims = {val_key: ['Location', 'Channel']}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        whole = iconv.ChunkedObsData()
+        streamed = os.path.join(tmpdir, 'streamed.nc')
+        with iconv.IodaStreamWriter(streamed, [], {'Channel': 3}, VarDims=VarDims,
+                                    ChunkDict={'Location': 4, 'ObsValue': 2}) as writer:
+            obs = iconv.ChunkedObsData()
+            for i in range(3):
+                whole.append(stream_chunk(i))
+                obs.append(stream_chunk(i))
+                obs.flush(writer)
+            assert len(obs) == 12
+        ObsVars = whole.finalize()
+
+        written = os.path.join(tmpdir, 'written.nc')
+        writer = iconv.IodaWriter(written, [], {'Location': len(whole), 'Channel': 3})
+        VarAttrs = {k: {} for k in ObsVars.keys()}
+        writer.BuildIoda(ObsVars, VarDims, VarAttrs, {})
+        del writer
+
+        with h5py.File(streamed, 'r') as f:
+            assert f['Location'].chunks == (4,)
+            assert f['ObsValue/airTemperature'].chunks == (2, 3)
+
+        expected = read_back(written)
+        actual = read_back(streamed)
+        for name in expected.keys():
+            if name.startswith('MetaData') or name.startswith('ObsValue') or name.startswith('PreQC') or \
+                    name in ['Location', 'Channel']:
+                assert name in actual, name
+                assert np.array_equal(actual[name][0], expected[name][0]), name
+                assert actual[name][2] == expected[name][2], name
+                if expected[name][0].dtype.kind != 'O':
+                    assert actual[name][1] == expected[name][1], name
+        assert list(actual['Location'][0]) == list(range(1, 13))
+        assert list(actual['MetaData/stationIdentification'][0][:3]) == [''] * 3
+
+
+if __name__ == '__main__':
+    test_padding()
+    test_masked_chunks()
+    test_merge_keys()
+    test_chunk_lengths()
+    test_read_columns_in_parallel()
+    test_stream_writer()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+#
+# (C) Copyright 2026 UCAR
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+
+import numpy as np
+
+import pyiodaconv.thinning_utils as thinning
+
+
+def test_healpix_round_trip():
+    # the center of every pixel falls back in that pixel
+    for nside in (1, 2, 3, 8, 17):
+        pix = np.arange(12 * nside * nside)
+        lats, lons = thinning.healpix_center(nside, pix)
+        assert np.array_equal(thinning.healpix_index(nside, lats, lons), pix)
+
+    # and any point is within about a pixel of the center of its pixel
+    nside = thinning.healpix_nside(100.0)
+    rng = np.random.default_rng(0)
+    lats = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, 2000)))
+    lons = rng.uniform(-180.0, 180.0, 2000)
+    clat, clon = thinning.healpix_center(nside, thinning.healpix_index(nside, lats, lons))
+    chord = np.linalg.norm(thinning._unit_vectors(lats, lons) - thinning._unit_vectors(clat, clon), axis=-1)
+    assert np.all(chord * thinning._earth_radius < 100.0)
+
+
+def test_empty_input():
+    empty = np.array([], dtype=np.float32)
+    for grid in thinning.GRIDS:
+        for rule in thinning.RULES:
+            thinner = thinning.Thinner(grid, 50.0, rule)
+            if thinner.averaging:
+                idx, lats, lons, vals, errs, nobs = thinner.superob(empty, empty, empty, empty)
+                assert len(idx) == len(lats) == len(lons) == len(vals) == len(errs) == len(nobs) == 0
+            else:
+                assert len(thinner.select(empty, empty, qc=empty.astype(np.int32))) == 0
+            obs_data = thinner.thin({('latitude', 'MetaData'): empty, ('longitude', 'MetaData'): empty,
+                                     ('sst', 'ObsValue'): empty, ('sst', 'ObsError'): empty},
+                                    ('latitude', 'MetaData'), ('longitude', 'MetaData'), qc=empty,
+                                    superob_keys=[(('sst', 'ObsValue'), ('sst', 'ObsError'))])
+            assert all(len(val) == 0 for val in obs_data.values())
+
+
+def test_superob_means():
+    # two boxes of a 1 degree grid, the second one with a worse qc member
+    thinner = thinning.Thinner('latlon', thinning._km_per_degree, 'mean')
+    lats = np.array([10.1, 10.45, 10.8, 20.5, 20.5])
+    lons = np.array([30.5, 30.5, 30.5, 40.4, 40.6])
+    vals = np.array([1.0, 2.0, 6.0, 5.0, 100.0])
+    errs = np.array([0.3, 0.6, 0.9, 0.5, 0.5])
+    qc = np.array([0, 0, 0, 0, 1])
+    idx, slat, slon, mean, err, nobs = thinner.superob(lats, lons, vals, errs, qc=qc)
+    assert np.array_equal(idx, [1, 3])
+    assert np.array_equal(nobs, [3, 1])
+    assert np.allclose(mean, [3.0, 5.0])
+    spread = np.mean((vals[:3] - 3.0)**2)
+    assert np.allclose(err, [np.sqrt(np.mean(errs[:3]**2) / 3 + spread), 0.5])
+    assert np.allclose(slat, [10.45, 20.5], atol=1e-3)
+    assert np.allclose(slon, [30.5, 40.4])
+
+    thinner = thinning.Thinner('latlon', thinning._km_per_degree, 'median')
+    _, _, _, median, _, _ = thinner.superob(lats, lons, vals, errs, qc=qc)
+    assert np.allclose(median, [2.0, 5.0])
+
+
+def test_thin_accumulated_files():
+    # a box shared by two files keeps a single observation
+    thinner = thinning.Thinner('latlon', thinning._km_per_degree, 'best_qc')
+    lat_key, lon_key, val_key = ('latitude', 'MetaData'), ('longitude', 'MetaData'), ('sst', 'ObsValue')
+    obs_data = {lat_key: np.array([10.5, 10.5, 30.5], dtype=np.float32),
+                lon_key: np.array([20.5, 20.6, 20.5], dtype=np.float32),
+                val_key: np.array([1.0, 2.0, 3.0], dtype=np.float32)}
+    thinned = thinner.thin(obs_data, lat_key, lon_key, qc=np.array([1, 0, 0]))
+    assert np.array_equal(thinned[val_key], [2.0, 3.0])
+    assert thinned[lat_key].dtype == np.float32
+
+
+if __name__ == '__main__':
+    test_healpix_round_trip()
+    test_empty_input()
+    test_superob_means()
+    test_thin_accumulated_files()